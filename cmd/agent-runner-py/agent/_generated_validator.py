@@ -0,0 +1,195 @@
+"""Workflow schema validator generated by fastjsonschema. Do not edit.
+
+Regenerate after changing workflow.schema.json:
+    python -m agent.workflow_schema
+"""
+VERSION = "2.22.2"
+from decimal import Decimal
+import re
+from fastjsonschema import JsonSchemaValueException, JsonSchemaValuesException
+
+
+REGEX_PATTERNS = {
+    '^[a-zA-Z0-9_-]+$': re.compile('^[a-zA-Z0-9_-]+\\Z')
+}
+
+NoneType = type(None)
+
+def validate_https___orchestrator_lyzr_ai_schemas_workflow_json(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'$schema': 'http://json-schema.org/draft-07/schema#', '$id': 'https://orchestrator.lyzr.ai/schemas/workflow.json', 'title': 'Workflow', 'description': 'A directed acyclic graph (DAG) representing a workflow', 'type': 'object', 'required': ['nodes', 'edges'], 'properties': {'nodes': {'type': 'array', 'description': 'List of nodes in the workflow', 'items': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'$ref': 'https://orchestrator.lyzr.ai/schemas/workflow.json#/definitions/RetryPolicy'}}}, 'minItems': 1}, 'edges': {'type': 'array', 'description': 'List of edges connecting nodes', 'items': {'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}}, 'metadata': {'type': 'object', 'description': 'Optional workflow metadata', 'properties': {'name': {'type': 'string'}, 'description': {'type': 'string'}, 'version': {'type': 'string'}, 'tags': {'type': 'array', 'items': {'type': 'string'}}}}}, 'definitions': {'Node': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, 'Edge': {'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}, 'RetryPolicy': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['nodes', 'edges']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'$schema': 'http://json-schema.org/draft-07/schema#', '$id': 'https://orchestrator.lyzr.ai/schemas/workflow.json', 'title': 'Workflow', 'description': 'A directed acyclic graph (DAG) representing a workflow', 'type': 'object', 'required': ['nodes', 'edges'], 'properties': {'nodes': {'type': 'array', 'description': 'List of nodes in the workflow', 'items': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'$ref': 'https://orchestrator.lyzr.ai/schemas/workflow.json#/definitions/RetryPolicy'}}}, 'minItems': 1}, 'edges': {'type': 'array', 'description': 'List of edges connecting nodes', 'items': {'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}}, 'metadata': {'type': 'object', 'description': 'Optional workflow metadata', 'properties': {'name': {'type': 'string'}, 'description': {'type': 'string'}, 'version': {'type': 'string'}, 'tags': {'type': 'array', 'items': {'type': 'string'}}}}}, 'definitions': {'Node': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, 'Edge': {'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}, 'RetryPolicy': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, rule='required')
+        data_keys = set(data.keys())
+        if "nodes" in data_keys:
+            data_keys.remove("nodes")
+            data__nodes = data["nodes"]
+            if not isinstance(data__nodes, (list, tuple)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".nodes must be array", value=data__nodes, name="" + (name_prefix or "data") + ".nodes", definition={'type': 'array', 'description': 'List of nodes in the workflow', 'items': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'$ref': 'https://orchestrator.lyzr.ai/schemas/workflow.json#/definitions/RetryPolicy'}}}, 'minItems': 1}, rule='type')
+            data__nodes_is_list = isinstance(data__nodes, (list, tuple))
+            if data__nodes_is_list:
+                data__nodes_len = len(data__nodes)
+                if data__nodes_len < 1:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".nodes must contain at least 1 items", value=data__nodes, name="" + (name_prefix or "data") + ".nodes", definition={'type': 'array', 'description': 'List of nodes in the workflow', 'items': {'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'$ref': 'https://orchestrator.lyzr.ai/schemas/workflow.json#/definitions/RetryPolicy'}}}, 'minItems': 1}, rule='minItems')
+                for data__nodes_x, data__nodes_item in enumerate(data__nodes):
+                    validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_node(data__nodes_item, custom_formats, (name_prefix or "data") + ".nodes[{data__nodes_x}]".format(**locals()))
+        if "edges" in data_keys:
+            data_keys.remove("edges")
+            data__edges = data["edges"]
+            if not isinstance(data__edges, (list, tuple)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".edges must be array", value=data__edges, name="" + (name_prefix or "data") + ".edges", definition={'type': 'array', 'description': 'List of edges connecting nodes', 'items': {'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}}, rule='type')
+            data__edges_is_list = isinstance(data__edges, (list, tuple))
+            if data__edges_is_list:
+                data__edges_len = len(data__edges)
+                for data__edges_x, data__edges_item in enumerate(data__edges):
+                    validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_edge(data__edges_item, custom_formats, (name_prefix or "data") + ".edges[{data__edges_x}]".format(**locals()))
+        if "metadata" in data_keys:
+            data_keys.remove("metadata")
+            data__metadata = data["metadata"]
+            if not isinstance(data__metadata, (dict)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata must be object", value=data__metadata, name="" + (name_prefix or "data") + ".metadata", definition={'type': 'object', 'description': 'Optional workflow metadata', 'properties': {'name': {'type': 'string'}, 'description': {'type': 'string'}, 'version': {'type': 'string'}, 'tags': {'type': 'array', 'items': {'type': 'string'}}}}, rule='type')
+            data__metadata_is_dict = isinstance(data__metadata, dict)
+            if data__metadata_is_dict:
+                data__metadata_keys = set(data__metadata.keys())
+                if "name" in data__metadata_keys:
+                    data__metadata_keys.remove("name")
+                    data__metadata__name = data__metadata["name"]
+                    if not isinstance(data__metadata__name, (str)):
+                        raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata.name must be string", value=data__metadata__name, name="" + (name_prefix or "data") + ".metadata.name", definition={'type': 'string'}, rule='type')
+                if "description" in data__metadata_keys:
+                    data__metadata_keys.remove("description")
+                    data__metadata__description = data__metadata["description"]
+                    if not isinstance(data__metadata__description, (str)):
+                        raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata.description must be string", value=data__metadata__description, name="" + (name_prefix or "data") + ".metadata.description", definition={'type': 'string'}, rule='type')
+                if "version" in data__metadata_keys:
+                    data__metadata_keys.remove("version")
+                    data__metadata__version = data__metadata["version"]
+                    if not isinstance(data__metadata__version, (str)):
+                        raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata.version must be string", value=data__metadata__version, name="" + (name_prefix or "data") + ".metadata.version", definition={'type': 'string'}, rule='type')
+                if "tags" in data__metadata_keys:
+                    data__metadata_keys.remove("tags")
+                    data__metadata__tags = data__metadata["tags"]
+                    if not isinstance(data__metadata__tags, (list, tuple)):
+                        raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata.tags must be array", value=data__metadata__tags, name="" + (name_prefix or "data") + ".metadata.tags", definition={'type': 'array', 'items': {'type': 'string'}}, rule='type')
+                    data__metadata__tags_is_list = isinstance(data__metadata__tags, (list, tuple))
+                    if data__metadata__tags_is_list:
+                        data__metadata__tags_len = len(data__metadata__tags)
+                        for data__metadata__tags_x, data__metadata__tags_item in enumerate(data__metadata__tags):
+                            if not isinstance(data__metadata__tags_item, (str)):
+                                raise JsonSchemaValueException("" + (name_prefix or "data") + ".metadata.tags[{data__metadata__tags_x}]".format(**locals()) + " must be string", value=data__metadata__tags_item, name="" + (name_prefix or "data") + ".metadata.tags[{data__metadata__tags_x}]".format(**locals()) + "", definition={'type': 'string'}, rule='type')
+    return data
+
+def validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_edge(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['from', 'to']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'required': ['from', 'to'], 'properties': {'from': {'type': 'string', 'description': 'Source node ID'}, 'to': {'type': 'string', 'description': 'Target node ID'}, 'condition': {'type': 'string', 'description': 'Optional condition for edge traversal'}}}, rule='required')
+        data_keys = set(data.keys())
+        if "from" in data_keys:
+            data_keys.remove("from")
+            data__from = data["from"]
+            if not isinstance(data__from, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".from must be string", value=data__from, name="" + (name_prefix or "data") + ".from", definition={'type': 'string', 'description': 'Source node ID'}, rule='type')
+        if "to" in data_keys:
+            data_keys.remove("to")
+            data__to = data["to"]
+            if not isinstance(data__to, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".to must be string", value=data__to, name="" + (name_prefix or "data") + ".to", definition={'type': 'string', 'description': 'Target node ID'}, rule='type')
+        if "condition" in data_keys:
+            data_keys.remove("condition")
+            data__condition = data["condition"]
+            if not isinstance(data__condition, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".condition must be string", value=data__condition, name="" + (name_prefix or "data") + ".condition", definition={'type': 'string', 'description': 'Optional condition for edge traversal'}, rule='type')
+    return data
+
+def validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_node(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['id', 'type']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'required': ['id', 'type'], 'properties': {'id': {'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, 'type': {'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, 'config': {'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, 'timeout_ms': {'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, 'retry': {'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}}}, rule='required')
+        data_keys = set(data.keys())
+        if "id" in data_keys:
+            data_keys.remove("id")
+            data__id = data["id"]
+            if not isinstance(data__id, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".id must be string", value=data__id, name="" + (name_prefix or "data") + ".id", definition={'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, rule='type')
+            if isinstance(data__id, str):
+                if not REGEX_PATTERNS['^[a-zA-Z0-9_-]+$'].search(data__id):
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".id must match pattern ^[a-zA-Z0-9_-]+$", value=data__id, name="" + (name_prefix or "data") + ".id", definition={'type': 'string', 'description': 'Unique identifier for the node', 'pattern': '^[a-zA-Z0-9_-]+$'}, rule='pattern')
+        if "type" in data_keys:
+            data_keys.remove("type")
+            data__type = data["type"]
+            if not isinstance(data__type, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".type must be string", value=data__type, name="" + (name_prefix or "data") + ".type", definition={'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, rule='type')
+            if not (isinstance(data__type, str) and data__type == 'function' or isinstance(data__type, str) and data__type == 'http' or isinstance(data__type, str) and data__type == 'conditional' or isinstance(data__type, str) and data__type == 'loop' or isinstance(data__type, str) and data__type == 'parallel' or isinstance(data__type, str) and data__type == 'transform' or isinstance(data__type, str) and data__type == 'aggregate' or isinstance(data__type, str) and data__type == 'filter'):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".type must be one of ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']", value=data__type, name="" + (name_prefix or "data") + ".type", definition={'type': 'string', 'description': 'Type of the node', 'enum': ['function', 'http', 'conditional', 'loop', 'parallel', 'transform', 'aggregate', 'filter']}, rule='enum')
+        if "config" in data_keys:
+            data_keys.remove("config")
+            data__config = data["config"]
+            if not isinstance(data__config, (dict)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".config must be object", value=data__config, name="" + (name_prefix or "data") + ".config", definition={'type': 'object', 'description': 'Node-specific configuration', 'additionalProperties': True}, rule='type')
+            data__config_is_dict = isinstance(data__config, dict)
+            if data__config_is_dict:
+                data__config_keys = set(data__config.keys())
+        if "timeout_ms" in data_keys:
+            data_keys.remove("timeout_ms")
+            data__timeoutms = data["timeout_ms"]
+            if not isinstance(data__timeoutms, (int)) and not (isinstance(data__timeoutms, float) and data__timeoutms.is_integer()) or isinstance(data__timeoutms, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".timeout_ms must be integer", value=data__timeoutms, name="" + (name_prefix or "data") + ".timeout_ms", definition={'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, rule='type')
+            if isinstance(data__timeoutms, (int, float, Decimal)):
+                if data__timeoutms < 0:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".timeout_ms must be bigger than or equal to 0", value=data__timeoutms, name="" + (name_prefix or "data") + ".timeout_ms", definition={'type': 'integer', 'description': 'Execution timeout in milliseconds', 'minimum': 0}, rule='minimum')
+        if "retry" in data_keys:
+            data_keys.remove("retry")
+            data__retry = data["retry"]
+            validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_retrypolicy(data__retry, custom_formats, (name_prefix or "data") + ".retry")
+    return data
+
+def validate_https___orchestrator_lyzr_ai_schemas_workflow_json__definitions_retrypolicy(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'max_attempts': {'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, 'backoff_ms': {'type': 'integer', 'minimum': 0, 'default': 1000}, 'backoff_multiplier': {'type': 'number', 'minimum': 1.0, 'default': 2.0}}}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data_keys = set(data.keys())
+        if "max_attempts" in data_keys:
+            data_keys.remove("max_attempts")
+            data__maxattempts = data["max_attempts"]
+            if not isinstance(data__maxattempts, (int)) and not (isinstance(data__maxattempts, float) and data__maxattempts.is_integer()) or isinstance(data__maxattempts, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".max_attempts must be integer", value=data__maxattempts, name="" + (name_prefix or "data") + ".max_attempts", definition={'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, rule='type')
+            if isinstance(data__maxattempts, (int, float, Decimal)):
+                if data__maxattempts < 1:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".max_attempts must be bigger than or equal to 1", value=data__maxattempts, name="" + (name_prefix or "data") + ".max_attempts", definition={'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, rule='minimum')
+                if data__maxattempts > 10:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".max_attempts must be smaller than or equal to 10", value=data__maxattempts, name="" + (name_prefix or "data") + ".max_attempts", definition={'type': 'integer', 'minimum': 1, 'maximum': 10, 'default': 3}, rule='maximum')
+        else: data["max_attempts"] = 3
+        if "backoff_ms" in data_keys:
+            data_keys.remove("backoff_ms")
+            data__backoffms = data["backoff_ms"]
+            if not isinstance(data__backoffms, (int)) and not (isinstance(data__backoffms, float) and data__backoffms.is_integer()) or isinstance(data__backoffms, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".backoff_ms must be integer", value=data__backoffms, name="" + (name_prefix or "data") + ".backoff_ms", definition={'type': 'integer', 'minimum': 0, 'default': 1000}, rule='type')
+            if isinstance(data__backoffms, (int, float, Decimal)):
+                if data__backoffms < 0:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".backoff_ms must be bigger than or equal to 0", value=data__backoffms, name="" + (name_prefix or "data") + ".backoff_ms", definition={'type': 'integer', 'minimum': 0, 'default': 1000}, rule='minimum')
+        else: data["backoff_ms"] = 1000
+        if "backoff_multiplier" in data_keys:
+            data_keys.remove("backoff_multiplier")
+            data__backoffmultiplier = data["backoff_multiplier"]
+            if not isinstance(data__backoffmultiplier, (int, float, Decimal)) or isinstance(data__backoffmultiplier, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".backoff_multiplier must be number", value=data__backoffmultiplier, name="" + (name_prefix or "data") + ".backoff_multiplier", definition={'type': 'number', 'minimum': 1.0, 'default': 2.0}, rule='type')
+            if isinstance(data__backoffmultiplier, (int, float, Decimal)):
+                if data__backoffmultiplier < 1.0:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".backoff_multiplier must be bigger than or equal to 1.0", value=data__backoffmultiplier, name="" + (name_prefix or "data") + ".backoff_multiplier", definition={'type': 'number', 'minimum': 1.0, 'default': 2.0}, rule='minimum')
+        else: data["backoff_multiplier"] = 2.0
+    return data
+
+SCHEMA_SHA256 = 'c36e8df66846c46dea9741b1b4cf95de4a77294836d2de09b2a4921a8c2d7fec'
+validate = validate_https___orchestrator_lyzr_ai_schemas_workflow_json
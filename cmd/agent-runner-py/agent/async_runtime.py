@@ -0,0 +1,58 @@
+"""Shared asyncio event loop for running async LLM calls from worker threads."""
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared background event loop, starting it on first use.
+
+    All async OpenAI calls are scheduled on this single loop so that pooled
+    httpx.AsyncClient connections are never shared between event loops, and
+    concurrent callers interleave their in-flight requests instead of blocking.
+
+    Returns:
+        Running event loop owned by a daemon thread
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="agent-asyncio", daemon=True)
+                thread.start()
+                _loop = loop
+                logger.info("Started shared asyncio loop for LLM calls")
+    return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop and block until it completes.
+
+    Thin sync bridge for legacy (thread-based) callers.
+
+    Args:
+        coro: Coroutine to execute
+        timeout: Optional timeout in seconds
+
+    Returns:
+        Result of the coroutine
+    """
+    loop = get_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared loop; await the coroutine instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    return future.result(timeout)
@@ -1,51 +1,318 @@
-"""Intent classification for user prompts using LLM."""
+"""Intent classification for user prompts (keyword scoring and LLM)."""
+import asyncio
+import copy
+import functools
+import hashlib
 import logging
-from typing import Dict, Any, List
-import json
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
 import os
-import httpx
-from openai import OpenAI
+
+try:
+    import ahocorasick
+except ImportError:  # Fall back to the regex keyword scanner
+    ahocorasick = None
+
+try:
+    import tiktoken
+except ImportError:  # One-token classification disabled, JSON output only
+    tiktoken = None
+
+from openai import OpenAIError
+
+import json_codec
+from agent.async_runtime import run_sync
+from agent.openai_client import get_client
+from agent.local_intent_model import LocalIntentModel
+from agent.openai_batch import run_batch
+from agent.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
 
-class IntentClassifier:
-    """Classifies user intent as 'patch' (permanent) or 'execute' (one-time) using LLM."""
-
-    def __init__(self):
-        """Initialize intent classifier with OpenAI client."""
-        # TODO: FIX SSL VERIFICATION FOR PRODUCTION!
-        # Temporary workaround: SSL verification disabled for development
-        logger.warning("SSL verification is DISABLED - temporary workaround for development")
-        http_client = httpx.Client(verify=False)  # TEMPORARY: Disable SSL verification
-        self.client = OpenAI(http_client=http_client)  # Uses OPENAI_API_KEY env var
-        self.model = "gpt-4o-mini"  # Fast and cheap model for classification
-        logger.info("Intent classifier initialized with LLM")
+def _empty_keywords() -> Dict[str, List[str]]:
+    return {'patch': [], 'execute': []}
 
-    def classify(self, prompt: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Classify user intent from prompt using LLM.
 
-        Args:
-            prompt: User's natural language prompt
-            context: Optional context information
+def _empty_scores() -> Dict[str, float]:
+    return {'patch': 0.0, 'execute': 0.0}
 
-        Returns:
-            Dictionary with:
-                - intent: 'patch', 'execute', or 'unclear'
-                - confidence: 0.0-1.0
-                - reasoning: Explanation of classification
-        """
-        try:
-            # Build context information for LLM
-            context_info = ""
-            if context and context.get('current_workflow'):
-                workflow = context['current_workflow']
-                node_count = len(workflow.get('nodes', []))
-                edge_count = len(workflow.get('edges', []))
-                context_info = f"\n\nCurrent workflow context: {node_count} nodes, {edge_count} edges"
 
-            # System prompt for intent classification
-            system_prompt = """You are an intent classifier for a workflow automation system. Your job is to determine the user's intent:
+@dataclass(slots=True)
+class Classification:
+    """Intent classification result.
+
+    Supports dict-style reads/writes (result['intent']) for existing callers;
+    use to_dict() where a plain dict is needed (e.g. serialization).
+    """
+    intent: str
+    confidence: float
+    reasoning: str
+    matched_keywords: Dict[str, List[str]] = field(default_factory=_empty_keywords)
+    scores: Dict[str, float] = field(default_factory=_empty_scores)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def copy(self) -> 'Classification':
+        """Copy with its own matched_keywords and scores, safe for callers to modify."""
+        return Classification(
+            intent=self.intent,
+            confidence=self.confidence,
+            reasoning=self.reasoning,
+            matched_keywords={category: list(words) for category, words in self.matched_keywords.items()},
+            scores=dict(self.scores)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dictionary."""
+        return {
+            'intent': self.intent,
+            'confidence': self.confidence,
+            'reasoning': self.reasoning,
+            'matched_keywords': self.matched_keywords,
+            'scores': self.scores
+        }
+
+
+# Exact-match classification cache: sha256(prompt + workflow size) -> result
+# Prompts are heavy-tailed with many exact repeats, so hits skip the LLM round-trip.
+_CLASSIFY_CACHE_MAXSIZE = 4096
+_classify_cache: "OrderedDict[str, Classification]" = OrderedDict()
+
+
+def _cache_key(prompt: str, node_count: int, edge_count: int) -> str:
+    """Build the exact-match cache key for a classification request."""
+    payload = json_codec.dumps({'p': prompt, 'nc': node_count, 'ec': edge_count}, sort_keys=True)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[Classification]:
+    """Return a copy of the cached classification (or None), refreshing recency."""
+    cached = _classify_cache.get(key)
+    if cached is None:
+        return None
+    _classify_cache.move_to_end(key)
+    return copy.deepcopy(cached)
+
+
+def _cache_put(key: str, result: Classification):
+    """Store a classification, evicting the least recently used entry when full."""
+    _classify_cache[key] = copy.deepcopy(result)
+    _classify_cache.move_to_end(key)
+    if len(_classify_cache) > _CLASSIFY_CACHE_MAXSIZE:
+        _classify_cache.popitem(last=False)
+
+
+# Keyword lists for the keyword classifier: (keyword, weight)
+PATCH_KEYWORDS = [
+    ('always', 2.0), ('whenever', 2.0), ('every time', 2.0), ('each time', 2.0),
+    ('from now on', 2.0), ('going forward', 2.0), ('automatically', 2.0),
+    ('schedule', 2.0), ('scheduled', 2.0), ('recurring', 2.0), ('permanently', 2.0),
+    ('every day', 2.0), ('every hour', 2.0), ('daily', 2.0), ('hourly', 2.0), ('weekly', 2.0),
+]
+
+EXECUTE_KEYWORDS = [
+    ('show', 1.0), ('fetch', 1.0), ('get', 1.0), ('list', 1.0), ('find', 1.0),
+    ('display', 1.0), ('retrieve', 1.0), ('search', 1.0), ('lookup', 1.0), ('look up', 1.0),
+    ('calculate', 1.0), ('compute', 1.0), ('count', 1.0), ('compare', 1.0), ('summarize', 1.0),
+    ('sort', 1.0), ('sorted', 1.0), ('filter', 1.0), ('top', 1.0), ('query', 1.0), ('run', 1.0),
+    ('what', 1.0), ('which', 1.0), ('how many', 1.0), ('give me', 1.0), ('tell me', 1.0),
+]
+
+# Temporal words that signal a standing rule when followed by an action
+TEMPORAL_PATCH = ['when', 'whenever', 'if', 'once', 'after', 'upon', 'as soon as']
+ACTION_VERBS = 'send|notify|alert|email|post|trigger|execute|update|create|delete|add|remove'
+
+# Conditional rule shapes ("if X then Y", "only if", ...)
+CONDITIONAL_PATTERNS = [
+    r'\bif\b.+\bthen\b',
+    r'\bwhen\b.+\b(is|are|drops|exceeds|falls|rises|reaches|changes)\b.*\b(send|notify|alert|email|trigger)\b',
+    r'\bonly if\b',
+    r'\bunless\b',
+    r'\bin case\b',
+]
+
+# Verbs that modify workflow structure when paired with a workflow object
+MODIFICATION_VERBS = ['add', 'remove', 'delete', 'update', 'modify', 'change', 'insert',
+                      'create', 'connect', 'replace', 'attach', 'append', 'edit']
+WORKFLOW_OBJECTS = ('node|edge|step|notification|alert|email|webhook|condition|logic|'
+                    'configuration|config|branch|workflow|trigger')
+
+STRUCTURE_WEIGHT = 2.0
+QUESTION_WEIGHT = 1.0
+
+
+def _build_keyword_database():
+    """Compile all keyword lists into one multi-pattern scanner.
+
+    Each keyword becomes a named group ``k<id>`` in a single alternation, so
+    one ``finditer`` pass over the prompt reports every keyword hit and the
+    group id maps back to (category, weight, keyword).
+
+    Returns:
+        Tuple of (compiled pattern, id table)
+    """
+    entries = [('patch', w, kw) for kw, w in PATCH_KEYWORDS] + \
+              [('execute', w, kw) for kw, w in EXECUTE_KEYWORDS]
+    # Longest first so multi-word keywords win over their prefixes
+    entries.sort(key=lambda e: len(e[2]), reverse=True)
+
+    alternatives = []
+    for i, (_, _, kw) in enumerate(entries):
+        body = re.escape(kw).replace(r'\ ', r'\s+')
+        alternatives.append(f"(?P<k{i}>{body})")
+    pattern = re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b', re.IGNORECASE)
+    return pattern, {f"k{i}": entry for i, entry in enumerate(entries)}
+
+
+_KEYWORD_DB, _KEYWORD_IDS = _build_keyword_database()
+
+
+def _build_keyword_automaton():
+    """Build an Aho-Corasick automaton over all keywords.
+
+    Finds every keyword in O(len(prompt) + matches) in one C-level pass.
+
+    Returns:
+        Automaton, or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for category, keywords in (('patch', PATCH_KEYWORDS), ('execute', EXECUTE_KEYWORDS)):
+        for keyword, weight in keywords:
+            automaton.add_word(keyword, (category, weight, keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+def _scan_keywords(prompt_lower: str):
+    """Yield (category, weight, keyword) for each whole-word keyword hit.
+
+    Args:
+        prompt_lower: Lowercased prompt
+
+    Yields:
+        Keyword hits from the Aho-Corasick automaton (or the regex scanner)
+    """
+    if _KEYWORD_AUTOMATON is None:
+        for match in _KEYWORD_DB.finditer(prompt_lower):
+            yield _KEYWORD_IDS[match.lastgroup]
+        return
+
+    # Collapse whitespace so multi-word keywords match across line breaks
+    text = ' '.join(prompt_lower.split())
+    last = len(text) - 1
+    for end, hit in _KEYWORD_AUTOMATON.iter(text):
+        start = end - len(hit[2]) + 1
+        if start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if end < last and _is_word_char(text[end + 1]):
+            continue
+        yield hit
+
+# Structural rules, compiled once at import instead of per classify() call
+_ACTION_RES = {t: re.compile(rf'\b{t}\b.*?\b({ACTION_VERBS})\b') for t in TEMPORAL_PATCH}
+_CONDITIONAL_RES = [re.compile(p) for p in CONDITIONAL_PATTERNS]
+_MOD_VERB_RES = {v: re.compile(rf'\b{v}\b.*\b({WORKFLOW_OBJECTS})') for v in MODIFICATION_VERBS}
+
+
+def score_keywords(prompt: str) -> Classification:
+    """Score a prompt with keyword and pattern rules.
+
+    Args:
+        prompt: User's natural language prompt
+
+    Returns:
+        Classification (same shape as IntentClassifier.classify)
+    """
+    prompt_lower = prompt.lower()
+    scores = {'patch': 0.0, 'execute': 0.0}
+    matched = {'patch': [], 'execute': []}
+
+    # Single pass over the prompt for all keywords
+    for category, weight, keyword in _scan_keywords(prompt_lower):
+        if keyword not in matched[category]:
+            scores[category] += weight
+            matched[category].append(keyword)
+
+    # Temporal word followed by an action ("when X, send Y")
+    for temporal, action_re in _ACTION_RES.items():
+        if action_re.search(prompt_lower):
+            scores['patch'] += STRUCTURE_WEIGHT
+            matched['patch'].append(temporal)
+
+    # Conditional rules
+    for conditional_re in _CONDITIONAL_RES:
+        if conditional_re.search(prompt_lower):
+            scores['patch'] += STRUCTURE_WEIGHT
+            matched['patch'].append('conditional')
+            break
+
+    # Workflow modification ("add ... node", "remove the ... step")
+    for verb, mod_re in _MOD_VERB_RES.items():
+        if mod_re.search(prompt_lower):
+            scores['patch'] += STRUCTURE_WEIGHT
+            matched['patch'].append(verb)
+
+    # Questions ask for data
+    if '?' in prompt:
+        scores['execute'] += QUESTION_WEIGHT
+        matched['execute'].append('question')
+
+    patch_score, execute_score = scores['patch'], scores['execute']
+    total = patch_score + execute_score
+
+    if total == 0 or patch_score == execute_score:
+        intent = 'unclear'
+        confidence = 0.0 if total == 0 else 0.5
+    else:
+        intent = 'patch' if patch_score > execute_score else 'execute'
+        winner = max(patch_score, execute_score)
+        # Share of the evidence, scaled down when the evidence itself is thin
+        confidence = min(0.95, (winner / total) * min(1.0, 0.5 + 0.25 * winner))
+
+    return Classification(
+        intent=intent,
+        confidence=round(confidence, 2),
+        reasoning=f"Keyword match: patch={patch_score:.1f}, execute={execute_score:.1f}",
+        matched_keywords=matched,
+        scores=scores
+    )
+
+
+# Keyword results per prompt: retried and fanned-out jobs repeat the same task.
+# Scoring ignores the context, so the prompt alone is the key.
+_score_keywords_cached = functools.lru_cache(maxsize=_CLASSIFY_CACHE_MAXSIZE)(score_keywords)
+
+
+# Intent definitions shared by the single and batched classifier prompts
+_CLASSIFIER_INSTRUCTIONS = """You are an intent classifier for a workflow automation system. Your job is to determine the user's intent:
 
 1. **patch** - User wants to permanently modify the workflow structure (add/remove/update nodes, edges, logic)
    - Examples: "add a node that...", "modify the workflow to...", "remove the X node", "change the condition to..."
@@ -57,66 +324,309 @@ class IntentClassifier:
 
 3. **unclear** - Cannot determine intent with confidence
 
-Respond ONLY with a JSON object in this exact format:
+"""
+
+# System prompt for LLM intent classification ("intent" first so it can be streamed).
+# No free-text reasoning: output tokens dominate latency, so the response stays ~15 tokens.
+CLASSIFIER_SYSTEM_PROMPT = _CLASSIFIER_INSTRUCTIONS + """Respond ONLY with {"intent": "patch|execute|unclear", "confidence": 0.0-1.0}"""
+
+# Debug variant that also asks the model to explain its choice
+CLASSIFIER_SYSTEM_PROMPT_WITH_REASONING = _CLASSIFIER_INSTRUCTIONS + """Respond ONLY with a JSON object in this exact format:
 {
   "intent": "patch|execute|unclear",
   "confidence": 0.0-1.0,
   "reasoning": "brief explanation"
 }"""
 
-            user_message = f"User prompt: {prompt}{context_info}\n\nClassify the intent."
+# Matches the intent label in a partially streamed JSON response
+_STREAMED_INTENT_RE = re.compile(r'"intent"\s*:\s*"(patch|execute|unclear)"')
 
-            # Call OpenAI with JSON mode
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3,  # Low temperature for consistent classification
-                max_tokens=150
-            )
+# System prompt for classifying several coalesced prompts in one request
+BATCH_CLASSIFIER_SYSTEM_PROMPT = _CLASSIFIER_INSTRUCTIONS + """You will receive several numbered prompts. Classify each one independently.
+
+Respond ONLY with {"results": [{"id": 0, "intent": "patch|execute|unclear", "confidence": 0.0-1.0}, ...]}"""
+
+# System prompt for one-token classification (output constrained via logit_bias)
+LETTER_CLASSIFIER_SYSTEM_PROMPT = _CLASSIFIER_INSTRUCTIONS + """Reply with one letter: p=patch, e=execute, u=unclear"""
+
+_LETTER_INTENTS = {'p': 'patch', 'e': 'execute', 'u': 'unclear'}
+
+
+@functools.lru_cache(maxsize=8)
+def _intent_logit_bias(model: str) -> Optional[Dict[str, int]]:
+    """Build a logit_bias restricting output to the intent letters.
+
+    Args:
+        model: OpenAI model name (selects the tokenizer)
+
+    Returns:
+        Token id -> bias map, or None if tiktoken (or its encoding) is unavailable
+    """
+    if tiktoken is None:
+        return None
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning(f"One-token intent classification disabled: no tokenizer for {model}: {e}")
+        return None
+
+    bias = {}
+    for letter in _LETTER_INTENTS:
+        for text in (letter, f" {letter}"):
+            token_ids = encoding.encode(text)
+            if len(token_ids) == 1:
+                bias[str(token_ids[0])] = 100
+    return bias
+
+
+def _letter_confidence(top_logprobs) -> float:
+    """Confidence from the normalized entropy over the intent letters.
+
+    Args:
+        top_logprobs: Top alternatives for the single output token
+
+    Returns:
+        1 - H(p) / log(3), in [0, 1]
+    """
+    probs: Dict[str, float] = {}
+    for alt in top_logprobs:
+        letter = alt.token.strip().lower()
+        if letter in _LETTER_INTENTS:
+            probs[letter] = probs.get(letter, 0.0) + math.exp(alt.logprob)
+
+    total = sum(probs.values())
+    if total <= 0:
+        return 0.0
+    entropy = -sum((p / total) * math.log(p / total) for p in probs.values() if p > 0)
+    return round(max(0.0, 1.0 - entropy / math.log(len(_LETTER_INTENTS))), 2)
+
+
+# Output token budgets (reasoning adds 50-120 tokens)
+_MAX_TOKENS = 20
+_MAX_TOKENS_WITH_REASONING = 150
+_MAX_TOKENS_PER_BATCH_ITEM = 25
+
+
+def _workflow_context(context: Optional[Dict[str, Any]]):
+    """Summarize the current workflow for the classifier prompt.
+
+    Args:
+        context: Optional context information
+
+    Returns:
+        Tuple of (context_info suffix, node_count, edge_count)
+    """
+    if not context or not context.get('current_workflow'):
+        return "", 0, 0
+    workflow = context['current_workflow']
+    node_count = len(workflow.get('nodes', []))
+    edge_count = len(workflow.get('edges', []))
+    return f"\n\nCurrent workflow context: {node_count} nodes, {edge_count} edges", node_count, edge_count
+
+
+def _to_classification(result: Dict[str, Any]) -> Classification:
+    """Validate and normalize a raw LLM/local-model result.
+
+    Args:
+        result: Parsed result with intent and optionally confidence/reasoning
+
+    Returns:
+        Classification (matched_keywords stay empty for model-based results)
+    """
+    if 'intent' not in result or result['intent'] not in ['patch', 'execute', 'unclear']:
+        logger.warning(f"Invalid intent from LLM: {result.get('intent')}, defaulting to unclear")
+        result['intent'] = 'unclear'
+        result['confidence'] = 0.0
+        result['reasoning'] = "LLM returned invalid intent"
+
+    return Classification(
+        intent=result['intent'],
+        confidence=result.get('confidence', 0.5),
+        reasoning=result.get('reasoning') or f"LLM classified as {result['intent']}",
+        scores={
+            'patch': 1.0 if result['intent'] == 'patch' else 0.0,
+            'execute': 1.0 if result['intent'] == 'execute' else 0.0
+        }
+    )
+
+
+class IntentClassifier:
+    """Classifies user intent as 'patch' (permanent) or 'execute' (one-time).
+
+    Cascade: keyword scoring answers confident prompts in well under a
+    millisecond; only ambiguous prompts escalate to the caches, local model
+    and LLM.
+    """
+
+    def __init__(self, use_llm_fallback: bool = True, keyword_threshold: float = 0.7,
+                 max_concurrent_requests: int = 32,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 batch_window_ms: float = 10.0, max_batch_size: int = 16,
+                 include_reasoning: bool = False,
+                 local_model: Optional[LocalIntentModel] = None, local_threshold: float = 0.7):
+        """Initialize intent classifier.
+
+        Args:
+            use_llm_fallback: Escalate low-confidence keyword results to the LLM
+            keyword_threshold: Minimum keyword confidence to skip the LLM
+            max_concurrent_requests: Cap on in-flight classification requests
+            semantic_cache: Optional paraphrase cache, defaults to SemanticCache.from_env()
+            batch_window_ms: Window for coalescing concurrent calls into one request (0 disables)
+            max_batch_size: Maximum prompts per batched request
+            include_reasoning: Ask the LLM for a free-text reasoning (debugging only, slower)
+            local_model: Optional distilled ONNX classifier, defaults to LocalIntentModel.from_env()
+            local_threshold: Minimum local model probability to skip the LLM
+        """
+        self.use_llm_fallback = use_llm_fallback
+        self.keyword_threshold = keyword_threshold
+        self._classified = 0
+        self._escalated = 0
+
+        if not use_llm_fallback:
+            logger.info("Intent classifier initialized (keywords only)")
+            return
+
+        try:
+            self.client = get_client()  # Shared client, uses OPENAI_API_KEY env var
+        except OpenAIError as e:
+            logger.warning(f"LLM intent fallback disabled, using keywords only: {e}")
+            self.use_llm_fallback = False
+            return
+
+        self.model = "gpt-4o-mini"  # Fast and cheap model for classification
+        self._sem = asyncio.Semaphore(max_concurrent_requests)
+        self._semantic_cache = semantic_cache if semantic_cache is not None else SemanticCache.from_env()
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.include_reasoning = include_reasoning
+        self._local_model = local_model if local_model is not None else LocalIntentModel.from_env()
+        self.local_threshold = local_threshold
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._batch_tasks = set()
+        logger.info(f"Intent classifier initialized with LLM fallback below confidence {keyword_threshold}")
+
+    @property
+    def escalation_rate(self) -> float:
+        """Fraction of classifications escalated past keyword scoring (for tuning keyword_threshold)."""
+        return self._escalated / self._classified if self._classified else 0.0
 
-            # Parse JSON response
-            result_text = response.choices[0].message.content
-            result = json.loads(result_text)
+    def classify(self, prompt: str, context: Dict[str, Any] = None) -> Classification:
+        """Classify user intent.
 
-            # Validate and normalize result
-            if 'intent' not in result or result['intent'] not in ['patch', 'execute', 'unclear']:
-                logger.warning(f"Invalid intent from LLM: {result.get('intent')}, defaulting to unclear")
-                result['intent'] = 'unclear'
-                result['confidence'] = 0.0
-                result['reasoning'] = "LLM returned invalid intent"
+        Args:
+            prompt: User's natural language prompt
+            context: Optional context information
+
+        Returns:
+            Classification with intent, confidence, reasoning, matched_keywords, scores
+        """
+        keyword_result = self._classify_keywords(prompt)
+        if not self._should_escalate(keyword_result):
+            return keyword_result
+        # Sync bridge for thread-based callers
+        return run_sync(self._classify_llm(prompt, context, keyword_result))
+
+    async def aclassify(self, prompt: str, context: Dict[str, Any] = None) -> Classification:
+        """Classify user intent (async).
+
+        Args:
+            prompt: User's natural language prompt
+            context: Optional context information
+
+        Returns:
+            Classification with intent, confidence, reasoning, matched_keywords, scores
+        """
+        keyword_result = self._classify_keywords(prompt)
+        if not self._should_escalate(keyword_result):
+            return keyword_result
+        return await self._classify_llm(prompt, context, keyword_result)
+
+    def classify_batch(self, prompts: List[str], context: Dict[str, Any] = None,
+                       deadline_s: Optional[float] = 3600) -> List[Classification]:
+        """Classify many prompts via the OpenAI Batch API (offline evaluations, replays).
 
-            if 'confidence' not in result:
-                result['confidence'] = 0.5
+        Confident keyword results are returned directly; the rest go into one
+        batch job. Anything not finished by the deadline is reissued online.
 
-            if 'reasoning' not in result:
-                result['reasoning'] = "No reasoning provided"
+        Args:
+            prompts: User prompts
+            context: Optional context shared by all prompts
+            deadline_s: Seconds to wait for the batch before falling back online
+
+        Returns:
+            Classification per prompt
+        """
+        return run_sync(self.aclassify_batch(prompts, context, deadline_s))
 
-            # Add metadata for backward compatibility
-            result['matched_keywords'] = {'patch': [], 'execute': []}  # Empty for LLM-based classification
-            result['scores'] = {
-                'patch': 1.0 if result['intent'] == 'patch' else 0.0,
-                'execute': 1.0 if result['intent'] == 'execute' else 0.0
-            }
+    async def aclassify_batch(self, prompts: List[str], context: Dict[str, Any] = None,
+                              deadline_s: Optional[float] = 3600) -> List[Classification]:
+        """Async version of classify_batch()."""
+        results = [self._classify_keywords(prompt) for prompt in prompts]
+        escalated = [i for i, result in enumerate(results) if self._should_escalate(result)]
+        if not escalated:
+            return results
 
-            logger.info(f"Intent classified by LLM: {result['intent']} (confidence: {result['confidence']:.2f}) - {result['reasoning']}")
-            return result
+        context_info, node_count, edge_count = _workflow_context(context)
+        bodies = [{
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": CLASSIFIER_SYSTEM_PROMPT},
+                {"role": "user", "content": f"User prompt: {prompts[i]}{context_info}\n\nClassify the intent."}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3,
+            "max_tokens": _MAX_TOKENS
+        } for i in escalated]
 
+        try:
+            completed = await run_batch(self.client, bodies, deadline_s=deadline_s)
         except Exception as e:
-            logger.error(f"Failed to classify intent with LLM: {e}", exc_info=True)
-            # Fallback to unclear with low confidence
-            return {
-                'intent': 'unclear',
-                'confidence': 0.0,
-                'reasoning': f"Classification failed: {str(e)}",
-                'matched_keywords': {'patch': [], 'execute': []},
-                'scores': {'patch': 0.0, 'execute': 0.0}
-            }
-
-    def should_constrain_tools(self, classification: Dict[str, Any], threshold: float = 0.7) -> bool:
+            logger.error(f"Batch intent classification failed, classifying online: {e}")
+            completed = {}
+
+        async def resolve(j: int, i: int) -> Classification:
+            if j in completed:
+                try:
+                    raw = json_codec.loads(completed[j]['choices'][0]['message']['content'])
+                    classification = _to_classification(raw)
+                    if classification.intent != 'unclear':
+                        _cache_put(_cache_key(prompts[i], node_count, edge_count), classification)
+                    return classification
+                except Exception as e:
+                    logger.warning(f"Unparseable batch result for prompt {i}, classifying online: {e}")
+            return await self._classify_llm(prompts[i], context, results[i])
+
+        resolved = await asyncio.gather(*(resolve(j, i) for j, i in enumerate(escalated)))
+        for i, classification in zip(escalated, resolved):
+            results[i] = classification
+        return results
+
+    def _classify_keywords(self, prompt: str) -> Classification:
+        """Classify user intent from prompt using keyword scoring.
+
+        Args:
+            prompt: User's natural language prompt
+
+        Returns:
+            Keyword-based Classification
+        """
+        result = _score_keywords_cached(prompt).copy()
+        logger.info(f"Intent classified by keywords: {result.intent} (confidence: {result.confidence:.2f})")
+        return result
+
+    def _should_escalate(self, keyword_result: Classification) -> bool:
+        """Decide whether a keyword result needs the LLM, updating escalation counters."""
+        self._classified += 1
+        if not self.use_llm_fallback:
+            return False
+        if keyword_result.intent != 'unclear' and keyword_result.confidence >= self.keyword_threshold:
+            return False
+        self._escalated += 1
+        logger.debug(f"Escalating intent classification to LLM (escalation rate {self.escalation_rate:.2f})")
+        return True
+
+    def should_constrain_tools(self, classification: Classification, threshold: float = 0.7) -> bool:
         """Determine if we should constrain LLM to specific tool based on classification.
 
         Args:
@@ -126,13 +636,13 @@ Respond ONLY with a JSON object in this exact format:
         Returns:
             True if we should constrain LLM tool choice
         """
-        intent = classification['intent']
-        confidence = classification['confidence']
+        intent = classification.intent
+        confidence = classification.confidence
 
         # Only constrain if we have high confidence and clear intent
         return intent != 'unclear' and confidence >= threshold
 
-    def get_allowed_tools(self, classification: Dict[str, Any]) -> List[str]:
+    def get_allowed_tools(self, classification: Classification) -> List[str]:
         """Get list of allowed tools based on classification.
 
         Args:
@@ -141,7 +651,7 @@ Respond ONLY with a JSON object in this exact format:
         Returns:
             List of tool names to allow
         """
-        intent = classification['intent']
+        intent = classification.intent
 
         if intent == 'patch':
             return ['patch_workflow']
@@ -150,3 +660,300 @@ Respond ONLY with a JSON object in this exact format:
         else:
             # Unclear - allow both
             return ['execute_pipeline', 'patch_workflow']
+
+    async def _classify_llm(self, prompt: str, context: Optional[Dict[str, Any]],
+                            keyword_result: Classification) -> Classification:
+        """Classify an ambiguous prompt via caches, the local model, then the LLM.
+
+        Args:
+            prompt: User's natural language prompt
+            context: Optional context information
+            keyword_result: Low-confidence keyword result (returned if the LLM fails)
+
+        Returns:
+            Classification
+        """
+        try:
+            # Build context information for LLM
+            context_info, node_count, edge_count = _workflow_context(context)
+
+            # Exact-match cache (same prompt + same workflow size)
+            cache_key = _cache_key(prompt, node_count, edge_count)
+            cached = _cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"Intent classification cache hit: {cached['intent']} (confidence: {cached['confidence']:.2f})")
+                return cached
+
+            # Semantic cache (paraphrased prompts); embedding is CPU-bound so run it off the loop
+            query_vec = None
+            if self._semantic_cache is not None:
+                loop = asyncio.get_running_loop()
+                query_vec = await loop.run_in_executor(None, self._semantic_cache.embed, prompt + context_info)
+                cached = self._semantic_cache.lookup(query_vec)
+                if cached is not None:
+                    logger.info(f"Intent classification semantic cache hit: {cached['intent']} (confidence: {cached['confidence']:.2f})")
+                    return cached
+
+            # Local distilled model (~ms on CPU); only confident predictions skip the LLM
+            result = None
+            if self._local_model is not None:
+                loop = asyncio.get_running_loop()
+                intent, prob = await loop.run_in_executor(None, self._local_model.predict, prompt + context_info)
+                if prob >= self.local_threshold:
+                    result = {'intent': intent, 'confidence': round(prob, 2),
+                              'reasoning': f"Local model classified as {intent}"}
+                else:
+                    logger.debug(f"Local model unsure ({intent}, {prob:.2f}), falling back to LLM")
+
+            if result is None:
+                user_prompt = f"User prompt: {prompt}{context_info}"
+                if self.batch_window > 0 and self.max_batch_size > 1:
+                    result = await self._enqueue(user_prompt)
+                else:
+                    result = await self._classify_single(user_prompt)
+
+            classification = _to_classification(result)
+
+            logger.info(f"Intent classified: {classification.intent} (confidence: {classification.confidence:.2f}) - {classification.reasoning}")
+
+            # Don't cache unclear results so they can be retried
+            if classification.intent != 'unclear':
+                _cache_put(cache_key, classification)
+            if query_vec is not None:
+                self._semantic_cache.add(query_vec, classification)
+
+            return classification
+
+        except Exception as e:
+            logger.error(f"Failed to classify intent with LLM, using keyword result: {e}", exc_info=True)
+            return keyword_result
+
+    async def _classify_single(self, user_prompt: str) -> Dict[str, Any]:
+        """Classify one prompt with its own LLM request.
+
+        Args:
+            user_prompt: Formatted prompt (with workflow context)
+
+        Returns:
+            Raw (unnormalized) LLM result
+        """
+        if self.include_reasoning:
+            system_prompt, max_tokens = CLASSIFIER_SYSTEM_PROMPT_WITH_REASONING, _MAX_TOKENS_WITH_REASONING
+        else:
+            # Primary path: a single decoded token
+            logit_bias = _intent_logit_bias(self.model)
+            if logit_bias:
+                result = await self._classify_one_token(user_prompt, logit_bias)
+                if result is not None:
+                    return result
+            system_prompt, max_tokens = CLASSIFIER_SYSTEM_PROMPT, _MAX_TOKENS
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{user_prompt}\n\nClassify the intent."}
+        ]
+
+        # Stream and stop as soon as the intent label is decidable;
+        # fall back to the full JSON response if it can't be parsed early
+        result = await self._classify_streamed(messages)
+        if result is None:
+            result = await self._classify_json(messages, max_tokens)
+        return result
+
+    async def _classify_one_token(self, user_prompt: str, logit_bias: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Classify with one output token constrained to p/e/u.
+
+        Args:
+            user_prompt: Formatted prompt (with workflow context)
+            logit_bias: Bias map from _intent_logit_bias()
+
+        Returns:
+            Raw result with entropy-based confidence, or None on failure
+        """
+        try:
+            async with self._sem:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": LETTER_CLASSIFIER_SYSTEM_PROMPT},
+                        {"role": "user", "content": f"{user_prompt}\n\nClassify the intent."}
+                    ],
+                    logit_bias=logit_bias,
+                    max_tokens=1,
+                    temperature=0,
+                    logprobs=True,
+                    top_logprobs=3
+                )
+
+            choice = response.choices[0]
+            letter = (choice.message.content or "").strip().lower()[:1]
+            intent = _LETTER_INTENTS.get(letter)
+            if intent is None:
+                logger.warning(f"Unexpected one-token intent response: {choice.message.content!r}")
+                return None
+
+            confidence = 0.0
+            if choice.logprobs and choice.logprobs.content:
+                confidence = _letter_confidence(choice.logprobs.content[0].top_logprobs)
+            return {'intent': intent, 'confidence': confidence}
+        except Exception as e:
+            logger.warning(f"One-token intent classification failed, falling back: {e}")
+            return None
+
+    async def _enqueue(self, user_prompt: str) -> Dict[str, Any]:
+        """Queue a prompt for the micro-batcher and wait for its result.
+
+        Args:
+            user_prompt: Formatted prompt (with workflow context)
+
+        Returns:
+            Raw (unnormalized) LLM result
+        """
+        loop = asyncio.get_running_loop()
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+
+        future = loop.create_future()
+        self._batch_queue.put_nowait((user_prompt, future))
+
+        # The batcher exits once the queue drains, so restart it on demand
+        if self._batcher is None or self._batcher.done():
+            self._batcher = loop.create_task(self._run_batcher())
+        return await future
+
+    async def _run_batcher(self):
+        """Coalesce prompts arriving within the batch window and dispatch them."""
+        while not self._batch_queue.empty():
+            batch = [self._batch_queue.get_nowait()]
+            await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch_size and not self._batch_queue.empty():
+                batch.append(self._batch_queue.get_nowait())
+
+            task = asyncio.get_running_loop().create_task(self._dispatch_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch_batch(self, batch: List[Any]):
+        """Classify a batch and resolve each caller's future.
+
+        Single prompts use the regular streamed path; larger batches share one
+        request, and any prompt missing from the batched response is retried alone.
+
+        Args:
+            batch: List of (user_prompt, future) tuples
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        if len(batch) > 1:
+            try:
+                results = await self._classify_batch([user_prompt for user_prompt, _ in batch])
+            except Exception as e:
+                logger.warning(f"Batched intent classification failed, retrying individually: {e}")
+
+        async def resolve(item, result):
+            user_prompt, future = item
+            try:
+                if result is None:
+                    result = await self._classify_single(user_prompt)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+        await asyncio.gather(*(resolve(item, result) for item, result in zip(batch, results)))
+
+    async def _classify_batch(self, user_prompts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Classify several prompts in a single LLM request.
+
+        Args:
+            user_prompts: Formatted prompts (with workflow context)
+
+        Returns:
+            Raw result per prompt (None where the response had no usable entry)
+        """
+        numbered = "\n\n".join(f"[{i}] {user_prompt}" for i, user_prompt in enumerate(user_prompts))
+        async with self._sem:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": BATCH_CLASSIFIER_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{numbered}\n\nClassify the intent of each prompt."}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=_MAX_TOKENS_PER_BATCH_ITEM * len(user_prompts)
+            )
+
+        entries = json_codec.loads(response.choices[0].message.content).get('results', [])
+        results: List[Optional[Dict[str, Any]]] = [None] * len(user_prompts)
+        for entry in entries:
+            idx = entry.pop('id', None) if isinstance(entry, dict) else None
+            if isinstance(idx, int) and 0 <= idx < len(results):
+                results[idx] = entry
+
+        logger.info(f"Classified {len(user_prompts)} prompts in one batched request")
+        return results
+
+    async def _classify_streamed(self, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Stream the classification and short-circuit once the intent token appears.
+
+        Args:
+            messages: Chat messages for the classifier
+
+        Returns:
+            Partial result with intent (confidence synthesized), or None if
+            the intent could not be parsed from the stream
+        """
+        try:
+            async with self._sem:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=0.3,
+                    max_tokens=_MAX_TOKENS,
+                    stream=True
+                )
+                buffer = ""
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        buffer += delta
+                        match = _STREAMED_INTENT_RE.search(buffer)
+                        if match:
+                            return {'intent': match.group(1), 'confidence': 0.9}
+                finally:
+                    await stream.close()
+        except Exception as e:
+            logger.warning(f"Streamed intent classification failed, falling back: {e}")
+            return None
+
+        logger.warning(f"Intent not found in streamed response: {buffer[:100]}")
+        return None
+
+    async def _classify_json(self, messages: List[Dict[str, str]], max_tokens: int = _MAX_TOKENS) -> Dict[str, Any]:
+        """Request the full JSON classification (non-streamed).
+
+        Args:
+            messages: Chat messages for the classifier
+            max_tokens: Output token budget
+
+        Returns:
+            Parsed JSON result
+        """
+        # Call OpenAI with JSON mode
+        async with self._sem:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.3,  # Low temperature for consistent classification
+                max_tokens=max_tokens
+            )
+
+        # Parse JSON response
+        result_text = response.choices[0].message.content
+        return json_codec.loads(result_text)
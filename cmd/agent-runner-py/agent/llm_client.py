@@ -1,16 +1,119 @@
 """OpenAI LLM client with prompt caching and connection pooling."""
-from openai import OpenAI
-from typing import Dict, Any, List, Optional
+from openai.types.chat import ChatCompletion
+from typing import Dict, Any, List, Optional, Tuple
+import aiohttp
+import asyncio
+import functools
+import hashlib
 import logging
 import time
-import httpx
 import os
 
-from agent.tools import get_tool_schemas
-from agent.system_prompt import get_system_prompt
+import json_codec
+from agent.tools import get_tool_schemas, get_tool_schemas_json_bytes
+from agent.prompt_bundle import compile_prompt
+from agent.system_prompt import PROMPT_CACHE_MIN_TOKENS, get_encoding, is_cache_safe, render_workflow_section
+from agent.async_runtime import run_sync
+from agent.openai_batch import run_batch
+from agent.openai_client import SSL_CONTEXT, get_client
 
 logger = logging.getLogger(__name__)
 
+# Max rendered workflow sections kept per LLMClient
+WF_RENDER_CACHE_SIZE = 8
+
+# Adaptive output budget: context budget minus prompt tokens and a safety margin
+CONTEXT_TOKEN_BUDGET = 8192
+COMPLETION_TOKEN_MARGIN = 256
+MIN_COMPLETION_TOKENS = 128
+
+
+@functools.lru_cache(maxsize=64)
+def count_tokens(text: str) -> int:
+    """Count prompt tokens (memoized; repeated workflow sections are the same string object).
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Token count (estimated as len/4 without tiktoken)
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class ChatCompletionsAioClient:
+    """Drop-in replacement for `AsyncOpenAI().chat.completions` on aiohttp.
+
+    httpx's pool throttles past ~10 concurrent requests; aiohttp's connector
+    scales to hundreds of sockets, so this is used under high concurrency.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """Initialize aiohttp chat completions client.
+
+        Args:
+            api_key: OpenAI API key, defaults to OPENAI_API_KEY env var
+            base_url: API base URL, defaults to OPENAI_BASE_URL or api.openai.com
+        """
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = (base_url or os.getenv('OPENAI_BASE_URL') or 'https://api.openai.com/v1').rstrip('/')
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the pooled session (created lazily on the running loop)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=100,
+                keepalive_timeout=300,
+                ssl=SSL_CONTEXT
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def create(self, timeout: Optional[float] = None, **kwargs) -> ChatCompletion:
+        """POST to /chat/completions and parse the response into a ChatCompletion.
+
+        Args:
+            timeout: Request timeout in seconds
+            **kwargs: Request body (model, messages, tools, ...)
+
+        Returns:
+            Parsed ChatCompletion
+        """
+        # Splice in the pre-encoded tool schemas instead of re-serializing them
+        tools = kwargs.pop('tools', None)
+        body = json_codec.dumps(kwargs)
+        if tools is not None:
+            tools_json = next(
+                (get_tool_schemas_json_bytes(verbose) for verbose in (True, False) if tools is get_tool_schemas(verbose)),
+                None
+            ) or json_codec.dumps(tools)
+            body = b''.join((body[:-1], b',"tools":' if len(body) > 2 else b'"tools":', tools_json, b'}'))
+
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}/chat/completions",
+            data=body,
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as resp:
+            if resp.status >= 400:
+                body = await resp.text()
+                logger.error(f"Chat completion failed: status={resp.status}, body={body[:500]}")
+                resp.raise_for_status()
+            data = json_codec.loads(await resp.read())
+
+        return ChatCompletion.model_validate(data)
+
+    async def close(self):
+        """Close the underlying aiohttp session."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
 
 class LLMClient:
     """OpenAI client with function calling, prompt caching, and connection pooling."""
@@ -28,40 +131,57 @@ class LLMClient:
         self.model = 'gpt-5-mini'
         self.temperature = 1
         self.max_tokens = config.get('max_tokens', 4000)
+        self.context_budget = config.get('context_token_budget', CONTEXT_TOKEN_BUDGET)
         self.timeout = config.get('timeout_sec', 30)
 
-        # Configure HTTP client with connection pooling
-        # Reuses TCP connections to reduce latency (saves 100-300ms per request)
-        #
-        # TODO: FIX SSL VERIFICATION FOR PRODUCTION!
-        # Temporary workaround: SSL verification disabled for development
-        # This is needed because certifi bundle path is incorrect in Docker
-        # For production, must fix certificate path or use proper SSL context
-        logger.warning("SSL verification is DISABLED - this is a temporary workaround for development")
-
-        http_client = httpx.Client(
-            limits=httpx.Limits(
-                max_connections=100,  # Max concurrent connections
-                max_keepalive_connections=20,  # Keep 20 connections warm
-                keepalive_expiry=300  # Keep alive for 5 minutes
-            ),
-            timeout=self.timeout,
-            verify=False  # TEMPORARY: Disable SSL verification
+        # Shared async OpenAI client (one connection pool per process)
+        self.client = get_client()
+
+        # Transport for chat completions: "httpx" (OpenAI SDK) or "aiohttp"
+        self.transport = config.get('transport', 'httpx')
+        if self.transport == 'aiohttp':
+            self._completions = ChatCompletionsAioClient()
+        else:
+            self._completions = self.client.chat.completions
+
+        # Cap in-flight requests to stay under provider rate limits
+        self._sem = asyncio.Semaphore(config.get('max_concurrent_requests', 32))
+
+        # Static system prompt prefix and tool schemas, compiled once per settings (see compile_prompt)
+        # The prefix must be byte-identical across calls; only the workflow section is appended per request
+        self.verbose_tool_hints = os.getenv('VERBOSE_TOOL_HINTS') == '1' or config.get('verbose_patch_tool', False)
+        self.prompt_bundle = compile_prompt(
+            self.model, workflow_schema_summary,
+            verbose_tools=self.verbose_tool_hints,
+            cache_align=config.get('cache_align_prompt', False)
         )
+        self._system_prefix = self.prompt_bundle.system_prefix
+        self._system_prefix_hash = self.prompt_bundle.system_prefix_hash
+        self._system_tokens = self.prompt_bundle.system_tokens
+        self.tools = self.prompt_bundle.tools
+        self.current_workflow = current_workflow
 
-        # Initialize OpenAI client with connection pooling
-        self.client = OpenAI(http_client=http_client)
+        # Full system prompts keyed by workflow hash (the workflow rarely changes between turns)
+        self._wf_render_cache: Dict[str, Tuple[str, int]] = {}
+        logger.info(f"System prompt prefix: {self._system_tokens} tokens, sha256 {self._system_prefix_hash[:12]}")
+        if self._system_tokens < PROMPT_CACHE_MIN_TOKENS:
+            logger.warning(f"System prompt prefix is below {PROMPT_CACHE_MIN_TOKENS} tokens; OpenAI will not cache it")
 
-        # System prompt with workflow context (cached by OpenAI if >1024 tokens)
-        # OpenAI automatically caches the prefix when same prompt is reused
-        self.system_prompt = get_system_prompt(workflow_schema_summary, current_workflow)
+        logger.info(f"LLM client initialized with model: {self.model}, transport: {self.transport}, connection pooling enabled")
 
-        # Tool schemas
-        self.tools = get_tool_schemas()
+    def chat(self, user_prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send chat request to LLM (sync wrapper around achat for thread-based callers).
 
-        logger.info(f"LLM client initialized with model: {self.model}, connection pooling enabled")
+        Args:
+            user_prompt: User's natural language instruction
+            context: Optional context (previous results, session info, current_workflow)
 
-    def chat(self, user_prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        Returns:
+            Dictionary with tool calls and metadata
+        """
+        return run_sync(self.achat(user_prompt, context))
+
+    async def achat(self, user_prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send chat request to LLM with function calling.
 
         Args:
@@ -72,80 +192,166 @@ class LLMClient:
             Dictionary with tool calls and metadata
         """
         start_time = time.time()
+        request = self._build_request(user_prompt, context)
 
-        # Rebuild system prompt with current workflow if provided (for caching)
-        # OpenAI caches the system prompt prefix - if workflow doesn't change, cache hit!
-        system_prompt = self.system_prompt
-        if context and context.get('current_workflow'):
-            system_prompt = get_system_prompt(
-                workflow_schema_summary=None,  # Already in base prompt
-                current_workflow=context['current_workflow']
-            )
-            # Prepend the base prompt (without workflow schema to avoid duplication)
-            base = self.system_prompt.split('\n\n## Current Workflow Structure')[0]
-            system_prompt = base + "\n\n## Current Workflow Structure\n" + system_prompt.split('\n\n## Current Workflow Structure\n')[-1]
+        try:
+            logger.info(f"Calling OpenAI with prompt: {user_prompt[:100]}...")
+
+            async with self._sem:
+                response = await self._completions.create(timeout=self.timeout, **request)
+
+            return self._parse_response(response, start_time)
+
+        except Exception as e:
+            logger.error(f"LLM request failed: {e}")
+            raise
+
+    def chat_batch(self, prompts: List[str], context: Optional[Dict[str, Any]] = None,
+                   deadline_s: Optional[float] = 3600) -> List[Dict[str, Any]]:
+        """Run many chat requests through the OpenAI Batch API (50% cheaper, hours of latency).
+
+        For offline workloads (evaluations, backfills, session replays). Requests
+        not finished by the deadline are cancelled and reissued online.
+
+        Args:
+            prompts: User prompts
+            context: Optional context shared by all prompts
+            deadline_s: Seconds to wait for the batch before falling back online
+
+        Returns:
+            Result per prompt (same shape as chat())
+        """
+        return run_sync(self.achat_batch(prompts, context, deadline_s))
+
+    async def achat_batch(self, prompts: List[str], context: Optional[Dict[str, Any]] = None,
+                          deadline_s: Optional[float] = 3600) -> List[Dict[str, Any]]:
+        """Async version of chat_batch()."""
+        start_time = time.time()
+        bodies = [self._build_request(prompt, context) for prompt in prompts]
+        completed = await run_batch(self.client, bodies, deadline_s=deadline_s)
+
+        async def resolve(i: int, prompt: str) -> Dict[str, Any]:
+            if i in completed:
+                return self._parse_response(ChatCompletion.model_validate(completed[i]), start_time)
+            return await self.achat(prompt, context)
+
+        return list(await asyncio.gather(*(resolve(i, prompt) for i, prompt in enumerate(prompts))))
+
+    def _build_request(self, user_prompt: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the chat completions request body.
+
+        Args:
+            user_prompt: User's natural language instruction
+            context: Optional context (previous results, session info, current_workflow)
+
+        Returns:
+            Request kwargs (model, messages, tools, ...)
+        """
+        # Static prefix + current workflow (OpenAI caches the identical prefix)
+        workflow = (context or {}).get('current_workflow') or self.current_workflow
+        system_prompt = self._system_prefix
+        prompt_tokens = self._system_tokens
+        if workflow:
+            system_prompt, workflow_tokens = self._render_workflow(workflow)
+            prompt_tokens += workflow_tokens
+        assert is_cache_safe(system_prompt), "system prompt must start with the static base prompt"
 
         # Build messages
+        user_message = self._build_user_message(user_prompt, context)
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": self._build_user_message(user_prompt, context)}
+            {"role": "user", "content": user_message}
         ]
 
-        try:
-            logger.info(f"Calling OpenAI with prompt: {user_prompt[:100]}...")
+        # Declare only the output budget that fits (smaller reservations schedule faster)
+        prompt_tokens += count_tokens(user_message)
+        max_completion_tokens = max(
+            MIN_COMPLETION_TOKENS,
+            min(self.max_tokens, self.context_budget - prompt_tokens - COMPLETION_TOKEN_MARGIN)
+        )
 
-            response = self.client.chat.completions.create(
-                model='gpt-5-mini',
-                messages=messages,
-                tools=self.tools,
-                tool_choice="auto",
-                temperature=self.temperature,
-                max_completion_tokens=self.max_tokens,
-                timeout=self.timeout
-            )
+        return {
+            "model": 'gpt-5-mini',
+            "messages": messages,
+            "tools": self.tools,
+            "tool_choice": "auto",
+            "temperature": self.temperature,
+            "max_completion_tokens": max_completion_tokens
+        }
 
-            execution_time = int((time.time() - start_time) * 1000)
-
-            # Extract tool calls
-            message = response.choices[0].message
-            tool_calls = []
-
-            if message.tool_calls:
-                for tool_call in message.tool_calls:
-                    tool_calls.append({
-                        "id": tool_call.id,
-                        "function": {
-                            "name": tool_call.function.name,
-                            "arguments": tool_call.function.arguments
-                        }
-                    })
-
-            # Get usage stats
-            usage = response.usage
-            tokens_used = usage.total_tokens if usage else 0
-
-            # Check if cache was hit (OpenAI doesn't expose this directly yet,
-            # but we can infer from prompt_tokens being lower than expected)
-            # For now, we'll set to False and update when OpenAI exposes cache metrics
-            cache_hit = False
-
-            result = {
-                "tool_calls": tool_calls,
-                "message": message.content if message.content else "",
-                "tokens_used": tokens_used,
-                "cache_hit": cache_hit,
-                "execution_time_ms": execution_time,
-                "model": self.model,
-                "finish_reason": response.choices[0].finish_reason
-            }
-
-            logger.info(f"LLM response: {len(tool_calls)} tool calls, {tokens_used} tokens, {execution_time}ms")
-
-            return result
+    def _parse_response(self, response: ChatCompletion, start_time: float) -> Dict[str, Any]:
+        """Extract tool calls and metadata from a chat completion.
 
-        except Exception as e:
-            logger.error(f"LLM request failed: {e}")
-            raise
+        Args:
+            response: Chat completion
+            start_time: Request start (time.time())
+
+        Returns:
+            Dictionary with tool calls and metadata
+        """
+        execution_time = int((time.time() - start_time) * 1000)
+
+        # Extract tool calls
+        message = response.choices[0].message
+        tool_calls = []
+
+        if message.tool_calls:
+            for tool_call in message.tool_calls:
+                tool_calls.append({
+                    "id": tool_call.id,
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments
+                    }
+                })
+
+        # Get usage stats
+        usage = response.usage
+        tokens_used = usage.total_tokens if usage else 0
+
+        # Check if cache was hit (OpenAI doesn't expose this directly yet,
+        # but we can infer from prompt_tokens being lower than expected)
+        # For now, we'll set to False and update when OpenAI exposes cache metrics
+        cache_hit = False
+
+        result = {
+            "tool_calls": tool_calls,
+            "message": message.content if message.content else "",
+            "tokens_used": tokens_used,
+            "cache_hit": cache_hit,
+            "execution_time_ms": execution_time,
+            "model": self.model,
+            "finish_reason": response.choices[0].finish_reason
+        }
+
+        logger.info(f"LLM response: {len(tool_calls)} tool calls, {tokens_used} tokens, {execution_time}ms")
+
+        return result
+
+    def _render_workflow(self, workflow: Dict[str, Any]) -> Tuple[str, int]:
+        """Build the full system prompt (static prefix + workflow section) for a workflow.
+
+        The joined prompt is cached per workflow, so repeated turns on an
+        unchanged workflow reuse one string instead of re-concatenating the prefix.
+
+        Args:
+            workflow: Current workflow structure
+
+        Returns:
+            Tuple of (system prompt, workflow section token count)
+        """
+        wf_key = hashlib.blake2b(
+            json_codec.dumps(workflow, sort_keys=True, default=str), digest_size=16
+        ).hexdigest()
+        rendered = self._wf_render_cache.get(wf_key)
+        if rendered is None:
+            workflow_section = render_workflow_section(workflow)
+            rendered = ("".join((self._system_prefix, workflow_section)), count_tokens(workflow_section))
+            if len(self._wf_render_cache) >= WF_RENDER_CACHE_SIZE:
+                # FIFO eviction (dicts preserve insertion order)
+                del self._wf_render_cache[next(iter(self._wf_render_cache))]
+            self._wf_render_cache[wf_key] = rendered
+        return rendered
 
     def _build_user_message(self, prompt: str, context: Optional[Dict[str, Any]]) -> str:
         """Build user message with context.
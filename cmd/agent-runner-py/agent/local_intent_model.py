@@ -0,0 +1,103 @@
+"""Local distilled intent classifier served with onnxruntime (int8)."""
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LABELS = ["patch", "execute", "unclear"]
+
+
+class LocalIntentModel:
+    """3-way intent classifier (MiniLM encoder + classification head) exported to ONNX.
+
+    The model directory must contain:
+        model.onnx      - int8-quantized export producing logits of shape (batch, num_labels)
+        tokenizer.json  - HuggingFace fast tokenizer
+        labels.json     - optional label order, defaults to ["patch", "execute", "unclear"]
+    """
+
+    def __init__(self, model_dir: str):
+        """Load the ONNX session and tokenizer.
+
+        Args:
+            model_dir: Directory with model.onnx, tokenizer.json and optional labels.json
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=128)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1  # Tiny model; avoid oversubscribing worker threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        labels_path = os.path.join(model_dir, "labels.json")
+        self.labels: List[str] = DEFAULT_LABELS
+        if os.path.exists(labels_path):
+            with open(labels_path, 'rb') as f:
+                self.labels = json_codec.loads(f.read())
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Classify text.
+
+        Args:
+            text: Prompt (with workflow context)
+
+        Returns:
+            Tuple of (intent, softmax probability)
+        """
+        encoding = self.tokenizer.encode(text)
+        feeds = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids], dtype=np.int64)
+
+        logits = self.session.run(None, feeds)[0][0]
+        exp = np.exp(logits - logits.max())
+        probs = exp / exp.sum()
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalIntentModel"]:
+        """Load the model from INTENT_MODEL_DIR.
+
+        Returns:
+            LocalIntentModel, or None if no model is configured or deps are missing
+        """
+        model_dir = os.getenv('INTENT_MODEL_DIR')
+        if not model_dir:
+            return None
+
+        try:
+            model = cls(model_dir)
+        except Exception as e:
+            logger.warning(f"Local intent model disabled: failed to load from {model_dir}: {e}")
+            return None
+
+        logger.info(f"Local intent model loaded from {model_dir} (labels={model.labels})")
+        return model
+
+
+def quantize_model(fp32_path: str, int8_path: str):
+    """Dynamically quantize an exported FP32 ONNX classifier to int8 weights.
+
+    Args:
+        fp32_path: Path to the FP32 model.onnx (e.g. from torch.onnx.export)
+        int8_path: Output path for the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"Quantized {fp32_path} -> {int8_path}")
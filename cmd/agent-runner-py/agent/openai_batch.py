@@ -0,0 +1,80 @@
+"""OpenAI Batch API helper for offline (latency-insensitive) workloads."""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+async def run_batch(client, bodies: List[Dict[str, Any]], deadline_s: Optional[float] = 3600,
+                    poll_initial_s: float = 5.0, poll_max_s: float = 60.0,
+                    completion_window: str = "24h") -> Dict[int, Dict[str, Any]]:
+    """Submit chat completion requests as one Batch API job and wait for the results.
+
+    Args:
+        client: AsyncOpenAI client
+        bodies: Request bodies for /v1/chat/completions (one per prompt)
+        deadline_s: Cancel the batch if not finished after this many seconds (None waits forever)
+        poll_initial_s: First polling interval (doubles up to poll_max_s)
+        poll_max_s: Maximum polling interval
+        completion_window: Batch completion window
+
+    Returns:
+        Response body per request index; indexes missing from the map did not
+        complete (failed, expired or cancelled) and should be retried online
+    """
+    if not bodies:
+        return {}
+
+    lines = [
+        json_codec.dumps({"custom_id": f"req-{i}", "method": "POST", "url": CHAT_COMPLETIONS_ENDPOINT, "body": body})
+        for i, body in enumerate(bodies)
+    ]
+    batch_file = await client.files.create(file=("batch.jsonl", b"\n".join(lines)), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=CHAT_COMPLETIONS_ENDPOINT,
+        completion_window=completion_window
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(bodies)} requests")
+
+    start = time.monotonic()
+    delay = poll_initial_s
+    while batch.status not in _TERMINAL_STATUSES:
+        if deadline_s is not None and time.monotonic() - start >= deadline_s:
+            logger.warning(f"Batch {batch.id} not done after {deadline_s}s (status {batch.status}), cancelling")
+            try:
+                batch = await client.batches.cancel(batch.id)
+            except Exception as e:
+                logger.error(f"Failed to cancel batch {batch.id}: {e}")
+            break
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, poll_max_s)
+        batch = await client.batches.retrieve(batch.id)
+
+    # Cancelled/expired batches may still have partial output
+    if not batch.output_file_id:
+        logger.warning(f"Batch {batch.id} finished with status {batch.status} and no output")
+        return {}
+
+    content = await client.files.content(batch.output_file_id)
+    results: Dict[int, Dict[str, Any]] = {}
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        record = json_codec.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.warning(f"Batch request {record.get('custom_id')} failed: {record.get('error') or response}")
+            continue
+        results[int(record["custom_id"].split("-", 1)[1])] = response["body"]
+
+    logger.info(f"Batch {batch.id} ({batch.status}): {len(results)}/{len(bodies)} succeeded")
+    return results
@@ -0,0 +1,45 @@
+"""Shared OpenAI client and connection pool."""
+import functools
+import logging
+import os
+import ssl
+from typing import Optional
+
+import certifi
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Shared SSL context: the CA bundle is parsed once at import instead of per client.
+# SSL_CERT_FILE overrides the certifi bundle (e.g. for a corporate proxy CA).
+SSL_CONTEXT = ssl.create_default_context(cafile=os.getenv('SSL_CERT_FILE') or certifi.where())
+
+# Shared async HTTP client with connection pooling
+# Reuses TCP connections to reduce latency (saves 100-300ms per request)
+# and lets many in-flight requests share one pool on the shared event loop.
+_shared_httpx = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=100,  # Max concurrent connections
+        max_keepalive_connections=20,  # Keep 20 connections warm
+        keepalive_expiry=300  # Keep alive for 5 minutes
+    ),
+    verify=SSL_CONTEXT
+)
+
+
+@functools.lru_cache(maxsize=4)
+def get_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client for an API key.
+
+    Every LLMClient and IntentClassifier shares one client (and one httpx
+    pool), so new instances reuse warm TLS connections instead of opening
+    their own.
+
+    Args:
+        api_key: OpenAI API key, defaults to OPENAI_API_KEY env var
+
+    Returns:
+        Cached AsyncOpenAI client
+    """
+    return AsyncOpenAI(api_key=api_key, http_client=_shared_httpx)
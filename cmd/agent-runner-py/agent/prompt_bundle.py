@@ -0,0 +1,62 @@
+"""Ahead-of-time compilation of the static prompt and tool artifacts."""
+import functools
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
+
+from agent.system_prompt import align_to_cache_block, get_encoding, get_system_prompt, system_prompt_token_count
+from agent.tools import get_tool_schemas, get_tool_schemas_json_bytes, get_tool_validators
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPromptBundle:
+    """Everything a request needs from the static prompt and tools, built once."""
+    model: str
+    system_prefix: str
+    system_prefix_hash: str
+    system_tokens: int
+    tools: Sequence[Dict[str, Any]]
+    tools_json: bytes
+    validators: Mapping[str, Callable[[Any], Any]]
+
+
+@functools.lru_cache(maxsize=8)
+def compile_prompt(model: str, workflow_schema_summary: Optional[str] = None,
+                   verbose_tools: bool = False, cache_align: bool = False) -> CompiledPromptBundle:
+    """Build the static prompt prefix, its token count and the tool artifacts.
+
+    Memoized, so every client with the same settings shares one bundle and
+    request handling never assembles prompts or schemas.
+
+    Args:
+        model: Model the bundle is compiled for
+        workflow_schema_summary: Optional workflow schema summary to include
+        verbose_tools: Use the long patch_workflow description with format examples
+        cache_align: Pad the prefix to a prompt cache block boundary
+
+    Returns:
+        CompiledPromptBundle
+    """
+    prefix = get_system_prompt(workflow_schema_summary)
+    aligned = align_to_cache_block(prefix) if cache_align else prefix
+    if aligned is prefix:
+        system_tokens = system_prompt_token_count(workflow_schema_summary)
+    else:
+        # Padding only happens when the encoding is available
+        system_tokens = len(get_encoding().encode(aligned, disallowed_special=()))
+
+    bundle = CompiledPromptBundle(
+        model=model,
+        system_prefix=aligned,
+        system_prefix_hash=hashlib.sha256(aligned.encode()).hexdigest(),
+        system_tokens=system_tokens,
+        tools=get_tool_schemas(verbose_patch=verbose_tools),
+        tools_json=get_tool_schemas_json_bytes(verbose_patch=verbose_tools),
+        validators=get_tool_validators(),
+    )
+    logger.info(f"Compiled prompt for {model}: {system_tokens} prefix tokens, "
+                f"{len(bundle.tools_json)} tool schema bytes, {len(bundle.validators)} validators")
+    return bundle
@@ -0,0 +1,5 @@
+"""Packaged data files.
+
+workflow.schema.json is copied here from common/schema at image build time;
+in a repo checkout the schema is read from common/schema directly.
+"""
@@ -0,0 +1,151 @@
+"""Semantic cache for intent classifications using sentence embeddings."""
+import copy
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[str], np.ndarray]
+
+
+class SemanticCache:
+    """Reuses classifications for paraphrased prompts via cosine similarity.
+
+    Vectors are L2-normalized and kept in a fixed-size ring buffer, so a
+    lookup is a single inner-product scan (equivalent to faiss.IndexFlatIP)
+    and eviction is FIFO.
+    """
+
+    def __init__(self, embed_fn: EmbedFn, dim: int, threshold: float = 0.92,
+                 max_entries: int = 10000, min_confidence: float = 0.8):
+        """Initialize semantic cache.
+
+        Args:
+            embed_fn: Function mapping text to an embedding vector
+            dim: Embedding dimension
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum cached entries (FIFO eviction)
+            min_confidence: Only cache results at or above this confidence
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.min_confidence = min_confidence
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._results: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Normalized float32 vector
+        """
+        vec = np.asarray(self.embed_fn(text), dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, vec: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Find the cached classification closest to vec.
+
+        Args:
+            vec: Normalized query vector (from embed())
+
+        Returns:
+            Copy of the cached result if similarity >= threshold, else None
+        """
+        if self._size == 0:
+            return None
+
+        scores = self._vectors[:self._size] @ vec
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+
+        logger.debug("Semantic cache hit (similarity %.3f)", scores[best])
+        return copy.deepcopy(self._results[best])
+
+    def add(self, vec: np.ndarray, result: Dict[str, Any]) -> bool:
+        """Cache a classification if it is confident enough.
+
+        Args:
+            vec: Normalized vector (from embed())
+            result: Classification result
+
+        Returns:
+            True if the result was cached
+        """
+        if result.get('intent') == 'unclear' or result.get('confidence', 0.0) < self.min_confidence:
+            return False
+
+        self._vectors[self._next] = vec
+        self._results[self._next] = copy.deepcopy(result)
+        self._next = (self._next + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+        return True
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_env(cls) -> Optional["SemanticCache"]:
+        """Build a cache backed by a local ONNX sentence encoder.
+
+        Reads INTENT_EMBED_MODEL_DIR, which must contain an ONNX export of
+        sentence-transformers/all-MiniLM-L6-v2 (model.onnx + tokenizer.json).
+
+        Returns:
+            SemanticCache, or None if no model is configured or deps are missing
+        """
+        model_dir = os.getenv('INTENT_EMBED_MODEL_DIR')
+        if not model_dir:
+            return None
+
+        try:
+            embed_fn, dim = _load_onnx_encoder(model_dir)
+        except Exception as e:
+            logger.warning(f"Semantic cache disabled: failed to load encoder from {model_dir}: {e}")
+            return None
+
+        logger.info(f"Semantic cache enabled with encoder from {model_dir} (dim={dim})")
+        return cls(embed_fn, dim)
+
+
+def _load_onnx_encoder(model_dir: str):
+    """Load a mean-pooled ONNX sentence encoder.
+
+    Args:
+        model_dir: Directory with model.onnx and tokenizer.json
+
+    Returns:
+        Tuple of (embed function, embedding dimension)
+    """
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=128)
+    session = ort.InferenceSession(os.path.join(model_dir, "model.onnx"), providers=["CPUExecutionProvider"])
+    input_names = {i.name for i in session.get_inputs()}
+
+    def embed(text: str) -> np.ndarray:
+        encoding = tokenizer.encode(text)
+        feeds = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+        }
+        if "token_type_ids" in input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids], dtype=np.int64)
+        hidden = session.run(None, feeds)[0][0]
+        mask = feeds["attention_mask"][0][:, None]
+        return (hidden * mask).sum(axis=0) / max(mask.sum(), 1)
+
+    dim = int(embed("warmup").shape[-1])
+    return embed, dim
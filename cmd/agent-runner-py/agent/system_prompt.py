@@ -1,23 +1,20 @@
 """System prompt for agent LLM (designed for OpenAI prompt caching)."""
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, Union
+import functools
 import json
+import logging
 
+try:
+    import tiktoken
+except ImportError:  # Token IDs are optional (used for token accounting only)
+    tiktoken = None
 
-def get_system_prompt(workflow_schema_summary: Optional[str] = None,
-                      current_workflow: Optional[Dict[str, Any]] = None) -> str:
-    """Get system prompt for agent.
+logger = logging.getLogger(__name__)
 
-    This prompt is designed to be >1024 tokens for OpenAI prompt caching.
-    The prompt is static and will be cached across requests, reducing
-    input token cost by ~50% and latency by ~80%.
+WORKFLOW_SECTION_HEADER = "\n\n## Current Workflow Structure\n"
 
-    Args:
-        workflow_schema_summary: Optional workflow schema summary to include
-
-    Returns:
-        System prompt string
-    """
-    base_prompt = """You are an orchestration agent that executes tasks within a workflow execution system.
+# Static base prompt (>1024 tokens so OpenAI caches it as a prefix)
+_BASE_PROMPT = """You are an orchestration agent that executes tasks within a workflow execution system.
 
 Your role is to interpret natural language instructions and translate them into concrete actions using the available tools.
 
@@ -60,6 +57,13 @@ Example pipeline for "fetch flights, sort by price, show top 3":
   {"step": "top_k", "k": 3}
 ]
 
+**Parallel fetches:** give steps an `id` and list their inputs in `depends_on`; steps that do not depend on each other run concurrently, and a step with several dependencies receives their rows merged. The last step's output is the result.
+[
+  {"id": "a", "step": "http_request", "url": "https://api.flights.com/search", "params": {"airline": "AA"}, "depends_on": []},
+  {"id": "b", "step": "http_request", "url": "https://api.flights.com/search", "params": {"airline": "UA"}, "depends_on": []},
+  {"step": "table_sort", "field": "price", "order": "asc", "depends_on": ["a", "b"]}
+]
+
 ### 2. Patch Lane: patch_workflow
 Use this for PERSISTENT, PERMANENT changes to the workflow.
 This is for "always", "whenever", "every time", or "schedule" type requests.
@@ -162,17 +166,216 @@ Let the tools do the work, then the system will format results for the user.
 
 Remember: You are executing within a live workflow. Be precise, efficient, and purposeful."""
 
-    # Append workflow schema if provided
-    if workflow_schema_summary:
-        base_prompt += f"\n\n{workflow_schema_summary}"
+# Every system prompt starts with these characters; upstream code can check
+# prompt[:PROMPT_CACHE_PREFIX_LEN] before sending to confirm the cached prefix is intact
+PROMPT_CACHE_PREFIX_LEN = len(_BASE_PROMPT)
+
+# OpenAI only caches prompts of at least this many tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Past the minimum, cached prefixes grow in blocks of this many tokens
+PROMPT_CACHE_BLOCK_TOKENS = 128
+
+# Recounts align_to_cache_block() makes before giving up on padding
+PROMPT_ALIGN_ATTEMPTS = 8
+
+
+def get_system_prompt(workflow_schema_summary: Optional[str] = None,
+                      current_workflow: Optional[Dict[str, Any]] = None) -> str:
+    """Get system prompt for agent.
+
+    This prompt is designed to be >1024 tokens for OpenAI prompt caching.
+    The prompt is static and will be cached across requests, reducing
+    input token cost by ~50% and latency by ~80%.
+
+    Providers only cache exact prefixes, so the result always starts with
+    the static base prompt followed by the schema summary; per-request data
+    (the workflow section) goes last. Callers must not prepend anything to
+    it (see is_cache_safe).
+
+    Args:
+        workflow_schema_summary: Optional workflow schema summary to include
+        current_workflow: Optional current workflow structure to append
+
+    Returns:
+        System prompt string
+    """
+    # Common case (no summary) skips the memo lookup entirely
+    prompt = _get_static_prompt(workflow_schema_summary) if workflow_schema_summary else _BASE_PROMPT
 
     # Append current workflow structure for caching (OpenAI caches prefix)
     # By putting workflow in system prompt, it's cached when workflow doesn't change
     if current_workflow:
-        base_prompt += "\n\n## Current Workflow Structure\n"
-        base_prompt += _format_workflow_structure(current_workflow)
+        return "".join((prompt, WORKFLOW_SECTION_HEADER, _format_workflow_structure(current_workflow)))
+
+    return prompt
+
+
+@functools.lru_cache(maxsize=32)
+def get_system_prompt_for(model: str, workflow_schema_summary: Optional[str] = None
+                          ) -> Union[str, Tuple[Dict[str, Any], ...]]:
+    """Get the static system prompt in the form the model's provider caches.
+
+    OpenAI caches exact prefixes automatically, so it gets the plain string.
+    Anthropic (claude-*) only caches up to an explicit cache_control
+    breakpoint, so the base prompt becomes a marked content block followed
+    by the summary block.
+
+    Args:
+        model: Model name
+        workflow_schema_summary: Optional workflow schema summary to include
+
+    Returns:
+        System prompt string, or a tuple of Anthropic system content blocks
+        (shared across calls, do not mutate)
+    """
+    if not model.startswith("claude"):
+        return get_system_prompt(workflow_schema_summary)
+
+    blocks = [{"type": "text", "text": _BASE_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    if workflow_schema_summary:
+        blocks.append({"type": "text", "text": workflow_schema_summary})
+    return tuple(blocks)
+
 
-    return base_prompt
+@functools.lru_cache(maxsize=32)
+def _get_static_prompt(workflow_schema_summary: Optional[str]) -> str:
+    """Assemble the static prompt prefix (base prompt + optional schema summary).
+
+    Memoized so every call returns the same string object, keeping the
+    cached prefix byte-identical.
+
+    Args:
+        workflow_schema_summary: Optional workflow schema summary to include
+
+    Returns:
+        Static system prompt prefix
+    """
+    if not workflow_schema_summary:
+        return _BASE_PROMPT
+    return "\n\n".join((_BASE_PROMPT, workflow_schema_summary))
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    """Load the gpt-4o tokenizer once (None if tiktoken or its encoding is unavailable)."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model('gpt-4o')
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_base_token_ids() -> Optional[Tuple[int, ...]]:
+    """Tokenize the base prompt once."""
+    encoding = get_encoding()
+    if encoding is None:
+        return None
+    return tuple(encoding.encode(_BASE_PROMPT, disallowed_special=()))
+
+
+@functools.lru_cache(maxsize=32)
+def get_system_prompt_tokens(workflow_schema_summary: Optional[str] = None) -> Optional[Tuple[int, ...]]:
+    """Get the token IDs of the static prompt prefix.
+
+    The base prompt is tokenized once; only the schema summary is encoded
+    per distinct summary. The split is exact because the tokenizer never
+    merges across the blank line separating them.
+
+    Args:
+        workflow_schema_summary: Optional workflow schema summary to include
+
+    Returns:
+        Token IDs of get_system_prompt(workflow_schema_summary), or None without tiktoken
+    """
+    base_ids = _get_base_token_ids()
+    if base_ids is None or not workflow_schema_summary:
+        return base_ids
+    return base_ids + tuple(get_encoding().encode(f"\n\n{workflow_schema_summary}", disallowed_special=()))
+
+
+@functools.lru_cache(maxsize=32)
+def system_prompt_token_count(workflow_schema_summary: Optional[str] = None) -> int:
+    """Get the token length of the static prompt prefix (memoized).
+
+    Args:
+        workflow_schema_summary: Optional workflow schema summary to include
+
+    Returns:
+        Token count of get_system_prompt(workflow_schema_summary), estimated
+        as len/4 without tiktoken
+    """
+    token_ids = get_system_prompt_tokens(workflow_schema_summary)
+    if token_ids is None:
+        return len(_get_static_prompt(workflow_schema_summary)) // 4 + 1
+    return len(token_ids)
+
+
+@functools.lru_cache(maxsize=8)
+def align_to_cache_block(prompt: str) -> str:
+    """Pad a static prompt prefix so its token count ends on a cache block boundary.
+
+    Only whole PROMPT_CACHE_BLOCK_TOKENS blocks are cached, so the static
+    tokens after the last full block are re-prefilled on every request.
+    Padding them out to the boundary makes the whole prefix cacheable.
+
+    Args:
+        prompt: Static prompt prefix
+
+    Returns:
+        Prompt followed by a padding comment, or the prompt unchanged without
+        tiktoken (or if no padding lands on a boundary)
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return prompt
+
+    def padded(units: int) -> str:
+        return "".join((prompt, "\n\n<!--", " ." * units, " -->"))
+
+    # Each " ." unit is normally one token, so the first recount already lands
+    # on the boundary; recount until it does in case the tokenizer merges some
+    units = 0
+    for _ in range(PROMPT_ALIGN_ATTEMPTS):
+        aligned = padded(units)
+        total = len(encoding.encode(aligned, disallowed_special=()))
+        missing = -total % PROMPT_CACHE_BLOCK_TOKENS
+        if not missing:
+            logger.info(f"System prompt prefix padded by {units} tokens to {total} "
+                        f"({total // PROMPT_CACHE_BLOCK_TOKENS} cache blocks)")
+            return aligned
+        units += missing
+
+    logger.warning(f"Could not pad system prompt prefix to a {PROMPT_CACHE_BLOCK_TOKENS}-token "
+                   f"boundary in {PROMPT_ALIGN_ATTEMPTS} attempts, sending it unpadded")
+    return prompt
+
+
+def is_cache_safe(prompt: str) -> bool:
+    """Check that a system prompt still starts with the cacheable base prompt.
+
+    Args:
+        prompt: System prompt about to be sent
+
+    Returns:
+        True if the first PROMPT_CACHE_PREFIX_LEN characters are the base prompt
+    """
+    return prompt.startswith(_BASE_PROMPT)
+
+
+def render_workflow_section(workflow: Dict[str, Any]) -> str:
+    """Render the mutable workflow section appended after the static prompt prefix.
+
+    Args:
+        workflow: Workflow definition (either IR or schema format)
+
+    Returns:
+        Workflow section including its heading
+    """
+    return WORKFLOW_SECTION_HEADER + _format_workflow_structure(workflow)
 
 
 def _format_workflow_structure(workflow: Dict[str, Any]) -> str:
@@ -1,102 +1,75 @@
-"""Tool definitions for LLM function calling."""
-from typing import List, Dict, Any
+"""Tool definitions for LLM function calling.
 
+Schemas are composed from small builders, frozen, and JSON-encoded once at
+import; get_tool_schemas() and get_tool_schemas_json_bytes() only return the
+shared results, so no schema objects are built or serialized per request.
+"""
+import logging
+import sys
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
 
-def get_tool_schemas() -> List[Dict[str, Any]]:
-    """Get tool schemas for OpenAI function calling.
+import json_codec
+try:
+    import fastjsonschema
+except ImportError:  # Tool arguments are then not schema-validated
+    fastjsonschema = None
+
+logger = logging.getLogger(__name__)
+
+# Schema keys, types and enum values are short; descriptions are not worth interning
+_INTERN_MAX_LEN = 32
+
+
+class _FrozenDict(dict):
+    """Read-only dict.
+
+    Unlike types.MappingProxyType, it is still a dict subclass, so json,
+    orjson and the OpenAI SDK serialize it directly.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("tool schemas are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_FrozenDict, (dict(self),))
+
+
+def _freeze(obj: Any, memo: Dict[int, Any]) -> Any:
+    """Recursively convert dicts to _FrozenDict and lists to tuples, interning keys and short strings.
+
+    Args:
+        obj: Schema fragment
+        memo: id -> (original, frozen copy), so fragments shared between schemas
+            stay shared; the original is kept so its id cannot be reused
 
     Returns:
-        List of tool definitions
+        Frozen fragment
     """
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "execute_pipeline",
-                "description": "Execute ephemeral data pipeline using composable primitives. Use this for one-time data operations that don't need to persist in the workflow.",
-                "parameters": {
-                    "type": "object",
-                    "required": ["session_id", "pipeline"],
-                    "additionalProperties": True,
-                    "properties": {
-                        "session_id": {
-                            "type": "string",
-                            "description": "Session ID for context tracking"
-                        },
-                        "pipeline": {
-                            "type": "array",
-                            "description": "Array of pipeline steps to execute in sequence",
-                            "items": {
-                                "type": "object",
-                                "required": ["step"],
-                                "additionalProperties": True,
-                                "properties": {
-                                    "step": {
-                                        "type": "string",
-                                        "enum": [
-                                            "http_request",
-                                            "table_sort",
-                                            "table_filter",
-                                            "table_select",
-                                            "top_k"
-                                        ],
-                                        "description": "Pipeline step type"
-                                    },
-                                    # http_request params
-                                    "url": {"type": "string", "description": "URL for HTTP request"},
-                                    "method": {"type": "string", "enum": ["GET", "POST"], "description": "HTTP method"},
-                                    "params": {
-                                        "type": "object",
-                                        "description": "Query parameters or POST body",
-                                        "additionalProperties": True,
-                                        "properties": {}
-                                    },
-                                    # table_sort params
-                                    "field": {"type": "string", "description": "Field name to sort/filter by"},
-                                    "order": {"type": "string", "enum": ["asc", "desc"], "description": "Sort order"},
-                                    # table_filter params
-                                    "condition": {
-                                        "type": "object",
-                                        "description": "Filter condition",
-                                        "required": ["field", "op", "value"],
-                                        "additionalProperties": True,
-                                        "properties": {
-                                            "field": {"type": "string"},
-                                            "op": {"type": "string", "enum": ["<", ">", "<=", ">=", "==", "!="]},
-                                            "value": {
-                                                "description": "Value to compare against",
-                                                "anyOf": [
-                                                    {"type": "string"},
-                                                    {"type": "number"},
-                                                    {"type": "boolean"}
-                                                ]
-                                            }
-                                        }
-                                    },
-                                    # table_select params
-                                    "fields": {
-                                        "type": "array",
-                                        "items": {"type": "string"},
-                                        "description": "Fields to select"
-                                    },
-                                    # top_k params
-                                    "k": {"type": "integer", "minimum": 1, "description": "Number of records to take"}
-                                }
-                            }
-                        },
-                        "input_ref": {
-                            "type": "string",
-                            "description": "Optional CAS reference to input data (e.g., cas://sha256:...)"
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "patch_workflow",
-                "description": """Create persistent workflow modifications during runtime.
+    if id(obj) in memo:
+        return memo[id(obj)][1]
+    if isinstance(obj, str):
+        return sys.intern(obj) if len(obj) <= _INTERN_MAX_LEN else obj
+    if isinstance(obj, dict):
+        frozen = _FrozenDict((_freeze(key, memo), _freeze(value, memo)) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        frozen = tuple(_freeze(value, memo) for value in obj)
+    else:
+        return obj
+    memo[id(obj)] = (obj, frozen)
+    return frozen
+
+
+_PATCH_DESCRIPTION_VERBOSE = """Create persistent workflow modifications during runtime.
 
 CRITICAL: Config MUST be an object with key-value pairs, NEVER an array!
 
@@ -145,87 +118,284 @@ Node types and their config:
 - http: {"url": "https://...", "method": "GET", "payload": "..."}
 - hitl: {"message": "Please approve", "timeout_ms": 86400000}
 - conditional: {"condition": "$.value > 100"}
-""",
-                "parameters": {
-                    "type": "object",
-                    "required": ["patch_spec"],
-                    "additionalProperties": True,
-                    "properties": {
-                        "workflow_tag": {
-                            "type": "string",
-                            "description": "Tag of workflow to patch (optional, will use current workflow)"
-                        },
-                        "workflow_owner": {
-                            "type": "string",
-                            "description": "Owner of the workflow (optional, will use current user)"
-                        },
-                        "patch_spec": {
-                            "type": "object",
-                            "description": "JSON Patch operations to apply. MUST include both nodes AND edges to connect them.",
-                            "required": ["operations"],
-                            "additionalProperties": True,
-                            "properties": {
-                                "operations": {
-                                    "type": "array",
-                                    "description": "Array of patch operations. When adding nodes, ALWAYS add corresponding edges to connect them to the current node.",
-                                    "items": {
-                                        "type": "object",
-                                        "required": ["op", "path"],
-                                        "additionalProperties": True,
-                                        "properties": {
-                                            "op": {
-                                                "type": "string",
-                                                "enum": ["add", "remove", "replace"],
-                                                "description": "Operation type"
-                                            },
-                                            "path": {
-                                                "type": "string",
-                                                "description": "JSON Pointer path (e.g., '/nodes/-' for nodes, '/edges/-' for edges)"
-                                            },
-                                            "value": {
-                                                "description": "MUST be an object. For nodes: {id: string, type: string, config: object}. For edges: {from: string, to: string, condition?: string}",
-                                                "type": "object",
-                                                "properties": {
-                                                    "id": {
-                                                        "type": "string",
-                                                        "description": "Unique node ID (for nodes)"
-                                                    },
-                                                    "type": {
-                                                        "type": "string",
-                                                        "enum": ["agent", "http", "hitl", "conditional", "loop"],
-                                                        "description": "Node type (for nodes)"
-                                                    },
-                                                    "config": {
-                                                        "type": "object",
-                                                        "description": "Node configuration as key-value object (NOT array). Example: {\"task\": \"do something\"}",
-                                                        "additionalProperties": True
-                                                    },
-                                                    "from": {
-                                                        "type": "string",
-                                                        "description": "Source node ID (for edges)"
-                                                    },
-                                                    "to": {
-                                                        "type": "string",
-                                                        "description": "Target node ID (for edges)"
-                                                    },
-                                                    "condition": {
-                                                        "type": "string",
-                                                        "description": "Conditional expression (for edges, optional)"
-                                                    }
-                                                },
-                                                "additionalProperties": False
-                                            }
-                                        }
-                                    }
-                                },
-                                "description": {
-                                    "type": "string",
-                                    "description": "Human-readable description of the patch"
+"""
+
+_PATCH_DESCRIPTION_COMPACT = (
+    "Create persistent workflow modifications during runtime using JSON Patch operations "
+    "on /nodes and /edges. Config MUST be an object with key-value pairs, NEVER an array. "
+    "When adding nodes, also add edges connecting them."
+)
+
+# Schema builders: compose the tool schemas from shared pieces instead of repeating dict literals
+_STRING: Dict[str, Any] = {"type": "string"}
+
+
+def _string(description: Optional[str] = None, enum: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """String property (the bare _STRING singleton when it has no description or enum)."""
+    if description is None and enum is None:
+        return _STRING
+    schema: Dict[str, Any] = {"type": "string"}
+    if enum is not None:
+        schema["enum"] = list(enum)
+    if description is not None:
+        schema["description"] = description
+    return schema
+
+
+def _obj(properties: Dict[str, Any], required: Sequence[str] = (), additional: bool = True,
+         description: Optional[str] = None) -> Dict[str, Any]:
+    """Object schema with the given properties.
+
+    Omits keys that restate JSON Schema defaults (additionalProperties: true,
+    empty properties); every byte is re-sent and prefilled with each request.
+    """
+    schema: Dict[str, Any] = {"type": "object"}
+    if description is not None:
+        schema["description"] = description
+    if required:
+        schema["required"] = list(required)
+    if not additional:
+        schema["additionalProperties"] = False
+    if properties:
+        schema["properties"] = properties
+    return schema
+
+
+def _array(items: Dict[str, Any], description: str) -> Dict[str, Any]:
+    """Array schema with the given item schema."""
+    return {"type": "array", "description": description, "items": items}
+
+
+def _tool(name: str, description: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI function tool definition."""
+    return {"type": "function", "function": {"name": name, "description": description, "parameters": parameters}}
+
+
+# Allowed enum values, in schema order and as sets for O(1) membership checks
+_PIPELINE_STEP_NAMES = ("http_request", "table_sort", "table_filter", "table_select", "top_k")
+_PATCH_OP_NAMES = ("add", "remove", "replace")
+_PIPELINE_STEPS = frozenset(_PIPELINE_STEP_NAMES)
+_PATCH_OPS = frozenset(_PATCH_OP_NAMES)
+
+# Node/edge object accepted by patch operations (shared by both patch_workflow variants)
+_PATCH_VALUE_SCHEMA = _obj(
+    {
+        "id": _string("Unique node ID (for nodes)"),
+        "type": _string("Node type (for nodes)", enum=["agent", "http", "hitl", "conditional", "loop"]),
+        "config": _obj({}, description="Node configuration as key-value object (NOT array). Example: {\"task\": \"do something\"}"),
+        "from": _string("Source node ID (for edges)"),
+        "to": _string("Target node ID (for edges)"),
+        "condition": _string("Conditional expression (for edges, optional)"),
+    },
+    additional=False,
+    description="MUST be an object. For nodes: {id: string, type: string, config: object}. For edges: {from: string, to: string, condition?: string}"
+)
+
+_EXECUTE_PIPELINE_TOOL = _tool(
+    "execute_pipeline",
+    "Execute ephemeral data pipeline using composable primitives. Use this for one-time data operations that don't need to persist in the workflow.",
+    _obj(
+        {
+            "session_id": _string("Session ID for context tracking"),
+            "pipeline": _array(
+                _obj(
+                    {
+                        "step": _string("Pipeline step type", enum=_PIPELINE_STEP_NAMES),
+                        # optional graph mode
+                        "id": _string("Step ID referenced by depends_on"),
+                        "depends_on": _array(
+                            _STRING,
+                            "IDs of steps whose outputs this step reads (merged if several); "
+                            "steps without dependencies between them run concurrently"
+                        ),
+                        # http_request params
+                        "url": _string("URL for HTTP request"),
+                        "method": _string("HTTP method", enum=["GET", "POST"]),
+                        "params": _obj({}, description="Query parameters or POST body"),
+                        # table_sort params
+                        "field": _string("Field name to sort/filter by"),
+                        "order": _string("Sort order", enum=["asc", "desc"]),
+                        # table_filter params
+                        "condition": _obj(
+                            {
+                                "field": _STRING,
+                                "op": _string(enum=["<", ">", "<=", ">=", "==", "!="]),
+                                "value": {
+                                    "description": "Value to compare against",
+                                    "anyOf": [_STRING, {"type": "number"}, {"type": "boolean"}]
                                 }
-                            }
-                        }
-                    }
-                }
-            }
-        }
-    ]
+                            },
+                            required=["field", "op", "value"],
+                            description="Filter condition"
+                        ),
+                        # table_select params
+                        "fields": _array(_STRING, "Fields to select"),
+                        # top_k params
+                        "k": {"type": "integer", "minimum": 1, "description": "Number of records to take"}
+                    },
+                    required=["step"]
+                ),
+                "Array of pipeline steps to execute in sequence (or by depends_on when given)"
+            ),
+            "input_ref": _string("Optional CAS reference to input data (e.g., cas://sha256:...)"),
+        },
+        required=["session_id", "pipeline"]
+    )
+)
+
+# patch_workflow parameters (identical for both description variants)
+_PATCH_WORKFLOW_PARAMETERS = _obj(
+    {
+        "workflow_tag": _string("Tag of workflow to patch (optional, will use current workflow)"),
+        "workflow_owner": _string("Owner of the workflow (optional, will use current user)"),
+        "patch_spec": _obj(
+            {
+                "operations": _array(
+                    _obj(
+                        {
+                            "op": _string("Operation type", enum=_PATCH_OP_NAMES),
+                            "path": _string("JSON Pointer path (e.g., '/nodes/-' for nodes, '/edges/-' for edges)"),
+                            "value": _PATCH_VALUE_SCHEMA
+                        },
+                        required=["op", "path"]
+                    ),
+                    "Array of patch operations. When adding nodes, ALWAYS add corresponding edges to connect them to the current node."
+                ),
+                "description": _string("Human-readable description of the patch"),
+            },
+            required=["operations"],
+            description="JSON Patch operations to apply. MUST include both nodes AND edges to connect them."
+        ),
+    },
+    required=["patch_spec"]
+)
+
+
+def _patch_workflow_tool(description: str) -> Dict[str, Any]:
+    """Build the patch_workflow tool definition with the given description."""
+    return _tool("patch_workflow", description, _PATCH_WORKFLOW_PARAMETERS)
+
+
+# Tool schemas are built and frozen once at import, so every caller shares one read-only graph
+_freeze_memo: Dict[int, Any] = {}
+_TOOL_SCHEMAS: Dict[bool, Sequence[Dict[str, Any]]] = {
+    True: _freeze([_EXECUTE_PIPELINE_TOOL, _patch_workflow_tool(_PATCH_DESCRIPTION_VERBOSE)], _freeze_memo),
+    False: _freeze([_EXECUTE_PIPELINE_TOOL, _patch_workflow_tool(_PATCH_DESCRIPTION_COMPACT)], _freeze_memo),
+}
+del _freeze_memo
+
+# Format examples surfaced on validation errors (see get_tool_help)
+_TOOL_HELP: Dict[str, str] = {
+    "patch_workflow": _PATCH_DESCRIPTION_VERBOSE,
+}
+
+# Pre-encoded compact JSON for HTTP clients that send raw request bytes
+_TOOL_SCHEMAS_JSON: Dict[bool, bytes] = {
+    verbose: json_codec.dumps(schemas) for verbose, schemas in _TOOL_SCHEMAS.items()
+}
+
+
+def _compile_validators() -> Dict[str, Callable[[Any], Any]]:
+    """Compile one validator per tool from its parameters schema."""
+    if fastjsonschema is None:
+        logger.warning("fastjsonschema not installed, tool arguments will not be schema-validated")
+        return {}
+    # Compile from plain JSON (the generated code embeds the schema values)
+    return {
+        tool["function"]["name"]: fastjsonschema.compile(tool["function"]["parameters"])
+        for tool in json_codec.loads(_TOOL_SCHEMAS_JSON[False])
+    }
+
+
+# Validators are compiled to specialized Python code once at import
+_TOOL_VALIDATORS = _compile_validators()
+_TOOL_VALIDATORS_VIEW = MappingProxyType(_TOOL_VALIDATORS)
+
+
+def get_tool_schemas(verbose_patch: bool = True) -> Sequence[Dict[str, Any]]:
+    """Get tool schemas for OpenAI function calling.
+
+    Args:
+        verbose_patch: Use the long patch_workflow description with format examples
+
+    Returns:
+        Read-only tuple of tool definitions (shared; mutation raises TypeError)
+    """
+    return _TOOL_SCHEMAS[verbose_patch]
+
+
+def get_tool_help(tool_name: str) -> Optional[str]:
+    """Get the long-form usage guide for a tool.
+
+    Kept out of the default tool schemas to save prefill tokens; returned to
+    the model alongside tool validation errors instead.
+
+    Args:
+        tool_name: Tool function name
+
+    Returns:
+        Usage guide with format examples, or None if the tool has none
+    """
+    return _TOOL_HELP.get(tool_name)
+
+
+def get_tool_schemas_json_bytes(verbose_patch: bool = True) -> bytes:
+    """Get tool schemas serialized as compact JSON.
+
+    Args:
+        verbose_patch: Use the long patch_workflow description with format examples
+
+    Returns:
+        UTF-8 JSON bytes of get_tool_schemas(verbose_patch)
+    """
+    return _TOOL_SCHEMAS_JSON[verbose_patch]
+
+
+def get_tool_validators() -> Mapping[str, Callable[[Any], Any]]:
+    """Get the compiled argument validators.
+
+    Returns:
+        Read-only map of tool name -> validator (empty without fastjsonschema)
+    """
+    return _TOOL_VALIDATORS_VIEW
+
+
+def validate_tool_args(tool_name: str, arguments: Dict[str, Any]) -> None:
+    """Validate tool call arguments against the tool's parameters schema.
+
+    Args:
+        tool_name: Tool function name
+        arguments: Parsed tool call arguments
+
+    Raises:
+        ValueError: If the arguments do not match the schema
+    """
+    validator = _TOOL_VALIDATORS.get(tool_name)
+    if validator is None:
+        # No compiled validator (fastjsonschema missing): still reject unknown steps/ops
+        _check_enums(tool_name, arguments)
+        return
+    try:
+        validator(arguments)
+    except fastjsonschema.JsonSchemaValueException as e:
+        raise ValueError(f"Invalid {tool_name} arguments: {e.message}") from e
+
+
+def _check_enums(tool_name: str, arguments: Dict[str, Any]) -> None:
+    """Check pipeline steps and patch ops against the allowed sets.
+
+    Args:
+        tool_name: Tool function name
+        arguments: Parsed tool call arguments
+
+    Raises:
+        ValueError: If a step or op is not allowed
+    """
+    if tool_name == "execute_pipeline":
+        for step in arguments.get("pipeline") or ():
+            if isinstance(step, dict) and step.get("step") not in _PIPELINE_STEPS:
+                raise ValueError(f"Invalid {tool_name} arguments: unknown step {step.get('step')!r}")
+    elif tool_name == "patch_workflow":
+        for operation in (arguments.get("patch_spec") or {}).get("operations") or ():
+            if isinstance(operation, dict) and operation.get("op") not in _PATCH_OPS:
+                raise ValueError(f"Invalid {tool_name} arguments: unknown op {operation.get('op')!r}")
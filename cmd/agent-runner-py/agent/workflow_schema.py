@@ -1,94 +1,67 @@
 """Workflow schema loader and utilities."""
-import json
-import os
+import functools
+import hashlib
+import importlib.resources
 import logging
-from typing import Dict, Any, List
+import re
+import sys
+from importlib.resources.abc import Traversable
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import json_codec
+try:
+    import fastjsonschema
+except ImportError:  # Workflows are then not schema-validated
+    fastjsonschema = None
 
 logger = logging.getLogger(__name__)
 
 
-class WorkflowSchema:
-    """Manages workflow schema information."""
+def _find_default_schema() -> Traversable:
+    """Locate workflow.schema.json.
 
-    def __init__(self, schema_path: str = None):
-        """Initialize workflow schema.
+    Prefers the copy packaged in agent/resources (added at image build, also
+    readable from zip installs), then the shared common/schema directory: the
+    Docker image copies it to /common next to the /app service dir; in a repo
+    checkout it is <repo>/common, one level higher (above cmd/).
+    """
+    packaged = importlib.resources.files("agent.resources").joinpath("workflow.schema.json")
+    if packaged.is_file():
+        return packaged
+    candidates = [parent / "common" / "schema" / "workflow.schema.json" for parent in Path(__file__).resolve().parents[2:4]]
+    return next((path for path in candidates if path.exists()), candidates[0])
 
-        Args:
-            schema_path: Path to workflow.schema.json, defaults to common/schema location
-        """
-        if schema_path is None:
-            # Default to common schema location (relative to repo root)
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            schema_path = os.path.join(base_dir, "common", "schema", "workflow.schema.json")
 
-        self.schema_path = schema_path
-        self.schema = self._load_schema()
-        self.node_types = self._extract_node_types()
+# Resolved once at import instead of per instance
+_DEFAULT_SCHEMA = _find_default_schema()
 
-        logger.info(f"Workflow schema loaded: {len(self.node_types)} node types")
+# Validator source pre-generated from the default schema (python -m agent.workflow_schema)
+_GENERATED_VALIDATOR_PATH = Path(__file__).with_name("_generated_validator.py")
 
-    def _load_schema(self) -> Dict[str, Any]:
-        """Load workflow schema from JSON file.
+_DEFAULT_NODE_TYPES = ("function", "http", "conditional", "loop", "parallel", "transform", "aggregate", "filter")
 
-        Returns:
-            Schema dictionary
-        """
-        try:
-            with open(self.schema_path, 'r') as f:
-                schema = json.load(f)
-            logger.info(f"Loaded workflow schema from {self.schema_path}")
-            return schema
-        except FileNotFoundError:
-            logger.warning(f"Schema file not found: {self.schema_path}, using minimal schema")
-            return self._get_minimal_schema()
-        except Exception as e:
-            logger.error(f"Failed to load schema: {e}, using minimal schema")
-            return self._get_minimal_schema()
-
-    def _get_minimal_schema(self) -> Dict[str, Any]:
-        """Get minimal schema if file not found.
-
-        Returns:
-            Minimal schema dictionary
-        """
-        return {
-            "properties": {
-                "nodes": {
-                    "items": {
-                        "properties": {
-                            "type": {
-                                "enum": ["function", "http", "conditional", "loop", "parallel", "transform", "aggregate", "filter"]
-                            }
-                        }
+# Fallback when the schema file is missing or unreadable
+_MINIMAL_SCHEMA: Dict[str, Any] = {
+    "properties": {
+        "nodes": {
+            "items": {
+                "properties": {
+                    "type": {
+                        "enum": list(_DEFAULT_NODE_TYPES)
                     }
                 }
             }
         }
+    }
+}
 
-    def _extract_node_types(self) -> List[str]:
-        """Extract valid node types from schema.
 
-        Returns:
-            List of valid node type strings
-        """
-        try:
-            node_def = self.schema.get("definitions", {}).get("Node", {})
-            type_enum = node_def.get("properties", {}).get("type", {}).get("enum", [])
-            return type_enum
-        except Exception as e:
-            logger.error(f"Failed to extract node types: {e}")
-            return ["function", "http", "conditional", "loop", "parallel", "transform", "aggregate", "filter"]
-
-    def get_schema_summary(self) -> str:
-        """Get human-readable schema summary for LLM prompt.
-
-        Returns:
-            Schema summary string
-        """
-        summary = f"""## Workflow Schema
+# Schema summary for the LLM prompt; only the node type list varies
+_SUMMARY_TEMPLATE = """## Workflow Schema
 
 **Valid Node Types:**
-{self._format_node_types()}
+{node_types}
 
 **Node Structure:**
 - `id` (required): Unique identifier (alphanumeric, underscores, hyphens)
@@ -118,15 +91,91 @@ class WorkflowSchema:
 - No circular dependencies (DAG structure)
 - At least one node is required
 """
-        return summary
 
-    def _format_node_types(self) -> str:
-        """Format node types as bullet list.
+
+class WorkflowSchema:
+    """Manages workflow schema information."""
+
+    def __init__(self, schema_path: str = None):
+        """Initialize workflow schema.
+
+        Args:
+            schema_path: Path to workflow.schema.json, defaults to common/schema location
+        """
+        # The file is read lazily on first use of schema/node_types/summary
+        self._schema_source = Path(schema_path) if schema_path else _DEFAULT_SCHEMA
+        self.schema_path = str(self._schema_source)
+
+    @functools.cached_property
+    def schema(self) -> Dict[str, Any]:
+        """Schema dictionary, loaded on first access."""
+        return self._load_schema()
+
+    @functools.cached_property
+    def node_types(self) -> List[str]:
+        """Valid node types, extracted on first access."""
+        node_types = self._extract_node_types()
+        logger.info("Workflow schema loaded: %d node types", len(node_types))
+        return node_types
+
+    @functools.cached_property
+    def _node_types_set(self) -> frozenset:
+        """Node types as a frozenset for O(1) membership checks."""
+        return frozenset(self.node_types)
+
+    def _load_schema(self) -> Dict[str, Any]:
+        """Load workflow schema from JSON file.
+
+        Returns:
+            Schema dictionary
+        """
+        try:
+            schema = json_codec.loads(self._schema_source.read_bytes())
+            logger.info("Loaded workflow schema from %s", self.schema_path)
+            return schema
+        except FileNotFoundError:
+            logger.warning("Schema file not found: %s, using minimal schema", self.schema_path)
+            return self._get_minimal_schema()
+        except Exception as e:
+            logger.error("Failed to load schema: %s, using minimal schema", e)
+            return self._get_minimal_schema()
+
+    def _get_minimal_schema(self) -> Dict[str, Any]:
+        """Get minimal schema if file not found.
+
+        Returns:
+            Minimal schema dictionary (shared, do not mutate)
+        """
+        return _MINIMAL_SCHEMA
+
+    def _extract_node_types(self) -> List[str]:
+        """Extract valid node types from schema.
+
+        Returns:
+            List of valid node type strings
+        """
+        node_def = self.schema.get("definitions", {}).get("Node", {})
+        type_enum = node_def.get("properties", {}).get("type", {}).get("enum") or _DEFAULT_NODE_TYPES
+        # Interned so membership checks against literal type names hit on identity
+        return [sys.intern(node_type) for node_type in type_enum]
+
+    def get_schema_summary(self) -> str:
+        """Get human-readable schema summary for LLM prompt.
 
         Returns:
-            Formatted string
+            Schema summary string (built once, then reused)
         """
-        return "\n".join([f"- `{node_type}`" for node_type in self.node_types])
+        return self.schema_summary
+
+    @functools.cached_property
+    def schema_summary(self) -> str:
+        """Schema summary for the LLM prompt, built on first access."""
+        return _SUMMARY_TEMPLATE.format(node_types=self._formatted_node_types)
+
+    @functools.cached_property
+    def _formatted_node_types(self) -> str:
+        """Node types as a bullet list, formatted once."""
+        return "\n".join(f"- `{node_type}`" for node_type in self.node_types)
 
     def validate_node_type(self, node_type: str) -> bool:
         """Validate if node type is valid.
@@ -137,12 +186,105 @@ class WorkflowSchema:
         Returns:
             True if valid, False otherwise
         """
-        return node_type in self.node_types
+        return node_type in self._node_types_set
 
-    def get_node_types(self) -> List[str]:
-        """Get list of valid node types.
+    def get_node_types(self) -> Tuple[str, ...]:
+        """Get valid node types.
 
         Returns:
-            List of node type strings
+            Tuple of node type strings (shared, in schema order)
         """
-        return self.node_types.copy()
+        return self._node_types_tuple
+
+    @functools.cached_property
+    def _node_types_tuple(self) -> Tuple[str, ...]:
+        """Node types as an immutable tuple, built once."""
+        return tuple(self.node_types)
+
+    @functools.cached_property
+    def _validator(self) -> Optional[Callable[[Any], Any]]:
+        """Validator compiled from the schema on first use (None if unavailable)."""
+        if fastjsonschema is None:
+            logger.warning("fastjsonschema not installed, workflows will not be schema-validated")
+            return None
+        if self._schema_source == _DEFAULT_SCHEMA:
+            try:
+                from agent._generated_validator import validate
+                return validate
+            except ImportError:
+                logger.warning("Pre-generated workflow validator missing, compiling from schema")
+        try:
+            return fastjsonschema.compile(self.schema)
+        except fastjsonschema.JsonSchemaDefinitionException as e:
+            logger.error("Failed to compile workflow schema: %s", e)
+            return None
+
+    def validate(self, workflow: Dict[str, Any]) -> None:
+        """Validate a workflow definition against the schema.
+
+        Args:
+            workflow: Workflow definition (nodes and edges)
+
+        Raises:
+            ValueError: If the workflow does not match the schema
+        """
+        validator = self._validator
+        if validator is None:
+            return
+        try:
+            validator(workflow)
+        except fastjsonschema.JsonSchemaValueException as e:
+            raise ValueError(f"Invalid workflow: {e.message}") from e
+
+
+@functools.lru_cache(maxsize=8)
+def get_workflow_schema(schema_path: Optional[str] = None) -> WorkflowSchema:
+    """Get the shared WorkflowSchema for a schema file.
+
+    Args:
+        schema_path: Path to workflow.schema.json, defaults to the packaged/common schema
+
+    Returns:
+        Cached WorkflowSchema (parsed at most once per path)
+    """
+    return WorkflowSchema(schema_path)
+
+
+def schema_fingerprint(schema: Dict[str, Any]) -> str:
+    """Hash a schema independently of key order and formatting.
+
+    Args:
+        schema: Schema dictionary
+
+    Returns:
+        SHA-256 hex digest of the canonical JSON encoding
+    """
+    return hashlib.sha256(json_codec.dumps(schema, sort_keys=True)).hexdigest()
+
+
+def generate_validator_source(schema: Dict[str, Any]) -> str:
+    """Generate the source of a standalone validator module for a schema.
+
+    Args:
+        schema: Schema dictionary
+
+    Returns:
+        Python source exposing validate() and SCHEMA_SHA256
+    """
+    fingerprint = schema_fingerprint(schema)  # before codegen, which may resolve $refs in place
+    code = fastjsonschema.compile_to_code(schema)
+    entry_point = re.search(r"^def (\w+)\(", code, re.MULTILINE).group(1)
+    return (
+        '"""Workflow schema validator generated by fastjsonschema. Do not edit.\n\n'
+        'Regenerate after changing workflow.schema.json:\n'
+        '    python -m agent.workflow_schema\n"""\n'
+        f"{code}\n\n"
+        f"SCHEMA_SHA256 = {fingerprint!r}\n"
+        f"validate = {entry_point}\n"
+    )
+
+
+if __name__ == "__main__":
+    default_schema = get_workflow_schema().schema
+    _GENERATED_VALIDATOR_PATH.write_text(generate_validator_source(default_schema))
+    print(f"Wrote {_GENERATED_VALIDATOR_PATH}")
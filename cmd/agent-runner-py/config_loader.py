@@ -0,0 +1,108 @@
+"""Service configuration loading, with an optional precompiled config module.
+
+config.yaml can be compiled at build time into config_compiled.py
+(python -m config_loader config.yaml), a plain Python literal that is imported
+from its cached bytecode instead of parsing YAML at startup. The compiled
+module records a hash of the YAML it was built from and is only used while
+that file is unchanged.
+"""
+import hashlib
+import importlib
+import os
+import sys
+from typing import Any, Dict
+
+COMPILED_MODULE = "config_compiled"
+
+
+def _is_env_placeholder(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith('${') and value.endswith('}')
+
+
+def replace_env_vars(obj: Any) -> Any:
+    """Replace ${VAR} strings with environment values (left as is when unset).
+
+    Args:
+        obj: Parsed config value
+
+    Returns:
+        Config value with placeholders substituted
+    """
+    if isinstance(obj, dict):
+        return {k: replace_env_vars(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [replace_env_vars(item) for item in obj]
+    elif _is_env_placeholder(obj):
+        env_var = obj[2:-1]
+        return os.getenv(env_var, obj)
+    return obj
+
+
+def _parse_yaml(source: bytes) -> Any:
+    """Parse YAML with the libyaml-backed loader when PyYAML was built with it."""
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(source, Loader=loader)
+
+
+def _to_source(obj: Any) -> str:
+    """Render a parsed config value as a Python expression, ${VAR} as os.getenv."""
+    if isinstance(obj, dict):
+        return "{" + ", ".join(f"{k!r}: {_to_source(v)}" for k, v in obj.items()) + "}"
+    if isinstance(obj, list):
+        return "[" + ", ".join(_to_source(item) for item in obj) + "]"
+    if _is_env_placeholder(obj):
+        return f"os.getenv({obj[2:-1]!r}, {obj!r})"
+    return repr(obj)
+
+
+def compile_config(source: bytes) -> str:
+    """Generate the config_compiled module for a YAML config.
+
+    Args:
+        source: Contents of config.yaml
+
+    Returns:
+        Python source defining SOURCE_SHA256 and load()
+    """
+    config = _parse_yaml(source)
+    return (
+        '"""Generated from config.yaml by config_loader. Do not edit."""\n'
+        "import os\n\n"
+        f"SOURCE_SHA256 = {hashlib.sha256(source).hexdigest()!r}\n\n\n"
+        "def load():\n"
+        f"    return {_to_source(config)}\n"
+    )
+
+
+def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
+    """Load configuration, from the compiled module when it matches the file.
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        Configuration dictionary
+    """
+    with open(config_path, 'rb') as f:
+        source = f.read()
+
+    try:
+        compiled = importlib.import_module(COMPILED_MODULE)
+    except ImportError:
+        compiled = None
+    if compiled is not None and compiled.SOURCE_SHA256 == hashlib.sha256(source).hexdigest():
+        return compiled.load()
+
+    return replace_env_vars(_parse_yaml(source))
+
+
+if __name__ == "__main__":
+    config_file = sys.argv[1] if len(sys.argv) > 1 else 'config.yaml'
+    output = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{COMPILED_MODULE}.py")
+    with open(config_file, 'rb') as f:
+        compiled_source = compile_config(f.read())
+    with open(output, 'w') as f:
+        f.write(compiled_source)
+    print(f"Wrote {output}")
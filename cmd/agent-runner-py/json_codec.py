@@ -0,0 +1,42 @@
+"""Fast JSON encode/decode with orjson, falling back to the stdlib json module."""
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json
+    orjson = None
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parse JSON text.
+
+    Args:
+        data: JSON document as str or bytes
+
+    Returns:
+        Decoded Python object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes.
+
+    Args:
+        obj: Object to serialize
+        sort_keys: Sort object keys (use for hashing / cache keys)
+        default: Called for objects that are not natively serializable
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, sort_keys=sort_keys, default=default, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
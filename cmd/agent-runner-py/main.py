@@ -4,35 +4,42 @@ This service processes LLM-powered agent tasks during workflow execution.
 It is a Redis worker that picks jobs from Redis queues, calls LLM with tools,
 executes the tools, stores results in DB, and publishes results back to Redis.
 """
+import asyncio
+import gc
 import os
 import sys
 import signal
 import logging
 import json
-import yaml
 import time
-import psutil
-import threading
-from datetime import datetime, timezone
+from collections import ChainMap
 from threading import Thread
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
+import openai
+import redis
+import requests
+
 # FastAPI for HTTP server
 from fastapi import FastAPI, HTTPException
 import uvicorn
 
 # Import our modules
+import json_codec
+from config_loader import load_config
+from agent.async_runtime import run_sync
 from agent.llm_client import LLMClient
-from agent.workflow_schema import WorkflowSchema
+from agent.workflow_schema import get_workflow_schema
 from agent.intent_classifier import IntentClassifier
+from agent.tools import get_tool_help, validate_tool_args
 from storage.memory import MemoryStorage
 from storage.redis_client import RedisClient
 from pipeline.executor import execute_pipeline_tool
 from workflow.patch_client import patch_workflow_tool
 from patch_validator import validate_patch_operations
-from metrics import RuntimeMetrics, SystemInfo, create_metrics
+from metrics import RuntimeMetrics, create_metrics
 
 # Load environment variables
 load_dotenv()
@@ -44,6 +51,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Max job completions sent in one Redis pipeline by the result writer
+OUTBOX_MAX_BATCH = 64
+# Tries per completion batch, and the first backoff between them (doubled each time)
+OUTBOX_SEND_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 0.5
+# Seconds between scans of the pending list for jobs whose completions were never written
+RECLAIM_INTERVAL = 60
+
+# Network errors, timeouts, rate limits are retryable (subclasses included)
+RETRYABLE_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    redis.exceptions.ConnectionError,
+    redis.exceptions.TimeoutError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+# Also matched by name, for same-named errors from libraries not imported here
+RETRYABLE_ERROR_NAMES = frozenset({'ConnectionError', 'Timeout', 'TimeoutError', 'RateLimitError', 'ServiceUnavailable'})
+
 
 class AgentService:
     """Agent service that processes jobs from Redis queue."""
@@ -61,7 +91,7 @@ class AgentService:
         logger.info("Initializing agent service...")
 
         # Load workflow schema
-        self.workflow_schema = WorkflowSchema()
+        self.workflow_schema = get_workflow_schema()
         schema_summary = self.workflow_schema.get_schema_summary()
 
         # Initialize intent classifier
@@ -71,10 +101,18 @@ class AgentService:
         self.storage = MemoryStorage()
         self.llm = LLMClient(config['llm'], workflow_schema_summary=schema_summary)
 
-        # Worker pool
+        # Workers are asyncio tasks on the shared event loop; the thread pool
+        # only runs blocking tool calls
         self.num_workers = config['service'].get('workers', 4)
         self.worker_pool = ThreadPoolExecutor(max_workers=self.num_workers)
 
+        # Max jobs per XREADGROUP, also the size of the queue feeding the workers
+        self.job_batch_size = config['service'].get('job_batch_size', self.num_workers)
+        self._job_queue: Optional[asyncio.Queue] = None
+
+        # Job completions waiting for the result writer (None stops it)
+        self._outbox: Optional[asyncio.Queue] = None
+
         # Orchestrator URL for patch forwarding
         self.orchestrator_url = config['orchestrator']['api_url']
 
@@ -93,48 +131,129 @@ class AgentService:
         http_thread.start()
         logger.info("HTTP server started in background")
 
-        # Start worker pool
+        # Run the workers as tasks on the shared event loop (blocks until stop()
+        # and the drain of the jobs already read)
         logger.info(f"Starting {self.num_workers} workers...")
-        futures = []
-        for i in range(self.num_workers):
-            future = self.worker_pool.submit(self._worker_loop, worker_id=i)
-            futures.append(future)
+        run_sync(self._run_workers())
 
-        # Wait for all workers (blocks until shutdown)
+    def stop(self):
+        """Stop reading new jobs; start() returns once the jobs already read are done."""
+        logger.info("Stopping job reader, draining queued jobs...")
+        self.running = False
+
+    async def _run_workers(self):
+        """Run one stream reader, num_workers job workers and the result writer until stop()."""
+        self._job_queue = asyncio.Queue(maxsize=self.job_batch_size)
+        self._outbox = asyncio.Queue()
+        writer = asyncio.create_task(self._write_results())
+        workers = [asyncio.create_task(self._worker_loop(worker_id=i)) for i in range(self.num_workers)]
         try:
-            for future in futures:
-                future.result()
-        except KeyboardInterrupt:
-            logger.info("Received interrupt signal")
-            self.shutdown()
+            await self._read_jobs()
+        finally:
+            # Reader is done; let the workers finish the queued jobs (one None stops
+            # each worker), then flush the completions they queued and stop the writer
+            for _ in workers:
+                await self._job_queue.put(None)
+            await asyncio.gather(*workers)
+            self._outbox.put_nowait(None)
+            await writer
+            await self.redis.aclose()
+
+    async def _write_results(self):
+        """Send queued job completions to Redis, one pipeline per batch.
+
+        Completions queued while the previous pipeline was in flight go out
+        together. Each message is ACKed in the same pipeline as its signals, so
+        a job whose completion was never written stays pending in the stream.
+        """
+        stopping = False
+        while not stopping:
+            completion = await self._outbox.get()
+            batch = []
+            while completion is not None:
+                batch.append(completion)
+                if len(batch) >= OUTBOX_MAX_BATCH or self._outbox.empty():
+                    break
+                completion = self._outbox.get_nowait()
+            stopping = completion is None
+
+            if batch:
+                await self._send_completions(batch)
+
+    async def _send_completions(self, batch):
+        """Send one batch of completions, retrying with exponential backoff.
+
+        Retries never duplicate a completion: each batch is one transaction
+        and pushes are skipped for messages already completed. A batch that
+        still fails is dropped without its XACK, so the jobs stay pending in
+        the stream until _read_jobs() reclaims them.
+        """
+        delay = OUTBOX_RETRY_DELAY
+        for attempt in range(1, OUTBOX_SEND_ATTEMPTS + 1):
+            try:
+                await self.redis.acomplete_jobs(batch)
+                return
+            except Exception as e:
+                if attempt == OUTBOX_SEND_ATTEMPTS:
+                    logger.error(f"Result writer gave up on {len(batch)} completions after {attempt} attempts, "
+                                 f"leaving messages {[completion[3] for completion in batch]} pending: {e}",
+                                 exc_info=True)
+                    return
+                logger.warning(f"Result writer failed to send {len(batch)} completions "
+                               f"(attempt {attempt}/{OUTBOX_SEND_ATTEMPTS}), retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def _read_jobs(self):
+        """Feed the job queue from a single blocking XREADGROUP connection.
+
+        Every RECLAIM_INTERVAL seconds the stale pending jobs are claimed
+        first, a batch per read until the pending list is walked.
+        """
+        next_reclaim = time.monotonic()
+        while self.running:
+            try:
+                jobs = []
+                if time.monotonic() >= next_reclaim:
+                    next_reclaim = time.monotonic() + RECLAIM_INTERVAL
+                    jobs = await self.redis.aclaim_jobs(count=self.job_batch_size)
+                    if len(jobs) == self.job_batch_size:
+                        next_reclaim = time.monotonic()  # A full batch, more may be pending
+                if not jobs:
+                    # Blocking read from Redis (timeout configured in redis config)
+                    jobs = await self.redis.apop_jobs(count=self.job_batch_size)
+            except Exception as e:
+                logger.error(f"Job reader error: {e}", exc_info=True)
+                await asyncio.sleep(1)  # Back off on error
+                continue
 
-    def _worker_loop(self, worker_id: int):
-        """Worker loop that processes jobs from Redis.
+            # Waits while the queue is full, so reads never run ahead of the workers
+            for job in jobs:
+                await self._job_queue.put(job)
+
+    async def _worker_loop(self, worker_id: int):
+        """Worker loop that processes jobs from the job queue until it gets None.
 
         Args:
             worker_id: Worker identifier for logging
         """
         logger.info(f"Worker {worker_id} started")
 
-        while self.running:
-            try:
-                # Blocking pop from Redis (timeout configured in redis config)
-                job = self.redis.pop_job()
-
-                if job:
-                    logger.info(f"Worker {worker_id} processing job {job.get('job_id')}")
-                    self._process_job(job)
-                else:
-                    # Timeout, continue loop
-                    pass
+        while True:
+            job = await self._job_queue.get()
+            if job is None:
+                break
 
+            try:
+                logger.info("Worker %d processing job %s", worker_id, job.get('job_id'))
+                await self._process_job(job)
             except Exception as e:
                 logger.error(f"Worker {worker_id} error: {e}", exc_info=True)
-                time.sleep(1)  # Back off on error
+                await asyncio.sleep(1)  # Back off on error
 
         logger.info(f"Worker {worker_id} stopped")
 
-    def _process_job(self, job: Dict[str, Any]):
+    async def _process_job(self, job: Dict[str, Any]):
         """Process a single job.
 
         Args:
@@ -142,13 +261,15 @@ class AgentService:
         """
         # Track execution metrics
         sent_at = job.get('sent_at')  # From coordinator
-        start_time = time.time()  # Use Unix timestamp
+        start_time = time.time()  # Use Unix timestamp (queue time is measured against sent_at)
+        start_ns = time.monotonic_ns()  # Execution time, immune to wall-clock steps
 
         # Capture runtime metrics at start
         runtime_metrics = RuntimeMetrics()
 
-        # Log the received job for debugging
-        logger.info(f"Received job data: {json.dumps(job, indent=2)}")
+        # Log the received job for debugging (the indented dump is skipped at INFO)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received job data: %s", json_codec.dumps(job, default=str).decode())
 
         job_id = job.get('job_id')
         run_id = job.get('run_id')
@@ -172,34 +293,34 @@ class AgentService:
             return
 
         try:
-            # Enhance context with current workflow if provided in job
-            enhanced_context = context.copy() if context else {}
+            # Enhance context with current workflow if provided in job. Keys are
+            # written to an overlay on top of the job context instead of a copy.
+            enhanced_context = ChainMap({}, context or {})
 
             # Check if job includes current workflow
             if job.get('current_workflow'):
                 enhanced_context['current_workflow'] = job['current_workflow']
-                logger.info(f"Job includes workflow with {len(job['current_workflow'].get('nodes', []))} nodes")
+                logger.info("Job includes workflow with %d nodes", len(job['current_workflow'].get('nodes', [])))
 
             # Add current node_id to context (needed for patch_workflow to connect edges)
             if node_id:
                 enhanced_context['current_node_id'] = node_id
-                logger.info(f"Added current_node_id to context: {node_id}")
+                logger.info("Added current_node_id to context: %s", node_id)
 
             # Classify intent before calling LLM
-            intent_result = self.intent_classifier.classify(task, enhanced_context)
-            logger.info(f"Intent classified: {intent_result['intent']} "
-                       f"(confidence: {intent_result['confidence']:.2f}) - "
-                       f"{intent_result['reasoning']}")
+            intent_result = await self.intent_classifier.aclassify(task, enhanced_context)
+            logger.info("Intent classified: %s (confidence: %.2f) - %s",
+                        intent_result.intent, intent_result.confidence, intent_result.reasoning)
 
             # Store intent classification in context for potential use
-            enhanced_context['intent_classification'] = intent_result
+            enhanced_context['intent_classification'] = intent_result.to_dict()
 
             # Call LLM with tools
-            logger.info(f"Calling LLM for job {job_id}")
-            llm_result = self.llm.chat(task, enhanced_context)
+            logger.info("Calling LLM for job %s", job_id)
+            llm_result = await self.llm.achat(task, enhanced_context)
 
             tool_calls = llm_result.get('tool_calls', [])
-            logger.info(f"LLM returned {len(tool_calls)} tool calls")
+            logger.info("LLM returned %d tool calls", len(tool_calls))
 
             # Handle cases with or without tool calls
             if not tool_calls:
@@ -215,7 +336,7 @@ class AgentService:
             else:
                 # Validate tool choice matches intent (log warning if mismatch)
                 chosen_tool = tool_calls[0].get('function', {}).get('name')
-                expected_intent = intent_result['intent']
+                expected_intent = intent_result.intent
 
                 if expected_intent == 'patch' and chosen_tool != 'patch_workflow':
                     logger.warning(f"Intent mismatch: classified as 'patch' but LLM chose '{chosen_tool}'")
@@ -225,10 +346,13 @@ class AgentService:
                 # For MVP, we'll execute the first tool call
                 # In production, we might need to handle multiple tool calls in sequence
                 tool_call = tool_calls[0]
-                result_data = self._execute_tool(job, tool_call)
+                # Tools make blocking HTTP calls; run them off the event loop
+                result_data = await asyncio.get_running_loop().run_in_executor(
+                    self.worker_pool, self._execute_tool, job, tool_call
+                )
 
             # Finalize runtime metrics
-            end_time = time.time()
+            end_time = _end_time(start_time, start_ns)
             runtime_metrics.finalize()
 
             # Create comprehensive metrics using metrics module
@@ -237,10 +361,11 @@ class AgentService:
             # Embed metrics in result_data
             result_data["metrics"] = metrics_dict
 
-            logger.info(f"Job {job_id} execution metrics: "
-                       f"queue={metrics_dict['queue_time_ms']}ms, exec={metrics_dict['execution_time_ms']}ms, "
-                       f"mem={metrics_dict['memory_start_mb']:.1f}->{metrics_dict['memory_peak_mb']:.1f}->{metrics_dict['memory_end_mb']:.1f}MB, "
-                       f"cpu={metrics_dict['cpu_percent']:.1f}%, threads={metrics_dict['thread_count']}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Job %s execution metrics: queue=%sms, exec=%sms, mem=%.1f->%.1f->%.1fMB, cpu=%.1f%%, threads=%s",
+                            job_id, metrics_dict['queue_time_ms'], metrics_dict['execution_time_ms'],
+                            metrics_dict['memory_start_mb'], metrics_dict['memory_peak_mb'], metrics_dict['memory_end_mb'],
+                            metrics_dict['cpu_percent'], metrics_dict['thread_count'])
 
             # Store result in database
             result_ref = self._store_result(
@@ -269,10 +394,9 @@ class AgentService:
                     "llm_model": llm_result.get('model')
                 }
             }
-            self.redis.signal_completion(completion_signal)
-
-            # Publish result to job-specific queue (backward compatibility)
-            self.redis.publish_result(job_id, {
+            # Queue the coordinator signal, the job-specific result (backward
+            # compatibility) and the stream ACK for the result writer
+            self._outbox.put_nowait((job_id, completion_signal, {
                 "version": "1.0",
                 "job_id": job_id,
                 "status": "completed",
@@ -285,28 +409,20 @@ class AgentService:
                     "execution_time_ms": llm_result.get('execution_time_ms'),
                     "llm_model": llm_result.get('model')
                 }
-            })
+            }, job.get('message_id')))
 
-            logger.info(f"Job {job_id} completed successfully")
-
-            # ACK message from stream
-            if job.get('message_id'):
-                self.redis.ack_message(job['message_id'])
+            logger.info("Job %s completed successfully", job_id)
 
         except Exception as e:
             logger.error(f"Job {job_id} failed: {e}", exc_info=True)
 
             # Finalize metrics even on failure
-            end_time = time.time()
+            end_time = _end_time(start_time, start_ns)
             runtime_metrics.finalize()
 
             # Create comprehensive metrics using metrics module
             failure_metrics = create_metrics(sent_at, start_time, end_time, runtime_metrics)
 
-            # ACK message even on failure to remove from pending
-            if job.get('message_id'):
-                self.redis.ack_message(job['message_id'])
-
             # Signal failure to coordinator (new architecture)
             failure_signal = {
                 "version": "1.0",
@@ -322,10 +438,9 @@ class AgentService:
                     "metrics": failure_metrics
                 }
             }
-            self.redis.signal_completion(failure_signal)
-
-            # Publish failure result to job-specific queue (backward compatibility)
-            self.redis.publish_result(job_id, {
+            # Queue the failure signal and result, and the ACK (even on failure
+            # to remove from pending), for the result writer
+            self._outbox.put_nowait((job_id, failure_signal, {
                 "version": "1.0",
                 "job_id": job_id,
                 "status": "failed",
@@ -334,7 +449,7 @@ class AgentService:
                     "message": str(e),
                     "retryable": self._is_retryable(e)
                 }
-            })
+            }, job.get('message_id')))
 
     def _execute_tool(self, job: Dict[str, Any], tool_call: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool call.
@@ -353,12 +468,28 @@ class AgentService:
         if not tool_name or not arguments_str:
             raise ValueError(f"Invalid tool call: {tool_call}")
 
-        # Parse arguments
+        # Parse arguments (orjson's JSONDecodeError subclasses the stdlib one)
         try:
-            arguments = json.loads(arguments_str)
+            arguments = json_codec.loads(arguments_str)
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to parse tool arguments: {e}")
 
+        # Check arguments against the tool's compiled parameters schema before running it
+        try:
+            validate_tool_args(tool_name, arguments)
+        except ValueError as e:
+            logger.error(f"Tool argument validation failed: {e}")
+            error_result = {
+                'status': 'error',
+                'error': str(e),
+                'error_type': 'ToolArgumentsError',
+                'message': f"Tool call rejected: {e}"
+            }
+            tool_help = get_tool_help(tool_name)
+            if tool_help and not self.llm.verbose_tool_hints:
+                error_result['tool_help'] = tool_help
+            return error_result
+
         logger.info(f"Executing tool: {tool_name}")
 
         # Execute tool based on name
@@ -376,12 +507,16 @@ class AgentService:
             except ValueError as e:
                 logger.error(f"Patch validation failed: {e}")
                 # Return error instead of forwarding bad patch
-                return {
+                error_result = {
                     'status': 'error',
                     'error': str(e),
                     'error_type': 'PatchValidationError',
                     'message': f"Patch rejected: {e}"
                 }
+                # Format examples are not in the compact tool schema; show them so the retry can fix the patch
+                if not self.llm.verbose_tool_hints:
+                    error_result['tool_help'] = get_tool_help('patch_workflow')
+                return error_result
 
             # Add workflow info from job if not in arguments
             if 'workflow_owner' not in arguments and job.get('workflow_owner'):
@@ -480,23 +615,14 @@ class AgentService:
         Returns:
             True if retryable, False otherwise
         """
-        # Network errors, timeouts, rate limits are retryable
-        retryable_types = [
-            'ConnectionError',
-            'Timeout',
-            'TimeoutError',
-            'RateLimitError',
-            'ServiceUnavailable'
-        ]
-
-        return type(error).__name__ in retryable_types
+        return isinstance(error, RETRYABLE_ERRORS) or type(error).__name__ in RETRYABLE_ERROR_NAMES
 
     def _run_http_server(self):
         """Run HTTP server for health checks and testing."""
         app = FastAPI(title="Agent Runner Service")
 
         @app.get("/health")
-        def health():
+        async def health():
             """Health check endpoint."""
             return {
                 "status": "ok",
@@ -506,7 +632,7 @@ class AgentService:
             }
 
         @app.get("/metrics")
-        def metrics():
+        async def metrics():
             """Metrics endpoint (placeholder for now)."""
             return {
                 "workers": self.num_workers,
@@ -536,18 +662,20 @@ class AgentService:
                 logger.error(f"Test chat failed: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
-        # Run server
+        # Run server on uvloop with the httptools parser (both installed with
+        # uvicorn[standard]); health probes would otherwise log every request
         port = int(self.config['service'].get('port', 8086))
-        uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+        uvicorn.run(app, host="0.0.0.0", port=port, log_level="info",
+                    loop="uvloop", http="httptools", access_log=False)
 
     def shutdown(self):
-        """Gracefully shutdown the service."""
+        """Gracefully shutdown the service (after start() has returned)."""
         logger.info("Shutting down agent service...")
         self.running = False
 
-        # Wait for workers to finish current jobs (max 30 seconds)
+        # Wait for blocking tool calls still running in the thread pool
         logger.info("Waiting for workers to finish...")
-        self.worker_pool.shutdown(wait=True, timeout=30)
+        self.worker_pool.shutdown(wait=True)
 
         # Close connections
         logger.info("Closing connections...")
@@ -557,31 +685,9 @@ class AgentService:
         logger.info("Shutdown complete")
 
 
-def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
-    """Load configuration from YAML file.
-
-    Args:
-        config_path: Path to config file
-
-    Returns:
-        Configuration dictionary
-    """
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-
-    # Replace environment variables
-    def replace_env_vars(obj):
-        if isinstance(obj, dict):
-            return {k: replace_env_vars(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [replace_env_vars(item) for item in obj]
-        elif isinstance(obj, str) and obj.startswith('${') and obj.endswith('}'):
-            env_var = obj[2:-1]
-            return os.getenv(env_var, obj)
-        return obj
-
-    config = replace_env_vars(config)
-    return config
+def _end_time(start_time: float, start_ns: int) -> float:
+    """Unix end timestamp of a job, from its start timestamp and the monotonic clock."""
+    return start_time + (time.monotonic_ns() - start_ns) / 1e9
 
 
 def main():
@@ -603,11 +709,18 @@ def main():
     # Create and start service
     service = AgentService(config)
 
-    # Setup signal handlers for graceful shutdown
+    # Prompts, tool schemas and validators are built once at import and live
+    # for the whole process; move them out of the collector's generations so
+    # GC passes don't rescan (and dirty the pages of) these objects
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Froze {gc.get_freeze_count()} startup objects out of GC tracking")
+
+    # Setup signal handlers for graceful shutdown: start() returns once the
+    # jobs already read are processed and their completions written
     def signal_handler(signum, frame):
         logger.info(f"Received signal {signum}")
-        service.shutdown()
-        sys.exit(0)
+        service.stop()
 
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
@@ -620,6 +733,8 @@ def main():
         service.shutdown()
         sys.exit(1)
 
+    service.shutdown()
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,7 @@
 """Pipeline execution engine."""
-from typing import Dict, Any, List
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List
 import json
 import logging
 
@@ -8,59 +10,267 @@ from pipeline.primitives import http_request, table_ops
 logger = logging.getLogger(__name__)
 
 
+# Step name -> primitive, shared by every executor. Table steps map straight to
+# their operation rather than table_ops.execute, which would dispatch again.
+_PRIMITIVES = MappingProxyType({
+    'http_request': http_request.execute,
+    'table_sort': table_ops.table_sort,
+    'table_filter': table_ops.table_filter,
+    'table_select': table_ops.table_select,
+    'top_k': table_ops.top_k
+})
+
+# Runs independent steps of graph pipelines (primitives are I/O-bound)
+_STEP_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline-step")
+
+
 class PipelineExecutor:
-    """Execute data pipelines composed of primitives."""
-
-    def __init__(self):
-        """Initialize executor."""
-        self.primitives = {
-            'http_request': http_request.execute,
-            'table_sort': table_ops.execute,
-            'table_filter': table_ops.execute,
-            'table_select': table_ops.execute,
-            'top_k': table_ops.execute
-        }
+    """Execute data pipelines composed of primitives.
+
+    Executors hold no per-run state, so execute_pipeline_tool reuses one.
+    """
+
+    primitives = _PRIMITIVES
 
     def execute(self, pipeline: List[Dict[str, Any]], input_data: Any = None) -> Any:
-        """Execute pipeline steps sequentially.
+        """Execute pipeline steps sequentially, or as a graph if any step has depends_on.
 
         Args:
             pipeline: List of pipeline steps
             input_data: Optional initial input data
 
         Returns:
-            Final result after all steps
+            Final result after all steps (the last step's output)
         """
         if not pipeline:
             raise ValueError("Pipeline cannot be empty")
 
         logger.info(f"Executing pipeline with {len(pipeline)} steps")
 
+        if any('depends_on' in step for step in pipeline):
+            return self._execute_graph(pipeline, input_data)
+
         data = input_data
 
-        for i, step in enumerate(pipeline):
-            step_type = step.get('step')
-            if not step_type:
-                raise ValueError(f"Step {i} missing 'step' field")
+        i = 0
+        while i < len(pipeline):
+            scan_end = _table_scan_end(pipeline, i)
+            if _is_sort_then_top_k(pipeline, i):
+                data = self._run_sort_top_k(i, pipeline, data)
+                i += 2
+            elif scan_end > i:
+                data = self._run_table_scan(i, scan_end, pipeline, data)
+                i = scan_end
+            else:
+                data = self._run_step(i, pipeline, data)
+                i += 1
+
+        logger.info("Pipeline execution completed")
+        return data
+
+    def _execute_graph(self, pipeline: List[Dict[str, Any]], input_data: Any) -> Any:
+        """Execute steps in dependency order, running independent steps concurrently.
 
-            logger.info(f"Step {i+1}/{len(pipeline)}: {step_type}")
+        A step reads input_data if it has no depends_on, the output of its
+        single dependency, or the concatenated outputs of several (rows of list
+        outputs are merged; other outputs are appended as items).
+
+        Args:
+            pipeline: List of pipeline steps, optionally with id and depends_on
+            input_data: Optional initial input data
+
+        Returns:
+            Output of the last step
+        """
+        index_by_id = {}
+        for i, step in enumerate(pipeline):
+            _get_primitive(i, step)
+            step_id = step.get('id')
+            if step_id is not None:
+                if step_id in index_by_id:
+                    raise ValueError(f"Duplicate step id: {step_id}")
+                index_by_id[step_id] = i
 
-            if step_type not in self.primitives:
-                raise ValueError(f"Unknown primitive: {step_type}")
+        dependencies = []
+        for i, step in enumerate(pipeline):
+            unknown = [dep for dep in step.get('depends_on', []) if dep not in index_by_id]
+            if unknown:
+                raise ValueError(f"Step {i} depends on unknown step ids: {unknown}")
+            dependencies.append([index_by_id[dep] for dep in step.get('depends_on', [])])
 
-            try:
-                # Execute primitive
-                primitive_func = self.primitives[step_type]
-                data = primitive_func(step, data)
+        outputs: Dict[int, Any] = {}
+        remaining = list(range(len(pipeline)))
+        while remaining:
+            ready = [i for i in remaining if all(dep in outputs for dep in dependencies[i])]
+            if not ready:
+                raise ValueError("Pipeline steps have a dependency cycle")
 
-                logger.info(f"Step {i+1} completed successfully")
+            inputs = [_merge_inputs([outputs[dep] for dep in dependencies[i]], input_data) for i in ready]
+            if len(ready) == 1:
+                results = [self._run_step(ready[0], pipeline, inputs[0])]
+            else:
+                logger.info(f"Running {len(ready)} independent steps concurrently")
+                futures = [_STEP_POOL.submit(self._run_step, i, pipeline, data) for i, data in zip(ready, inputs)]
+                wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    future.cancel()
+                results = [future.result() for future in futures]
 
-            except Exception as e:
-                logger.error(f"Step {i+1} failed: {e}")
-                raise ValueError(f"Pipeline failed at step {i+1} ({step_type}): {e}")
+            outputs.update(zip(ready, results))
+            remaining = [i for i in remaining if i not in outputs]
 
         logger.info("Pipeline execution completed")
-        return data
+        return outputs[len(pipeline) - 1]
+
+    def _run_sort_top_k(self, i: int, pipeline: List[Dict[str, Any]], data: Any) -> Any:
+        """Execute table_sort step i and the top_k after it as one partial sort.
+
+        Only the k records top_k keeps are ordered, instead of sorting every
+        record and discarding the rest.
+
+        Args:
+            i: Index of the table_sort step
+            pipeline: List of pipeline steps
+            data: Step input
+
+        Returns:
+            Output of the top_k step
+        """
+        k = pipeline[i + 1]['k']
+        logger.info(f"Steps {i+1}-{i+2}/{len(pipeline)}: table_sort + top_k (k={k})")
+
+        try:
+            data = table_ops.table_sort(pipeline[i], data, limit=k)
+
+            logger.info(f"Steps {i+1}-{i+2} completed successfully")
+            return data
+
+        except Exception as e:
+            logger.error(f"Step {i+1} failed: {e}")
+            raise ValueError(f"Pipeline failed at step {i+1} (table_sort): {e}")
+
+    def _run_table_scan(self, i: int, end: int, pipeline: List[Dict[str, Any]], data: Any) -> Any:
+        """Execute steps i..end-1 (filters/selects ending in top_k) as one pass that stops after k records.
+
+        If the fused pass fails, the steps are rerun one at a time (table
+        operations have no side effects) so the error names the failing step.
+
+        Args:
+            i: Index of the first step
+            end: Index after the last step
+            pipeline: List of pipeline steps
+            data: Input of step i
+
+        Returns:
+            Output of step end-1
+        """
+        step_types = ' + '.join(step['step'] for step in pipeline[i:end])
+        logger.info(f"Steps {i+1}-{end}/{len(pipeline)}: {step_types}")
+
+        try:
+            data = table_ops.table_scan(pipeline[i:end], data)
+
+            logger.info(f"Steps {i+1}-{end} completed successfully")
+            return data
+
+        except Exception as e:
+            logger.debug(f"Fused steps {i+1}-{end} failed ({e}), rerunning one at a time")
+            for n in range(i, end):
+                data = self._run_step(n, pipeline, data)
+            return data
+
+    def _run_step(self, i: int, pipeline: List[Dict[str, Any]], data: Any) -> Any:
+        """Execute step i of the pipeline on data.
+
+        Args:
+            i: Step index
+            pipeline: List of pipeline steps
+            data: Step input
+
+        Returns:
+            Step output
+        """
+        step = pipeline[i]
+        primitive_func = _get_primitive(i, step)
+        step_type = step['step']
+
+        logger.info(f"Step {i+1}/{len(pipeline)}: {step_type}")
+
+        try:
+            # Execute primitive
+            data = primitive_func(step, data)
+
+            logger.info(f"Step {i+1} completed successfully")
+            return data
+
+        except Exception as e:
+            logger.error(f"Step {i+1} failed: {e}")
+            raise ValueError(f"Pipeline failed at step {i+1} ({step_type}): {e}")
+
+
+def _is_sort_then_top_k(pipeline: List[Dict[str, Any]], i: int) -> bool:
+    """Whether step i is a table_sort directly followed by a valid top_k."""
+    if i + 1 >= len(pipeline) or pipeline[i].get('step') != 'table_sort' or pipeline[i + 1].get('step') != 'top_k':
+        return False
+    k = pipeline[i + 1].get('k')
+    return isinstance(k, int) and not isinstance(k, bool) and k >= 1
+
+
+def _table_scan_end(pipeline: List[Dict[str, Any]], i: int) -> int:
+    """End (exclusive) of the table_filter/table_select steps from i and the top_k after them.
+
+    Returns i when the run does not end in top_k: without the early exit, a
+    fused scan is slower than the per-step list comprehensions.
+    """
+    end = i
+    while end < len(pipeline) and pipeline[end].get('step') in ('table_filter', 'table_select'):
+        end += 1
+    if end > i and end < len(pipeline) and pipeline[end].get('step') == 'top_k':
+        return end + 1
+    return i
+
+
+def _get_primitive(i: int, step: Dict[str, Any]) -> Callable[[Dict[str, Any], Any], Any]:
+    """Look up the primitive for step i, raising ValueError for invalid steps."""
+    step_type = step.get('step')
+    if not step_type:
+        raise ValueError(f"Step {i} missing 'step' field")
+
+    primitive_func = _PRIMITIVES.get(step_type)
+    if primitive_func is None:
+        raise ValueError(f"Unknown primitive: {step_type}")
+    return primitive_func
+
+
+def _merge_inputs(dependency_outputs: List[Any], input_data: Any) -> Any:
+    """Input for a graph step from its dependencies' outputs."""
+    if not dependency_outputs:
+        return input_data
+    if len(dependency_outputs) == 1:
+        return dependency_outputs[0]
+
+    merged = []
+    for output in dependency_outputs:
+        if isinstance(output, list):
+            merged.extend(output)
+        else:
+            merged.append(output)
+    return merged
+
+
+def _run_single_step(step: Dict[str, Any], data: Any) -> Any:
+    """Execute a one-step pipeline without the executor's per-step logging.
+
+    Errors are reported as PipelineExecutor.execute would report them.
+    """
+    try:
+        return _PRIMITIVES[step['step']](step, data)
+    except Exception as e:
+        logger.error(f"Step 1 failed: {e}")
+        raise ValueError(f"Pipeline failed at step 1 ({step['step']}): {e}")
+
+
+_EXECUTOR = PipelineExecutor()
 
 
 def execute_pipeline_tool(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -84,9 +294,12 @@ def execute_pipeline_tool(args: Dict[str, Any]) -> Dict[str, Any]:
     # TODO: If input_ref provided, fetch data from CAS
     input_data = None
 
-    # Execute pipeline
-    executor = PipelineExecutor()
-    result_data = executor.execute(pipeline, input_data)
+    # Execute pipeline; the common single-step shape calls its primitive directly
+    step = pipeline[0] if len(pipeline) == 1 and isinstance(pipeline[0], dict) else None
+    if step is not None and step.get('step') in _PRIMITIVES and 'depends_on' not in step:
+        result_data = _run_single_step(step, input_data)
+    else:
+        result_data = _EXECUTOR.execute(pipeline, input_data)
 
     return {
         "status": "success",
@@ -1,10 +1,29 @@
 """HTTP request primitive."""
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any
 import logging
 
+import json_codec
+
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 30)
+
+# Shared session: pipeline steps reuse pooled keep-alive connections instead of
+# a new TCP+TLS handshake per request. Only idempotent GETs are retried.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET'}), raise_on_status=False)
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+
 
 def execute(step: Dict[str, Any], data: Any) -> Any:
     """Execute HTTP request.
@@ -27,16 +46,21 @@ def execute(step: Dict[str, Any], data: Any) -> Any:
 
     try:
         if method == 'GET':
-            response = requests.get(url, params=params, timeout=30)
+            response = _SESSION.get(url, params=params, timeout=TIMEOUT)
         elif method == 'POST':
-            response = requests.post(url, json=params, timeout=30)
+            response = _SESSION.post(url, json=params, timeout=TIMEOUT)
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
         response.raise_for_status()
-        result = response.json()
+        body = response.content
+        try:
+            result = json_codec.loads(body)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(
+                f"Invalid JSON response from {url} ({len(body)} bytes): {e}", response=response)
 
-        logger.info(f"HTTP request successful, got {len(result) if isinstance(result, list) else 1} items")
+        logger.info(f"HTTP request successful, got {len(result) if isinstance(result, list) else 1} items ({len(body)} bytes)")
         return result
 
     except requests.exceptions.RequestException as e:
@@ -1,16 +1,42 @@
 """Table operation primitives (sort, filter, select, top_k)."""
-from typing import Dict, Any, List
+import heapq
+import operator
+from itertools import islice
+from typing import Callable, Dict, Any, Iterator, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-
-def table_sort(step: Dict[str, Any], data: Any) -> Any:
+# Filter loop per table_filter operator, with the comparison inlined so each
+# row costs one comparison opcode instead of an operator function call
+_FILTERS = {
+    '<': lambda data, field, value: [r for r in data if field in r and r[field] < value],
+    '>': lambda data, field, value: [r for r in data if field in r and r[field] > value],
+    '<=': lambda data, field, value: [r for r in data if field in r and r[field] <= value],
+    '>=': lambda data, field, value: [r for r in data if field in r and r[field] >= value],
+    '==': lambda data, field, value: [r for r in data if field in r and r[field] == value],
+    '!=': lambda data, field, value: [r for r in data if field in r and r[field] != value]
+}
+
+# Comparison functions for filters inside table_scan
+_COMPARE = {
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+
+def table_sort(step: Dict[str, Any], data: Any, limit: Optional[int] = None) -> Any:
     """Sort records by field.
 
     Args:
         step: Step configuration with field and order
         data: Input data (list of dicts)
+        limit: Only return the first limit records (a partial sort, same
+            result as sorting then slicing)
 
     Returns:
         Sorted data
@@ -27,12 +53,25 @@ def table_sort(step: Dict[str, Any], data: Any) -> Any:
     logger.info(f"Sorting by {field} ({order})")
 
     reverse = (order == 'desc')
-    sorted_data = sorted(data, key=lambda x: x.get(field, 0), reverse=reverse)
+    try:
+        # C-level key for the common case where every record has the field
+        sorted_data = _sort(data, operator.itemgetter(field), reverse, limit)
+    except KeyError:
+        # Some records lack the field; those sort as 0
+        sorted_data = _sort(data, lambda x: x.get(field, 0), reverse, limit)
 
     logger.info(f"Sorted {len(sorted_data)} records")
     return sorted_data
 
 
+def _sort(data: List[Dict[str, Any]], key: Callable[[Dict[str, Any]], Any], reverse: bool,
+          limit: Optional[int]) -> List[Dict[str, Any]]:
+    """Sort records by key, keeping only the first limit when given."""
+    if limit is not None and limit < len(data):
+        return heapq.nlargest(limit, data, key=key) if reverse else heapq.nsmallest(limit, data, key=key)
+    return sorted(data, key=key, reverse=reverse)[:limit]
+
+
 def table_filter(step: Dict[str, Any], data: Any) -> Any:
     """Filter records by condition.
 
@@ -59,23 +98,11 @@ def table_filter(step: Dict[str, Any], data: Any) -> Any:
 
     logger.info(f"Filtering by {field} {op} {value}")
 
-    # Define operators
-    ops = {
-        '<': lambda a, b: a < b,
-        '>': lambda a, b: a > b,
-        '<=': lambda a, b: a <= b,
-        '>=': lambda a, b: a >= b,
-        '==': lambda a, b: a == b,
-        '!=': lambda a, b: a != b
-    }
-
-    if op not in ops:
+    filter_rows = _FILTERS.get(op)
+    if filter_rows is None:
         raise ValueError(f"Unsupported operator: {op}")
 
-    filtered_data = [
-        record for record in data
-        if field in record and ops[op](record[field], value)
-    ]
+    filtered_data = filter_rows(data, field, value)
 
     logger.info(f"Filtered to {len(filtered_data)} records (from {len(data)})")
     return filtered_data
@@ -134,6 +161,66 @@ def top_k(step: Dict[str, Any], data: Any) -> Any:
     return result
 
 
+def table_scan(steps: List[Dict[str, Any]], data: Any) -> Any:
+    """Run consecutive table_filter/table_select steps, optionally ending in top_k, in one pass.
+
+    Each record goes through every step before the next is read, so no
+    intermediate lists are built and a trailing top_k stops the scan once k
+    records come out. Records after that are never looked at: where running
+    the steps in turn succeeds the output is the same, but a record that would
+    fail a step (e.g. an incomparable filter value) past the k-th output does
+    not fail the scan.
+
+    Args:
+        steps: table_filter and table_select steps, optionally followed by one top_k
+        data: Input data (list of dicts)
+
+    Returns:
+        Output records
+    """
+    if not isinstance(data, list):
+        raise ValueError("table_scan requires list input")
+
+    records: Iterator[Dict[str, Any]] = iter(data)
+    k = None
+    for n, step in enumerate(steps):
+        step_type = step.get('step')
+        if step_type == 'table_filter':
+            condition = step.get('condition') or {}
+            field, op, value = condition.get('field'), condition.get('op'), condition.get('value')
+            if not field or op not in _COMPARE or value is None:
+                raise ValueError(f"Invalid table_filter condition: {condition}")
+            records = _filter_records(records, field, _COMPARE[op], value)
+        elif step_type == 'table_select':
+            fields = step.get('fields')
+            if not fields:
+                raise ValueError("table_select requires 'fields' parameter")
+            records = _select_records(records, fields)
+        elif step_type == 'top_k' and n == len(steps) - 1:
+            k = step.get('k')
+            if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+                raise ValueError("top_k requires 'k' parameter (positive integer)")
+        else:
+            raise ValueError(f"Cannot scan table operation: {step_type}")
+
+    result = list(records if k is None else islice(records, k))
+
+    logger.info(f"Scanned {len(steps)} steps to {len(result)} records (from {len(data)})")
+    return result
+
+
+def _filter_records(records: Iterator[Dict[str, Any]], field: str, compare: Callable[[Any, Any], bool],
+                    value: Any) -> Iterator[Dict[str, Any]]:
+    for record in records:
+        if field in record and compare(record[field], value):
+            yield record
+
+
+def _select_records(records: Iterator[Dict[str, Any]], fields: List[str]) -> Iterator[Dict[str, Any]]:
+    for record in records:
+        yield {field: record.get(field) for field in fields}
+
+
 def execute(step: Dict[str, Any], data: Any) -> Any:
     """Execute table operation based on step type.
 
@@ -9,12 +9,68 @@ Resolves variable expressions in node configs:
 This mirrors the Go implementation in cmd/workflow-runner/resolver/
 """
 
+import functools
 import json
 import re
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Set, Tuple, Union
 import redis
 import logging
 
+import json_codec
+
+# Pattern: ${$nodes.node_id.field.path}
+_INTERPOLATION_RE = re.compile(r'\$\{([^}]+)\}')
+
+# Parsed field path step: ('key', part) or ('index', part, field_name, index),
+# with index None when the brackets don't hold an integer
+PathToken = Tuple[Any, ...]
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_path(path: str) -> Tuple[PathToken, ...]:
+    """Parse a dot-notation field path (e.g. 'body.items[0].price') into tokens once."""
+    tokens = []
+    for part in path.split("."):
+        # Handle array access like "items[0]"
+        if "[" in part and "]" in part:
+            field_name = part[:part.index("[")]
+            index_str = part[part.index("[")+1:part.index("]")]
+            try:
+                index = int(index_str)
+            except ValueError:
+                index = None
+            tokens.append(('index', part, field_name, index))
+        else:
+            tokens.append(('key', part))
+    return tuple(tokens)
+
+
+def _collect_node_ids(value: Any, node_ids: Set[str]):
+    """Add the node ids referenced anywhere in a config value to node_ids."""
+    if isinstance(value, str):
+        if "$nodes." not in value:
+            return
+        if value.startswith("$nodes."):
+            node_ids.add(value[len("$nodes."):].split(".", 1)[0])
+        elif "${" in value:
+            for expr in _INTERPOLATION_RE.findall(value):
+                _collect_node_ids(expr, node_ids)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_node_ids(item, node_ids)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_node_ids(item, node_ids)
+
+
+def _parse_output(data: Union[bytes, str]) -> Any:
+    """Parse a node output from CAS, as JSON when possible."""
+    try:
+        return json_codec.loads(data)
+    except json.JSONDecodeError:  # orjson's JSONDecodeError subclasses this one
+        # Return raw string if not JSON
+        return data.decode('utf-8') if isinstance(data, bytes) else data
+
 
 class Resolver:
     """Resolves variable expressions in workflow configs"""
@@ -35,39 +91,51 @@ class Resolver:
             Resolved configuration with variables substituted
         """
         resolved = {}
+        # Node outputs, prefetched in two round trips and read from Redis at most
+        # once per config
+        node_ids: Set[str] = set()
+        _collect_node_ids(config, node_ids)
+        try:
+            outputs = self._prefetch_node_outputs(run_id, node_ids)
+        except Exception as e:
+            raise ValueError(f"Failed to load node outputs for run {run_id}: {e}")
         for key, value in config.items():
             try:
-                resolved[key] = self._resolve_value(run_id, value)
+                resolved[key] = self._resolve_value(run_id, value, outputs)
             except Exception as e:
                 raise ValueError(f"Failed to resolve config key {key}: {e}")
         return resolved
 
-    def _resolve_value(self, run_id: str, value: Any) -> Any:
+    def _resolve_value(self, run_id: str, value: Any, outputs: Dict[str, Any]) -> Any:
         """Recursively resolve a value (string, dict, list, etc.)"""
         if isinstance(value, str):
-            return self._resolve_string(run_id, value)
+            return self._resolve_string(run_id, value, outputs)
         elif isinstance(value, dict):
-            return {k: self._resolve_value(run_id, v) for k, v in value.items()}
+            return {k: self._resolve_value(run_id, v, outputs) for k, v in value.items()}
         elif isinstance(value, list):
-            return [self._resolve_value(run_id, item) for item in value]
+            return [self._resolve_value(run_id, item, outputs) for item in value]
         else:
             # Primitives pass through
             return value
 
-    def _resolve_string(self, run_id: str, text: str) -> Union[str, Any]:
+    def _resolve_string(self, run_id: str, text: str, outputs: Dict[str, Any]) -> Union[str, Any]:
         """Handle string expressions"""
+        # Most config strings (URLs, methods, ...) hold no expression at all
+        if "$" not in text:
+            return text
+
         # Case 1: Full node reference: "$nodes.node_id" or "$nodes.node_id.field"
         if text.startswith("$nodes."):
-            return self._resolve_node_reference(run_id, text)
+            return self._resolve_node_reference(run_id, text, outputs)
 
         # Case 2: String interpolation: "text ${$nodes.node_id} more"
         if "${" in text:
-            return self._resolve_interpolation(run_id, text)
+            return self._resolve_interpolation(run_id, text, outputs)
 
         # Case 3: Plain string
         return text
 
-    def _resolve_node_reference(self, run_id: str, expr: str) -> Any:
+    def _resolve_node_reference(self, run_id: str, expr: str, outputs: Dict[str, Any]) -> Any:
         """Resolve "$nodes.node_id" or "$nodes.node_id.field.path" """
         # Remove "$nodes." prefix
         expr = expr.replace("$nodes.", "", 1)
@@ -76,8 +144,10 @@ class Resolver:
         parts = expr.split(".", 1)
         node_id = parts[0]
 
-        # Load node output from Redis context
-        output = self._load_node_output(run_id, node_id)
+        # Load node output from Redis context (once per resolve_config call)
+        if node_id not in outputs:
+            outputs[node_id] = self._load_node_output(run_id, node_id)
+        output = outputs[node_id]
 
         # If no field path, return entire output
         if len(parts) == 1:
@@ -87,20 +157,41 @@ class Resolver:
         field_path = parts[1]
         return self._get_nested_field(output, field_path)
 
-    def _resolve_interpolation(self, run_id: str, text: str) -> str:
+    def _resolve_interpolation(self, run_id: str, text: str, outputs: Dict[str, Any]) -> str:
         """Handle string interpolation "${$nodes.node_id.field}" """
-        # Pattern: ${$nodes.node_id.field.path}
-        pattern = re.compile(r'\$\{([^}]+)\}')
-
         def replace_match(match):
             expr = match.group(1)  # Inner expression
-            value = self._resolve_string(run_id, expr)
+            value = self._resolve_string(run_id, expr, outputs)
             # Convert to string
             if isinstance(value, (dict, list)):
                 return json.dumps(value)
             return str(value)
 
-        return pattern.sub(replace_match, text)
+        return _INTERPOLATION_RE.sub(replace_match, text)
+
+    def _prefetch_node_outputs(self, run_id: str, node_ids: Set[str]) -> Dict[str, Any]:
+        """Load several node outputs with one HMGET and one MGET.
+
+        Nodes whose output or CAS data is missing are left out; resolving
+        them falls back to _load_node_output, which raises the usual error.
+        """
+        if not node_ids:
+            return {}
+
+        node_ids = sorted(node_ids)
+        cas_refs = self.redis.hmget(f"context:{run_id}", [f"{node_id}:output" for node_id in node_ids])
+        found = [
+            (node_id, cas_ref.decode('utf-8') if isinstance(cas_ref, bytes) else cas_ref)
+            for node_id, cas_ref in zip(node_ids, cas_refs) if cas_ref
+        ]
+        if not found:
+            return {}
+
+        payloads = self.redis.mget([f"cas:{cas_ref}" for _, cas_ref in found])
+        return {
+            node_id: _parse_output(data)
+            for (node_id, _), data in zip(found, payloads) if data
+        }
 
     def _load_node_output(self, run_id: str, node_id: str) -> Any:
         """Load a node's output from Redis context"""
@@ -120,37 +211,27 @@ class Resolver:
         if not data:
             raise ValueError(f"CAS data not found: {cas_ref}")
 
-        # Parse JSON
-        try:
-            return json.loads(data)
-        except json.JSONDecodeError:
-            # Return raw string if not JSON
-            return data.decode('utf-8') if isinstance(data, bytes) else data
+        return _parse_output(data)
 
     def _get_nested_field(self, data: Any, path: str) -> Any:
         """Extract nested field using dot notation (e.g., 'body.items[0].price')"""
-        # Simple implementation - handles dot notation
-        # For array access like [0], we'd need more parsing
-
-        parts = path.split(".")
         current = data
 
-        for part in parts:
-            # Handle array access like "items[0]"
-            if "[" in part and "]" in part:
-                field_name = part[:part.index("[")]
-                index_str = part[part.index("[")+1:part.index("]")]
-
+        for token in _parse_path(path):
+            if token[0] == 'index':
+                _, part, field_name, index = token
                 if field_name:
                     current = current.get(field_name) if isinstance(current, dict) else current
 
+                if index is None:
+                    raise ValueError(f"Invalid array access: {part}")
                 try:
-                    index = int(index_str)
                     current = current[index]
-                except (ValueError, IndexError, TypeError):
+                except (IndexError, TypeError):
                     raise ValueError(f"Invalid array access: {part}")
             else:
                 # Regular field access
+                part = token[1]
                 if isinstance(current, dict):
                     current = current.get(part)
                 else:
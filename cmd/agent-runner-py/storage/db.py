@@ -1,37 +1,136 @@
 """PostgreSQL database client for agent service."""
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
-from typing import Optional, Dict, Any
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 import logging
 
+import json_codec
+
 logger = logging.getLogger(__name__)
 
+# Multi-row insert for store_results_batch (execute_values fills in VALUES %s)
+_INSERT_RESULTS_SQL = """
+    INSERT INTO agent_results (
+        job_id, run_id, node_id,
+        result_data, cas_id,
+        status, error, tool_calls,
+        tokens_used, cache_hit, execution_time_ms, llm_model,
+        completed_at
+    ) VALUES %s
+    RETURNING result_id
+"""
+_RESULT_ROW_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+
+# Server-side prepared statements, created once per pooled connection so the
+# per-result queries skip parse and plan
+_PREPARED_STATEMENTS = {
+    'agent_insert_result': """
+        INSERT INTO agent_results (
+            job_id, run_id, node_id,
+            result_data, cas_id,
+            status, error, tool_calls,
+            tokens_used, cache_hit, execution_time_ms, llm_model,
+            completed_at
+        ) VALUES (
+            $1, $2, $3,
+            $4, $5,
+            $6, $7, $8,
+            $9, $10, $11, $12,
+            NOW()
+        )
+        RETURNING result_id
+    """,
+    'agent_get_result': "SELECT * FROM agent_results WHERE result_id = $1",
+}
+
+
+def _result_params(
+    job_id: str,
+    run_id: str,
+    node_id: str,
+    result_data: Optional[Dict[str, Any]] = None,
+    cas_id: Optional[str] = None,
+    status: str = "completed",
+    error: Optional[Dict[str, Any]] = None,
+    tool_calls: Optional[list] = None,
+    tokens_used: Optional[int] = None,
+    cache_hit: bool = False,
+    execution_time_ms: Optional[int] = None,
+    llm_model: Optional[str] = None
+) -> Tuple[Any, ...]:
+    """Insert parameters for one agent result (arguments as for store_result)."""
+    return (
+        job_id, run_id, node_id,
+        json_codec.dumps(result_data).decode() if result_data else None, cas_id,
+        status, json_codec.dumps(error).decode() if error else None, json_codec.dumps(tool_calls).decode() if tool_calls else None,
+        tokens_used, cache_hit, execution_time_ms, llm_model
+    )
+
+
+class _Connection(psycopg2.extensions.connection):
+    """Pooled connection that remembers whether its statements are prepared."""
+    statements_prepared = False
+
 
 class DatabaseClient:
-    """PostgreSQL client for storing agent results."""
+    """PostgreSQL client for storing agent results.
+
+    Each call borrows a connection from a thread-safe pool, so concurrent
+    workers don't serialize on (or lose) one shared connection.
+    """
 
     def __init__(self, config: Dict[str, Any]):
-        """Initialize database connection."""
+        """Initialize the database connection pool."""
         self.config = config
-        self.conn = None
+        self.pool = None
         self._connect()
 
     def _connect(self):
-        """Establish database connection."""
+        """Create the database connection pool."""
         try:
-            self.conn = psycopg2.connect(
+            self.pool = ThreadedConnectionPool(
+                self.config.get('min_connections', 1),
+                self.config.get('max_connections', 10),
                 host=self.config['host'],
                 port=self.config['port'],
                 dbname=self.config['dbname'],
                 user=self.config['user'],
-                password=self.config['password']
+                password=self.config['password'],
+                connection_factory=_Connection
             )
-            logger.info("Database connection established")
+            logger.info("Database connection pool established")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    @contextmanager
+    def _connection(self) -> Iterator[_Connection]:
+        """Borrow a pooled connection, preparing statements on its first use.
+
+        The pool rolls back any open transaction when the connection is
+        returned and discards connections that were closed. A connection whose
+        PREPARE fails part-way is closed, since its session may already hold
+        some of the statements.
+        """
+        conn = self.pool.getconn()
+        if not conn.statements_prepared:
+            try:
+                with conn.cursor() as cur:
+                    for name, query in _PREPARED_STATEMENTS.items():
+                        cur.execute(f"PREPARE {name} AS {query}")
+                conn.commit()
+            except Exception:
+                self.pool.putconn(conn, close=True)
+                raise
+            conn.statements_prepared = True
+        try:
+            yield conn
+        finally:
+            self.pool.putconn(conn)
+
     def store_result(
         self,
         job_id: str,
@@ -66,41 +165,59 @@ class DatabaseClient:
         Returns:
             result_id: UUID of stored result
         """
-        try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    INSERT INTO agent_results (
-                        job_id, run_id, node_id,
-                        result_data, cas_id,
-                        status, error, tool_calls,
-                        tokens_used, cache_hit, execution_time_ms, llm_model,
-                        completed_at
-                    ) VALUES (
-                        %s, %s, %s,
-                        %s, %s,
-                        %s, %s, %s,
-                        %s, %s, %s, %s,
-                        NOW()
+        with self._connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(
+                        "EXECUTE agent_insert_result (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                        _result_params(
+                            job_id, run_id, node_id, result_data, cas_id, status, error, tool_calls,
+                            tokens_used, cache_hit, execution_time_ms, llm_model
+                        )
                     )
-                    RETURNING result_id
-                """, (
-                    job_id, run_id, node_id,
-                    json.dumps(result_data) if result_data else None, cas_id,
-                    status, json.dumps(error) if error else None, json.dumps(tool_calls) if tool_calls else None,
-                    tokens_used, cache_hit, execution_time_ms, llm_model
-                ))
 
-                result = cur.fetchone()
-                self.conn.commit()
+                    result = cur.fetchone()
+                    conn.commit()
 
-                result_id = str(result['result_id'])
-                logger.info(f"Stored result for job {job_id}: {result_id}")
-                return result_id
+                    result_id = str(result['result_id'])
+                    logger.info(f"Stored result for job {job_id}: {result_id}")
+                    return result_id
 
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Failed to store result: {e}")
-            raise
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Failed to store result: {e}")
+                raise
+
+    def store_results_batch(self, results: List[Dict[str, Any]], page_size: int = 100) -> List[str]:
+        """Store several agent results with multi-row INSERTs and one commit.
+
+        Args:
+            results: store_result() keyword arguments per result
+            page_size: Rows per INSERT statement
+
+        Returns:
+            result_ids, in the order of results
+        """
+        if not results:
+            return []
+
+        with self._connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    rows = execute_values(
+                        cur, _INSERT_RESULTS_SQL, [_result_params(**result) for result in results],
+                        template=_RESULT_ROW_TEMPLATE, page_size=page_size, fetch=True
+                    )
+                    conn.commit()
+
+                result_ids = [str(row[0]) for row in rows]
+                logger.info(f"Stored {len(result_ids)} results")
+                return result_ids
+
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Failed to store results: {e}")
+                raise
 
     def get_result(self, result_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve result by result_id.
@@ -111,33 +228,32 @@ class DatabaseClient:
         Returns:
             Result dictionary or None if not found
         """
-        try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT * FROM agent_results WHERE result_id = %s
-                """, (result_id,))
-
-                row = cur.fetchone()
-                if not row:
-                    return None
-
-                # Convert to dict and parse JSON fields
-                result = dict(row)
-                if result.get('result_data'):
-                    result['result_data'] = json.loads(result['result_data']) if isinstance(result['result_data'], str) else result['result_data']
-                if result.get('error'):
-                    result['error'] = json.loads(result['error']) if isinstance(result['error'], str) else result['error']
-                if result.get('tool_calls'):
-                    result['tool_calls'] = json.loads(result['tool_calls']) if isinstance(result['tool_calls'], str) else result['tool_calls']
-
-                return result
+        with self._connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute("EXECUTE agent_get_result (%s)", (result_id,))
 
-        except Exception as e:
-            logger.error(f"Failed to retrieve result: {e}")
-            raise
+                    row = cur.fetchone()
+                    if not row:
+                        return None
+
+                    # Convert to dict and parse JSON fields
+                    result = dict(row)
+                    if result.get('result_data'):
+                        result['result_data'] = json_codec.loads(result['result_data']) if isinstance(result['result_data'], str) else result['result_data']
+                    if result.get('error'):
+                        result['error'] = json_codec.loads(result['error']) if isinstance(result['error'], str) else result['error']
+                    if result.get('tool_calls'):
+                        result['tool_calls'] = json_codec.loads(result['tool_calls']) if isinstance(result['tool_calls'], str) else result['tool_calls']
+
+                    return result
+
+            except Exception as e:
+                logger.error(f"Failed to retrieve result: {e}")
+                raise
 
     def close(self):
-        """Close database connection."""
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
+        """Close all pooled database connections."""
+        if self.pool:
+            self.pool.closeall()
+            logger.info("Database connection pool closed")
@@ -1,12 +1,32 @@
 """Redis client for agent service."""
 import redis
-import json
-from typing import Optional, Dict, Any
+import redis.asyncio
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 import uuid
 
+import json_codec
+
 logger = logging.getLogger(__name__)
 
+# (job_id, completion_signal, result, message_id)
+Completion = Tuple[str, Dict[str, Any], Dict[str, Any], Optional[str]]
+
+# Marker set when a stream message's completion is pushed, so a retried batch
+# or a reclaimed job never pushes the same completion twice
+COMPLETED_KEY_PREFIX = "agent:completed"
+
+# KEYS: completed marker, completion_signals, result queue
+# ARGV: marker TTL (seconds), completion signal, result
+_PUSH_COMPLETION_LUA = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+    redis.call('RPUSH', KEYS[3], ARGV[3])
+    return 1
+end
+return 0
+"""
+
 
 class RedisClient:
     """Redis client for job queue (streams) and result publishing."""
@@ -20,11 +40,25 @@ class RedisClient:
             db=config['db'],
             decode_responses=True
         )
+        # Async client for the worker event loop; connects lazily, on the loop that first uses it
+        self.aclient = redis.asyncio.Redis(
+            host=config['host'],
+            port=config['port'],
+            db=config['db'],
+            decode_responses=True
+        )
         # Use Redis streams for new architecture
         self.stream = config.get('stream', 'wf.tasks.agent')
         self.consumer_group = config.get('consumer_group', 'agent_workers')
         self.consumer_name = f"agent_worker_{uuid.uuid4().hex[:8]}"
         self.timeout = config.get('timeout', 5) * 1000  # Convert to milliseconds
+        # Messages pending longer than this are claimed by aclaim_jobs()
+        self.reclaim_idle = config.get('reclaim_idle', 300) * 1000  # Convert to milliseconds
+        self._claim_cursor = '0-0'
+        # How long completed markers outlive their message (must cover reclaim_idle)
+        self.completed_ttl = config.get('completed_ttl', 86400)
+        # Loaded by the pipelines that use it (only its sha and source are read)
+        self._push_completion = self.aclient.register_script(_PUSH_COMPLETION_LUA)
 
         # Backward compatibility: legacy queue names
         self.job_queue = config.get('job_queue', 'agent:jobs')
@@ -55,83 +89,222 @@ class RedisClient:
         Returns:
             Job dictionary or None if timeout
         """
+        jobs = self.pop_jobs(count=1)
+        return jobs[0] if jobs else None
+
+    def pop_jobs(self, count: int) -> List[Dict[str, Any]]:
+        """Pop up to count jobs from the stream in one blocking XREADGROUP.
+
+        Args:
+            count: Maximum number of messages to read
+
+        Returns:
+            Jobs in stream order (empty on timeout)
+        """
         try:
             # Read from stream using consumer group
-            messages = self.client.xreadgroup(
-                groupname=self.consumer_group,
-                consumername=self.consumer_name,
-                streams={self.stream: '>'},
-                count=1,
-                block=self.timeout
-            )
+            messages = self.client.xreadgroup(**self._read_args(count))
+            tokens, invalid_ids = self._parse_messages(messages)
+            if invalid_ids:
+                # ACK the messages to remove them from pending
+                self.client.xack(self.stream, self.consumer_group, *invalid_ids)
+
+            ir_keys = self._ir_keys(tokens)
+            ir_values = []
+            if ir_keys:
+                try:
+                    ir_values = self.client.mget(ir_keys)
+                except Exception as e:
+                    logger.error(f"Failed to fetch workflow IR from Redis: {e}")
+            return self._to_jobs(tokens, ir_values)
+
+        except Exception as e:
+            logger.error(f"Failed to read from stream: {e}")
+            raise
 
-            if not messages:
-                return None
+    async def apop_jobs(self, count: int) -> List[Dict[str, Any]]:
+        """Async version of pop_jobs() (for the worker event loop)."""
+        try:
+            messages = await self.aclient.xreadgroup(**self._read_args(count))
+            return await self._ajobs(messages)
+
+        except Exception as e:
+            logger.error(f"Failed to read from stream: {e}")
+            raise
+
+    async def aclaim_jobs(self, count: int) -> List[Dict[str, Any]]:
+        """Claim up to count jobs left pending longer than reclaim_idle (async).
 
-            # Extract message from stream
-            stream_name, message_list = messages[0]
-            if not message_list:
-                return None
+        Picks up jobs whose completion was never written, whether their
+        consumer died or the result writer gave up. Each call continues the
+        XAUTOCLAIM scan of the pending list where the previous one stopped.
+
+        Args:
+            count: Maximum number of messages to claim
+
+        Returns:
+            Claimed jobs in stream order
+        """
+        try:
+            next_id, claimed = (await self.aclient.xautoclaim(
+                self.stream, self.consumer_group, self.consumer_name,
+                min_idle_time=self.reclaim_idle, start_id=self._claim_cursor, count=count
+            ))[:2]
+            self._claim_cursor = next_id
+            # Messages trimmed from the stream come back without data
+            claimed = [(message_id, data) for message_id, data in claimed if data]
+            if claimed:
+                # Jobs whose completion was pushed but not ACKed only need the ACK
+                completed = await self.aclient.mget([f"{COMPLETED_KEY_PREFIX}:{message_id}" for message_id, _ in claimed])
+                done_ids = [message_id for (message_id, _), marker in zip(claimed, completed) if marker]
+                if done_ids:
+                    await self.aclient.xack(self.stream, self.consumer_group, *done_ids)
+                    logger.info(f"ACKed {len(done_ids)} reclaimed messages that were already completed")
+                claimed = [entry for entry, marker in zip(claimed, completed) if not marker]
+            if claimed:
+                logger.warning(f"Reclaimed {len(claimed)} stale pending jobs")
+            return await self._ajobs([(self.stream, claimed)] if claimed else None)
 
-            message_id, message_data = message_list[0]
+        except Exception as e:
+            logger.error(f"Failed to claim pending jobs: {e}")
+            raise
+
+    async def _ajobs(self, messages) -> List[Dict[str, Any]]:
+        """Jobs for an XREADGROUP-style reply, ACKing the messages without a valid token."""
+        tokens, invalid_ids = self._parse_messages(messages)
+        if invalid_ids:
+            await self.aclient.xack(self.stream, self.consumer_group, *invalid_ids)
+
+        ir_keys = self._ir_keys(tokens)
+        ir_values = []
+        if ir_keys:
+            try:
+                ir_values = await self.aclient.mget(ir_keys)
+            except Exception as e:
+                logger.error(f"Failed to fetch workflow IR from Redis: {e}")
+        return self._to_jobs(tokens, ir_values)
+
+    def _read_args(self, count: int) -> Dict[str, Any]:
+        """XREADGROUP arguments for a blocking read of up to count new messages."""
+        return {
+            'groupname': self.consumer_group,
+            'consumername': self.consumer_name,
+            'streams': {self.stream: '>'},
+            'count': count,
+            'block': self.timeout
+        }
+
+    def _parse_messages(self, messages) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[str]]:
+        """Decode coordinator tokens from an XREADGROUP reply.
+
+        Args:
+            messages: XREADGROUP reply (None on timeout)
+
+        Returns:
+            Tuple of ((message_id, token) pairs, IDs of messages without a valid token)
+        """
+        tokens, invalid_ids = [], []
+        if not messages:
+            return tokens, invalid_ids
 
+        # Extract messages from stream
+        stream_name, message_list = messages[0]
+        for message_id, message_data in message_list:
             # Parse token from message
             token_json = message_data.get('token')
             if not token_json:
                 logger.error(f"Message {message_id} missing token field")
-                # ACK the message to remove it from pending
-                self.client.xack(self.stream, self.consumer_group, message_id)
-                return None
+                invalid_ids.append(message_id)
+                continue
 
-            token = json.loads(token_json)
+            try:
+                token = json_codec.loads(token_json)
+                if not isinstance(token, dict):
+                    raise ValueError(f"expected an object, got {type(token).__name__}")
+            except ValueError as e:
+                logger.error(f"Message {message_id} has an invalid token: {e}")
+                invalid_ids.append(message_id)
+                continue
 
             # Log the raw token received from coordinator for debugging
-            logger.info(f"Raw token from coordinator: {json.dumps(token, indent=2)}")
-            logger.info(f"Token metadata: {token.get('metadata', 'NO METADATA FIELD')}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw token from coordinator: %s", token_json)
+                logger.debug("Token metadata: %s", token.get('metadata', 'NO METADATA FIELD'))
+            tokens.append((message_id, token))
+        return tokens, invalid_ids
 
-            # Fetch current workflow IR from Redis
+    def _ir_keys(self, tokens: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Workflow IR keys to MGET, one per token with a run_id (in token order)."""
+        ir_keys = []
+        for _, token in tokens:
             run_id = token.get('run_id')
-            current_workflow = None
             if run_id:
-                ir_key = f"ir:{run_id}"
+                ir_keys.append(f"ir:{run_id}")
+            else:
+                logger.warning("Token missing run_id, cannot fetch workflow IR")
+        return ir_keys
+
+    def _to_jobs(self, tokens: List[Tuple[str, Dict[str, Any]]], ir_values: List[Optional[str]]) -> List[Dict[str, Any]]:
+        """Convert tokens to jobs, attaching the workflow IRs fetched for their runs.
+
+        Args:
+            tokens: (message_id, token) pairs
+            ir_values: MGET reply for _ir_keys(tokens), empty if the fetch failed
+
+        Returns:
+            Jobs in stream order
+        """
+        ir_values = iter(ir_values)
+        jobs = []
+        for message_id, token in tokens:
+            run_id = token.get('run_id')
+            current_workflow = None
+            ir_data = next(ir_values, None) if run_id else None
+            if run_id and not ir_data:
+                logger.warning(f"No IR found in Redis for run_id {run_id} at key ir:{run_id}")
+            elif ir_data:
                 try:
-                    ir_data = self.client.get(ir_key)
-                    if ir_data:
-                        current_workflow = json.loads(ir_data)
-                        logger.info(f"Fetched workflow IR from Redis: {ir_key}, nodes={len(current_workflow.get('nodes', {}))}")
-                    else:
-                        logger.warning(f"No IR found in Redis for run_id {run_id} at key {ir_key}")
+                    current_workflow = json_codec.loads(ir_data)
+                    logger.info("Fetched workflow IR from Redis: ir:%s, nodes=%d", run_id, len(current_workflow.get('nodes', {})))
                 except Exception as e:
                     logger.error(f"Failed to fetch workflow IR from Redis: {e}")
-            else:
-                logger.warning("Token missing run_id, cannot fetch workflow IR")
+            jobs.append(self._to_job(message_id, token, current_workflow))
 
-            # Convert token to job format expected by main.py
-            metadata = token.get('metadata', {})
-            job = {
-                'job_id': token.get('id'),
-                'run_id': run_id,
-                'node_id': token.get('to_node'),
-                'task': metadata.get('task', ''),
-                'context': metadata.get('context', {}),
-                'workflow_owner': token.get('workflow_owner', 'test-user'),  # From coordinator, with fallback
-                'workflow_tag': metadata.get('workflow_tag', ''),  # Optional, for context
-                'current_workflow': current_workflow,  # Fetched from Redis IR
-                'current_node_id': token.get('to_node'),  # The node that will execute (for patch edge creation)
-                'token': token,  # Store full token for later
-                'message_id': message_id  # Store for ACK
-            }
-
-            logger.info(f"Converted job: job_id={job.get('job_id')}, task='{job.get('task')}', "
-                       f"workflow_owner='{job.get('workflow_owner')}', "
-                       f"current_node_id='{job.get('current_node_id')}', "
-                       f"has_workflow={current_workflow is not None}")
-            logger.info(f"Received job from stream: {job.get('job_id')}")
-            return job
+        if len(jobs) > 1:
+            logger.info(f"Received {len(jobs)} jobs from stream in one read")
+        return jobs
 
-        except Exception as e:
-            logger.error(f"Failed to read from stream: {e}")
-            raise
+    def _to_job(self, message_id: str, token: Dict[str, Any],
+                current_workflow: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert a coordinator token to the job format expected by main.py.
+
+        Args:
+            message_id: Stream message ID (kept for ACK)
+            token: Token from the coordinator
+            current_workflow: Workflow IR fetched for the token's run
+
+        Returns:
+            Job dictionary
+        """
+        metadata = token.get('metadata', {})
+        job = {
+            'job_id': token.get('id'),
+            'run_id': token.get('run_id'),
+            'node_id': token.get('to_node'),
+            'task': metadata.get('task', ''),
+            'context': metadata.get('context', {}),
+            'workflow_owner': token.get('workflow_owner', 'test-user'),  # From coordinator, with fallback
+            'workflow_tag': metadata.get('workflow_tag', ''),  # Optional, for context
+            'current_workflow': current_workflow,  # Fetched from Redis IR
+            'current_node_id': token.get('to_node'),  # The node that will execute (for patch edge creation)
+            'token': token,  # Store full token for later
+            'message_id': message_id  # Store for ACK
+        }
+
+        logger.info("Converted job: job_id=%s, task='%s', workflow_owner='%s', current_node_id='%s', has_workflow=%s",
+                    job['job_id'], job['task'], job['workflow_owner'], job['current_node_id'], current_workflow is not None)
+        logger.info("Received job from stream: %s", job['job_id'])
+        return job
 
     def publish_result(self, job_id: str, result: Dict[str, Any]):
         """Publish result to job-specific result queue.
@@ -142,7 +315,7 @@ class RedisClient:
         """
         try:
             queue = f"{self.result_queue_prefix}:{job_id}"
-            payload = json.dumps(result)
+            payload = json_codec.dumps(result)
             self.client.rpush(queue, payload)
             logger.info(f"Published result for job {job_id} to {queue}")
         except Exception as e:
@@ -159,7 +332,7 @@ class RedisClient:
             completion_signal: CompletionSignal matching coordinator schema
         """
         try:
-            payload = json.dumps(completion_signal)
+            payload = json_codec.dumps(completion_signal)
             self.client.rpush("completion_signals", payload)
             logger.info(f"Signaled completion to coordinator: run={completion_signal.get('run_id')}, "
                        f"node={completion_signal.get('node_id')}, "
@@ -168,6 +341,79 @@ class RedisClient:
             logger.error(f"Failed to signal completion: {e}")
             raise
 
+    def complete_job(self, job_id: str, completion_signal: Dict[str, Any], result: Dict[str, Any],
+                     message_id: Optional[str] = None):
+        """Signal completion, publish the result and ACK the message in one round-trip.
+
+        Same effect as signal_completion + publish_result + ack_message, sent
+        as one MULTI/EXEC transaction. With a message_id, the signal and result
+        are only pushed if that message was not completed before.
+
+        Args:
+            job_id: Job identifier
+            completion_signal: CompletionSignal matching coordinator schema
+            result: Result dictionary for the job-specific result queue
+            message_id: Stream message ID to acknowledge, if any
+        """
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            self._queue_completion(pipe, job_id, completion_signal, result, message_id)
+            if message_id:
+                pipe.xack(self.stream, self.consumer_group, message_id)
+            pipe.execute()
+            self._log_completion(job_id, completion_signal, message_id)
+        except Exception as e:
+            logger.error(f"Failed to complete job {job_id}: {e}")
+            raise
+
+    async def acomplete_jobs(self, completions: List[Completion]):
+        """Send several job completions in one transaction (async, for the worker event loop).
+
+        The batch is one MULTI/EXEC, so it applies all-or-nothing, and the
+        stream messages are acknowledged with a single XACK after all signals
+        and results. Resending a batch whose reply was lost is safe: messages
+        already completed are only ACKed again.
+
+        Args:
+            completions: (job_id, completion_signal, result, message_id) per job, as for complete_job()
+        """
+        try:
+            pipe = self.aclient.pipeline(transaction=True)
+            for job_id, completion_signal, result, message_id in completions:
+                self._queue_completion(pipe, job_id, completion_signal, result, message_id)
+            message_ids = [completion[3] for completion in completions if completion[3]]
+            if message_ids:
+                pipe.xack(self.stream, self.consumer_group, *message_ids)
+            await pipe.execute()
+            for job_id, completion_signal, _, message_id in completions:
+                self._log_completion(job_id, completion_signal, message_id)
+        except Exception as e:
+            logger.error(f"Failed to complete jobs {[completion[0] for completion in completions]}: {e}")
+            raise
+
+    def _queue_completion(self, pipe, job_id: str, completion_signal: Dict[str, Any], result: Dict[str, Any],
+                          message_id: Optional[str]):
+        """Queue the completion signal and result for one job on pipe (the caller queues the ACK).
+
+        With a message_id both pushes go through the completed marker script,
+        which skips them if the message was completed before.
+        """
+        result_queue = f"{self.result_queue_prefix}:{job_id}"
+        if not message_id:
+            pipe.rpush("completion_signals", json_codec.dumps(completion_signal))
+            pipe.rpush(result_queue, json_codec.dumps(result))
+            return
+        pipe.scripts.add(self._push_completion)  # Loaded (SCRIPT LOAD) before the pipeline runs
+        pipe.evalsha(self._push_completion.sha, 3,
+                     f"{COMPLETED_KEY_PREFIX}:{message_id}", "completion_signals", result_queue,
+                     self.completed_ttl, json_codec.dumps(completion_signal), json_codec.dumps(result))
+
+    def _log_completion(self, job_id: str, completion_signal: Dict[str, Any], message_id: Optional[str]):
+        logger.info("Signaled completion to coordinator: run=%s, node=%s, status=%s; "
+                    "published result to %s:%s; ACKed message: %s",
+                    completion_signal.get('run_id'), completion_signal.get('node_id'), completion_signal.get('status'),
+                    self.result_queue_prefix, job_id, message_id)
+
     def ack_message(self, message_id: str):
         """Acknowledge a message from the stream.
 
@@ -181,6 +427,10 @@ class RedisClient:
             logger.error(f"Failed to ACK message {message_id}: {e}")
             raise
 
+    async def aclose(self):
+        """Close the async connection pool (from the loop that used it)."""
+        await self.aclient.aclose()
+
     def close(self):
         """Close Redis connection."""
         if self.client:
@@ -1,7 +1,7 @@
 """Integration tests for agent service."""
 import pytest
 import json
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from pipeline.executor import PipelineExecutor, execute_pipeline_tool
 
 
@@ -13,17 +13,17 @@ class TestPipelineExecutor:
         """Create pipeline executor instance."""
         return PipelineExecutor()
 
-    @patch('pipeline.primitives.http_request.requests.get')
+    @patch('pipeline.primitives.http_request._SESSION.get')
     def test_full_pipeline_execution(self, mock_get, executor):
         """Test complete pipeline execution with multiple steps."""
         # Mock HTTP response
         mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response.content = json.dumps([
             {"id": 1, "name": "Item A", "price": 150},
             {"id": 2, "name": "Item B", "price": 50},
             {"id": 3, "name": "Item C", "price": 100},
             {"id": 4, "name": "Item D", "price": 200},
-        ]
+        ]).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -55,15 +55,15 @@ class TestPipelineExecutor:
         assert result[0] == {"name": "Item B", "price": 50}
         assert result[1] == {"name": "Item C", "price": 100}
 
-    @patch('pipeline.primitives.http_request.requests.get')
+    @patch('pipeline.primitives.http_request._SESSION.get')
     def test_pipeline_with_filter(self, mock_get, executor):
         """Test pipeline with filtering step."""
         mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response.content = json.dumps([
             {"product": "A", "price": 25},
             {"product": "B", "price": 75},
             {"product": "C", "price": 150},
-        ]
+        ]).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -103,6 +103,39 @@ class TestPipelineExecutor:
         assert result[0]["value"] == 100
         assert result[1]["value"] == 75
 
+    def test_pipeline_fuses_filter_select_top_k(self, executor):
+        """Test filter/select/top_k runs give step-by-step results and step-level errors."""
+        input_data = [{"id": i, "value": i * 10} for i in range(10)]
+        pipeline = [
+            {"step": "table_filter", "condition": {"field": "value", "op": ">=", "value": 30}},
+            {"step": "table_select", "fields": ["id", "value"]},
+            {"step": "table_filter", "condition": {"field": "id", "op": "!=", "value": 4}},
+            {"step": "top_k", "k": 3}
+        ]
+
+        expected = input_data
+        for step in pipeline:
+            expected = executor.primitives[step["step"]](step, expected)
+        assert executor.execute(pipeline, input_data=input_data) == expected == [
+            {"id": 3, "value": 30}, {"id": 5, "value": 50}, {"id": 6, "value": 60}
+        ]
+
+        pipeline[2]["condition"] = {"field": "id", "op": ">", "value": "4"}
+        with pytest.raises(ValueError, match=r"step 3 \(table_filter\)"):
+            executor.execute(pipeline, input_data=input_data)
+
+    def test_fused_scan_stops_after_top_k(self, executor):
+        """Test a fused run never reads records past the k-th output, unlike step-by-step execution."""
+        input_data = [{"id": 1, "value": 10}, {"id": 2, "value": 20}, {"id": 3, "value": "n/a"}]
+        pipeline = [
+            {"step": "table_filter", "condition": {"field": "value", "op": "<", "value": 50}},
+            {"step": "top_k", "k": 2}
+        ]
+
+        assert executor.execute(pipeline, input_data=input_data) == input_data[:2]
+        with pytest.raises(TypeError):
+            executor.primitives["table_filter"](pipeline[0], input_data)
+
     def test_execute_pipeline_tool(self):
         """Test execute_pipeline_tool wrapper."""
         args = {
@@ -116,6 +149,48 @@ class TestPipelineExecutor:
         with pytest.raises(ValueError):
             execute_pipeline_tool(args)
 
+    @patch('pipeline.primitives.http_request._SESSION.get')
+    def test_execute_pipeline_tool_single_step(self, mock_get):
+        """Test a one-step pipeline returns the primitive's output and step errors."""
+        mock_response = Mock()
+        mock_response.content = json.dumps([{"id": 1}]).encode()
+        mock_get.return_value = mock_response
+
+        result = execute_pipeline_tool({
+            "session_id": "test-session",
+            "pipeline": [{"step": "http_request", "url": "https://api.example.com/data"}]
+        })
+
+        assert result == {"status": "success", "data": [{"id": 1}], "pipeline_steps": 1}
+        with pytest.raises(ValueError, match=r"Pipeline failed at step 1 \(top_k\)"):
+            execute_pipeline_tool({"session_id": "test-session", "pipeline": [{"step": "top_k", "k": 1}]})
+
+    @patch('pipeline.primitives.http_request._SESSION.get')
+    def test_pipeline_graph_merges_independent_steps(self, mock_get, executor):
+        """Test steps without dependencies between them run and merge by depends_on."""
+        def respond(url, params=None, timeout=None):
+            response = Mock()
+            response.content = json.dumps([{"source": url, "price": 100 if url.endswith("a") else 50}]).encode()
+            return response
+        mock_get.side_effect = respond
+
+        pipeline = [
+            {"id": "a", "step": "http_request", "url": "https://api.example.com/a", "depends_on": []},
+            {"id": "b", "step": "http_request", "url": "https://api.example.com/b", "depends_on": []},
+            {"step": "table_sort", "field": "price", "order": "asc", "depends_on": ["a", "b"]},
+        ]
+        result = executor.execute(pipeline)
+
+        assert mock_get.call_count == 2
+        assert [row["price"] for row in result] == [50, 100]
+
+        pipeline[0]["depends_on"] = ["b"]
+        pipeline[1]["depends_on"] = ["a"]
+        with pytest.raises(ValueError, match="dependency cycle"):
+            executor.execute(pipeline)
+        with pytest.raises(ValueError, match="unknown step ids"):
+            executor.execute([{"step": "top_k", "k": 1, "depends_on": ["missing"]}])
+
 
 class TestAgentServiceIntegration:
     """Integration tests for agent service with mocked LLM."""
@@ -203,7 +278,7 @@ class TestAgentServiceIntegration:
         assert result['intent'] == 'patch'
         assert result['confidence'] > 0.6
 
-    @patch('agent.llm_client.OpenAI')
+    @patch('agent.llm_client.get_client')
     def test_llm_client_with_workflow_context(self, mock_openai_class):
         """Test LLM client includes workflow context in messages."""
         from agent.llm_client import LLMClient
@@ -215,7 +290,7 @@ class TestAgentServiceIntegration:
         mock_response.choices[0].message.tool_calls = []
         mock_response.choices[0].finish_reason = "stop"
         mock_response.usage.total_tokens = 100
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         mock_openai_class.return_value = mock_client
 
         config = {
@@ -255,11 +330,394 @@ class TestAgentServiceIntegration:
         assert messages[0]['role'] == 'system'
         assert messages[1]['role'] == 'user'
 
-        # User message should contain workflow structure
-        user_content = messages[1]['content']
-        assert 'Current Workflow Structure' in user_content
-        assert 'node1' in user_content
-        assert 'node2' in user_content
+        # System prompt should contain workflow structure (kept there for prefix caching)
+        system_content = messages[0]['content']
+        assert 'Current Workflow Structure' in system_content
+        assert 'node1' in system_content
+        assert 'node2' in system_content
+
+        # Workflow is appended after the static prefix, byte-for-byte
+        assert system_content.startswith(llm._system_prefix)
+
+    @patch('agent.llm_client.render_workflow_section', return_value="\n\n## Current Workflow Structure\n")
+    @patch('agent.llm_client.get_client')
+    def test_workflow_render_is_cached(self, mock_get_client, mock_render):
+        """Test unchanged workflows are rendered once and the cache is bounded."""
+        from agent.llm_client import LLMClient, WF_RENDER_CACHE_SIZE
+
+        llm = LLMClient({})
+        workflow = {"nodes": [{"id": "node1", "type": "http"}], "edges": []}
+
+        first, _ = llm._render_workflow(workflow)
+        second, _ = llm._render_workflow(json.loads(json.dumps(workflow)))
+        assert mock_render.call_count == 1
+        assert first is second and first.startswith(llm._system_prefix)
+
+        for i in range(WF_RENDER_CACHE_SIZE + 2):
+            llm._render_workflow({"nodes": [{"id": f"n{i}"}]})
+        assert len(llm._wf_render_cache) == WF_RENDER_CACHE_SIZE
+
+    @patch('agent.llm_client.get_client')
+    def test_completion_budget_adapts_to_prompt_size(self, mock_get_client):
+        """Test max_completion_tokens shrinks as the prompt grows and is clamped."""
+        from agent.llm_client import LLMClient, MIN_COMPLETION_TOKENS, count_tokens
+
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.tool_calls = []
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        llm = LLMClient({"max_tokens": 4000, "context_token_budget": 8192})
+
+        llm.chat("show flights")
+        short_budget = mock_client.chat.completions.create.call_args[1]['max_completion_tokens']
+        expected = 8192 - llm._system_tokens - count_tokens("show flights") - 256
+        assert short_budget == min(4000, expected)
+
+        llm.chat("x " * 40000)
+        long_budget = mock_client.chat.completions.create.call_args[1]['max_completion_tokens']
+        assert long_budget == MIN_COMPLETION_TOKENS
+
+    def test_aiohttp_transport_parses_chat_completion(self):
+        """Test aiohttp transport returns an OpenAI ChatCompletion."""
+        from aiohttp import web
+        from agent.llm_client import ChatCompletionsAioClient
+        from agent.async_runtime import run_sync
+        from agent.tools import get_tool_schemas
+
+        completion = {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-5-mini",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "ok"}
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }
+        received = {}
+
+        async def handler(request):
+            received['auth'] = request.headers.get('Authorization')
+            received['body'] = await request.json()
+            return web.json_response(completion)
+
+        async def run():
+            app = web.Application()
+            app.router.add_post('/v1/chat/completions', handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            client = ChatCompletionsAioClient(api_key="sk-test", base_url=f"http://127.0.0.1:{port}/v1")
+            try:
+                return await client.create(model="gpt-5-mini", messages=[{"role": "user", "content": "hi"}],
+                                           tools=get_tool_schemas(), timeout=5)
+            finally:
+                await client.close()
+                await runner.cleanup()
+
+        response = run_sync(run())
+
+        assert response.choices[0].message.content == "ok"
+        assert response.usage.total_tokens == 2
+        assert received['auth'] == "Bearer sk-test"
+        assert received['body']['model'] == "gpt-5-mini"
+        assert received['body']['tools'] == json.loads(json.dumps(get_tool_schemas()))
+
+    def test_openai_client_is_shared(self):
+        """Test OpenAI clients are reused across instances per API key."""
+        from agent.openai_client import get_client
+
+        assert get_client("sk-test") is get_client("sk-test")
+        assert get_client("sk-test") is not get_client("sk-other")
+
+    def test_tls_verification_enabled(self):
+        """Test the shared SSL context verifies certificates and hostnames."""
+        import ssl
+        from agent.openai_client import SSL_CONTEXT
+
+        assert SSL_CONTEXT.verify_mode == ssl.CERT_REQUIRED
+        assert SSL_CONTEXT.check_hostname
+
+    def _fake_batch_client(self, statuses, output_lines):
+        """Build a mock AsyncOpenAI client for the Batch API."""
+        client = MagicMock()
+        client.files.create = AsyncMock(return_value=MagicMock(id="file-in"))
+        batches = [MagicMock(id="batch-1", status=status, output_file_id="file-out") for status in statuses]
+        client.batches.create = AsyncMock(return_value=batches[0])
+        client.batches.retrieve = AsyncMock(side_effect=batches[1:])
+        client.batches.cancel = AsyncMock(return_value=MagicMock(id="batch-1", status="cancelling", output_file_id=None))
+        client.files.content = AsyncMock(return_value=MagicMock(text="\n".join(json.dumps(l) for l in output_lines)))
+        return client
+
+    def test_batch_api_demuxes_results_by_custom_id(self):
+        """Test run_batch polls to completion and maps results back to request indexes."""
+        from agent.openai_batch import run_batch
+        from agent.async_runtime import run_sync
+
+        client = self._fake_batch_client(
+            ["validating", "in_progress", "completed"],
+            [
+                {"custom_id": "req-1", "response": {"status_code": 200, "body": {"id": "b"}}},
+                {"custom_id": "req-0", "response": {"status_code": 200, "body": {"id": "a"}}},
+                {"custom_id": "req-2", "response": {"status_code": 500, "body": {}}},
+            ]
+        )
+        bodies = [{"model": "m", "messages": []} for _ in range(3)]
+
+        results = run_sync(run_batch(client, bodies, poll_initial_s=0, poll_max_s=0))
+
+        assert results == {0: {"id": "a"}, 1: {"id": "b"}}
+        assert client.batches.retrieve.await_count == 2
+        uploaded = client.files.create.await_args.kwargs['file'][1]
+        assert len(uploaded.splitlines()) == 3
+        assert client.files.create.await_args.kwargs['purpose'] == "batch"
+
+    def test_batch_api_cancels_after_deadline(self):
+        """Test run_batch cancels a slow batch and returns no results."""
+        from agent.openai_batch import run_batch
+        from agent.async_runtime import run_sync
+
+        client = self._fake_batch_client(["in_progress"], [])
+
+        results = run_sync(run_batch(client, [{"model": "m"}], deadline_s=0))
+
+        assert results == {}
+        client.batches.cancel.assert_awaited_once_with("batch-1")
+
+    def test_tool_schema_variants_share_value_schema(self):
+        """Test verbose/compact patch tools differ only in description and encode to JSON."""
+        from agent.tools import get_tool_schemas, get_tool_schemas_json_bytes
+
+        verbose, compact = get_tool_schemas(True), get_tool_schemas(False)
+        assert verbose[0] is compact[0]
+        assert verbose[1]['function']['description'] != compact[1]['function']['description']
+
+        def value_schema(tools):
+            return tools[1]['function']['parameters']['properties']['patch_spec']['properties'][
+                'operations']['items']['properties']['value']
+        assert value_schema(verbose) is value_schema(compact)
+        assert verbose[1]['function']['parameters'] is compact[1]['function']['parameters']
+
+        for flag in (True, False):
+            encoded = get_tool_schemas_json_bytes(flag)
+            assert json.loads(encoded) == json.loads(json.dumps(get_tool_schemas(flag)))
+            # Schema defaults are not restated
+            assert b'"additionalProperties":true' not in encoded
+            assert b'"properties":{}' not in encoded
+
+    def test_compact_tool_hints_by_default(self, monkeypatch):
+        """Test the compact patch tool is the default and VERBOSE_TOOL_HINTS restores the long one."""
+        from agent.llm_client import LLMClient
+        from agent.tools import get_tool_help, get_tool_schemas
+
+        monkeypatch.delenv('VERBOSE_TOOL_HINTS', raising=False)
+        with patch('agent.llm_client.get_client'):
+            assert LLMClient({'model': 'gpt-4o'}).tools is get_tool_schemas(False)
+            monkeypatch.setenv('VERBOSE_TOOL_HINTS', '1')
+            assert LLMClient({'model': 'gpt-4o'}).tools is get_tool_schemas(True)
+
+        assert get_tool_help('patch_workflow') == get_tool_schemas(True)[1]['function']['description']
+        assert get_tool_help('execute_pipeline') is None
+
+    def test_validate_tool_args(self):
+        """Test tool arguments are checked against the compiled parameters schemas."""
+        from agent.tools import validate_tool_args
+
+        validate_tool_args('execute_pipeline', {'session_id': 's1', 'pipeline': [{'step': 'top_k', 'k': 5}]})
+        validate_tool_args('patch_workflow', {'patch_spec': {'operations': [
+            {'op': 'add', 'path': '/nodes/-', 'value': {'id': 'n1', 'type': 'agent', 'config': {'task': 'x'}}}
+        ]}})
+        validate_tool_args('unknown_tool', {})
+
+        with pytest.raises(ValueError, match="pipeline"):
+            validate_tool_args('execute_pipeline', {'session_id': 's1'})
+        # Without fastjsonschema, steps and ops are still checked against the allowed sets
+        with patch.dict('agent.tools._TOOL_VALIDATORS', clear=True):
+            validate_tool_args('execute_pipeline', {'session_id': 's1', 'pipeline': [{'step': 'top_k'}]})
+            with pytest.raises(ValueError, match="unknown step"):
+                validate_tool_args('execute_pipeline', {'pipeline': [{'step': 'rm_rf'}]})
+            with pytest.raises(ValueError, match="unknown op"):
+                validate_tool_args('patch_workflow', {'patch_spec': {'operations': [{'op': 'move'}]}})
+        with pytest.raises(ValueError, match="config must be object"):
+            validate_tool_args('patch_workflow', {'patch_spec': {'operations': [
+                {'op': 'add', 'path': '/nodes/-', 'value': {'id': 'n1', 'config': [{'task': 'x'}]}}
+            ]}})
+
+    def test_tool_schemas_are_read_only(self):
+        """Test the shared tool schemas cannot be mutated by callers."""
+        import copy
+        import sys
+        from agent.tools import get_tool_schemas
+
+        tools = get_tool_schemas()
+        assert isinstance(tools, tuple)
+        # Built once at import: every call returns the same object
+        assert get_tool_schemas() is tools
+        with pytest.raises(TypeError):
+            tools[0]['function']['name'] = 'other'
+        with pytest.raises(TypeError):
+            tools[1]['function']['parameters'].update({'type': 'array'})
+        assert copy.deepcopy(tools) is tools
+
+        def walk(node):
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    assert sys.intern(key) is key
+                    yield from walk(value)
+            elif isinstance(node, tuple):
+                for value in node:
+                    yield from walk(value)
+            elif isinstance(node, str) and len(node) <= 32:
+                yield node
+
+        assert all(sys.intern(value) is value for value in walk(tools))
+
+    def test_system_prompt_prefix_is_memoized(self):
+        """Test the static prompt is the same object across calls."""
+        from agent.system_prompt import get_system_prompt
+
+        assert get_system_prompt() is get_system_prompt()
+        assert get_system_prompt("## Schema") is get_system_prompt("## Schema")
+        assert get_system_prompt("## Schema").startswith(get_system_prompt())
+
+        with_workflow = get_system_prompt("## Schema", {"nodes": [{"id": "n1", "type": "http"}]})
+        assert with_workflow.startswith(get_system_prompt("## Schema"))
+        assert "n1" in with_workflow
+
+    def test_system_prompt_keeps_cacheable_prefix(self):
+        """Test every system prompt variant starts with the static base prompt."""
+        from agent.system_prompt import PROMPT_CACHE_PREFIX_LEN, get_system_prompt, is_cache_safe
+
+        base = get_system_prompt()
+        assert PROMPT_CACHE_PREFIX_LEN == len(base)
+        for prompt in (get_system_prompt("## Schema"),
+                       get_system_prompt("## Schema", {"nodes": [{"id": "n1", "type": "http"}]})):
+            assert prompt[:PROMPT_CACHE_PREFIX_LEN] == base
+            assert is_cache_safe(prompt)
+        assert not is_cache_safe("Session 42\n" + base)
+
+    @patch('agent.llm_client.get_client')
+    def test_clients_share_compiled_prompt_bundle(self, mock_get_client):
+        """Test clients with the same settings reuse one compiled prompt bundle."""
+        import dataclasses
+        from agent.llm_client import LLMClient
+        from agent.prompt_bundle import compile_prompt
+
+        first, second = LLMClient({}, workflow_schema_summary="## Schema"), LLMClient({}, workflow_schema_summary="## Schema")
+        assert first.prompt_bundle is second.prompt_bundle
+        assert first.prompt_bundle is compile_prompt(first.model, "## Schema", verbose_tools=False, cache_align=False)
+        assert first._system_prefix is first.prompt_bundle.system_prefix
+        assert first.tools is first.prompt_bundle.tools
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            first.prompt_bundle.system_tokens = 0
+
+    def test_system_prompt_for_provider(self):
+        """Test OpenAI models get the plain prompt and Claude models get a cache breakpoint."""
+        from agent.system_prompt import get_system_prompt, get_system_prompt_for
+
+        assert get_system_prompt_for("gpt-4o", "## Schema") is get_system_prompt("## Schema")
+
+        blocks = get_system_prompt_for("claude-sonnet-4", "## Schema")
+        assert blocks is get_system_prompt_for("claude-sonnet-4", "## Schema")
+        assert blocks[0]["text"] == get_system_prompt()
+        assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+        assert blocks[1] == {"type": "text", "text": "## Schema"}
+        assert len(get_system_prompt_for("claude-sonnet-4")) == 1
+
+    def test_align_to_cache_block(self):
+        """Test the static prefix is padded to a whole number of cache blocks."""
+        from agent import system_prompt
+
+        class WordEncoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split(" ")
+
+        system_prompt.align_to_cache_block.cache_clear()
+        try:
+            with patch('agent.system_prompt.get_encoding', return_value=WordEncoding()):
+                aligned = system_prompt.align_to_cache_block(system_prompt.get_system_prompt())
+            assert system_prompt.is_cache_safe(aligned)
+            assert len(aligned.split(" ")) % system_prompt.PROMPT_CACHE_BLOCK_TOKENS == 0
+
+            # A tokenizer that merges the first padding unit into the comment opener
+            class MergingEncoding:
+                def encode(self, text, disallowed_special=()):
+                    return text.replace("<!-- .", "<!--.").split(" ")
+
+            system_prompt.align_to_cache_block.cache_clear()
+            with patch('agent.system_prompt.get_encoding', return_value=MergingEncoding()):
+                aligned = system_prompt.align_to_cache_block(system_prompt.get_system_prompt())
+                assert len(MergingEncoding().encode(aligned)) % system_prompt.PROMPT_CACHE_BLOCK_TOKENS == 0
+
+            # Padding that never changes the count is dropped instead of sent misaligned
+            class FixedEncoding:
+                def encode(self, text, disallowed_special=()):
+                    return [0] * 5
+
+            with patch('agent.system_prompt.get_encoding', return_value=FixedEncoding()):
+                assert system_prompt.align_to_cache_block("fixed") == "fixed"
+
+            with patch('agent.system_prompt.get_encoding', return_value=None):
+                assert system_prompt.align_to_cache_block("short") == "short"
+        finally:
+            system_prompt.align_to_cache_block.cache_clear()
+
+    def test_system_prompt_tokens_reuse_base_ids(self):
+        """Test prefix token IDs are the base IDs plus the encoded summary only."""
+        from agent import system_prompt
+
+        class FakeEncoding:
+            def __init__(self):
+                self.calls = []
+
+            def encode(self, text, disallowed_special=()):
+                self.calls.append(text)
+                return [ord(c) for c in text]
+
+        encoding = FakeEncoding()
+        system_prompt._get_base_token_ids.cache_clear()
+        system_prompt.get_system_prompt_tokens.cache_clear()
+        system_prompt.system_prompt_token_count.cache_clear()
+        try:
+            with patch('agent.system_prompt.get_encoding', return_value=encoding):
+                base = system_prompt.get_system_prompt_tokens()
+                with_summary = system_prompt.get_system_prompt_tokens("## Schema")
+            assert base == tuple(ord(c) for c in system_prompt.get_system_prompt())
+            assert with_summary == tuple(ord(c) for c in system_prompt.get_system_prompt("## Schema"))
+            assert encoding.calls == [system_prompt.get_system_prompt(), "\n\n## Schema"]
+            assert system_prompt.system_prompt_token_count("## Schema") == len(with_summary)
+        finally:
+            system_prompt._get_base_token_ids.cache_clear()
+            system_prompt.get_system_prompt_tokens.cache_clear()
+            system_prompt.system_prompt_token_count.cache_clear()
+
+        with patch('agent.system_prompt.get_encoding', return_value=None):
+            assert system_prompt.get_system_prompt_tokens() is None
+            assert system_prompt.system_prompt_token_count() == len(system_prompt.get_system_prompt()) // 4 + 1
+        system_prompt._get_base_token_ids.cache_clear()
+        system_prompt.get_system_prompt_tokens.cache_clear()
+        system_prompt.system_prompt_token_count.cache_clear()
+
+    def test_json_codec_matches_stdlib(self):
+        """Test json_codec round-trips and sorts keys with and without orjson."""
+        import json_codec
+
+        payload = {"b": 1, "a": [1, 2.5, "ü"], "c": None}
+        for backend in (json_codec.orjson, None):
+            with patch.object(json_codec, 'orjson', backend):
+                encoded = json_codec.dumps(payload, sort_keys=True)
+                assert isinstance(encoded, bytes)
+                assert encoded.startswith(b'{"a":')
+                assert json_codec.loads(encoded) == payload
+                assert json_codec.loads(encoded.decode()) == payload
 
     def test_storage_memory(self):
         """Test in-memory storage."""
@@ -290,11 +748,582 @@ class TestAgentServiceIntegration:
         assert result_by_job['result_id'] == result_id
 
 
+class FakeCompletionRedis:
+    """In-memory async Redis applying completion transactions, optionally losing their replies."""
+
+    def __init__(self, lost_replies=0):
+        self.lists = {}
+        self.markers = set()
+        self.acked = []
+        self.transactions = []
+        self.lost_replies = lost_replies
+
+    def pipeline(self, transaction=True):
+        self.transactions.append(transaction)
+        return FakeCompletionPipeline(self)
+
+
+class FakeCompletionPipeline:
+    """Queues commands and applies them together on execute(), like MULTI/EXEC."""
+
+    def __init__(self, server):
+        self.server = server
+        self.scripts = set()
+        self.commands = []
+
+    def rpush(self, key, value):
+        self.commands.append(lambda: self.server.lists.setdefault(key, []).append(value))
+
+    def evalsha(self, sha, numkeys, marker, signals_key, result_key, ttl, signal, result):
+        assert {script.sha for script in self.scripts} == {sha}
+
+        def push_once():  # What the completed marker script does
+            if marker not in self.server.markers:
+                self.server.markers.add(marker)
+                self.server.lists.setdefault(signals_key, []).append(signal)
+                self.server.lists.setdefault(result_key, []).append(result)
+        self.commands.append(push_once)
+
+    def xack(self, stream, group, *message_ids):
+        self.commands.append(lambda: self.server.acked.extend(message_ids))
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+        if self.server.lost_replies:
+            self.server.lost_replies -= 1
+            raise ConnectionError("Connection reset by peer")
+
+
+class TestRedisClient:
+    """Test Redis stream job reads."""
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_pop_jobs_reads_batch(self, mock_redis):
+        """Test one XREADGROUP returns several jobs with IRs fetched in one MGET."""
+        from storage.redis_client import RedisClient
+
+        client = mock_redis.return_value
+        client.xreadgroup.return_value = [("wf.tasks.agent", [
+            ("1-0", {"token": json.dumps({"id": "job-1", "run_id": "run-1", "to_node": "a"})}),
+            ("2-0", {}),
+            ("3-0", {"token": json.dumps({"id": "job-3", "run_id": "run-3", "to_node": "b"})}),
+        ])]
+        client.mget.return_value = [json.dumps({"nodes": {"a": {}}}), None]
+
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        jobs = redis_client.pop_jobs(count=3)
+
+        assert client.xreadgroup.call_args.kwargs['count'] == 3
+        client.mget.assert_called_once_with(["ir:run-1", "ir:run-3"])
+        client.xack.assert_called_once_with("wf.tasks.agent", "agent_workers", "2-0")
+        assert [job['job_id'] for job in jobs] == ["job-1", "job-3"]
+        assert [job['message_id'] for job in jobs] == ["1-0", "3-0"]
+        assert jobs[0]['current_workflow'] == {"nodes": {"a": {}}}
+        assert jobs[1]['current_workflow'] is None
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_pop_jobs_skips_undecodable_token(self, mock_redis):
+        """Test a token that is not valid JSON is ACKed as invalid without losing the rest of the batch."""
+        from storage.redis_client import RedisClient
+
+        client = mock_redis.return_value
+        client.xreadgroup.return_value = [("wf.tasks.agent", [
+            ("1-0", {"token": json.dumps({"id": "job-1", "to_node": "a"})}),
+            ("2-0", {"token": "{not json"}),
+            ("3-0", {"token": json.dumps({"id": "job-3", "to_node": "b"})}),
+            ("4-0", {"token": "[1, 2]"}),
+        ])]
+
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        jobs = redis_client.pop_jobs(count=4)
+
+        client.xack.assert_called_once_with("wf.tasks.agent", "agent_workers", "2-0", "4-0")
+        assert [job['job_id'] for job in jobs] == ["job-1", "job-3"]
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_apop_jobs_reads_batch(self, mock_redis):
+        """Test the async read path returns the same jobs as pop_jobs."""
+        import asyncio
+        from storage.redis_client import RedisClient
+
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        redis_client.aclient = AsyncMock()
+        redis_client.aclient.xreadgroup.return_value = [("wf.tasks.agent", [
+            ("1-0", {"token": json.dumps({"id": "job-1", "to_node": "a"})}),
+        ])]
+
+        jobs = asyncio.run(redis_client.apop_jobs(count=4))
+
+        redis_client.aclient.mget.assert_not_called()
+        assert [(job['job_id'], job['message_id'], job['current_workflow']) for job in jobs] == [("job-1", "1-0", None)]
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_complete_job_uses_one_pipeline(self, mock_redis):
+        """Test completion signal, result and ACK are sent as one transaction, pushed once per message."""
+        from storage.redis_client import RedisClient
+
+        pipe = mock_redis.return_value.pipeline.return_value
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        redis_client.complete_job("job-1", {"status": "completed"}, {"job_id": "job-1"}, message_id="1-0")
+
+        mock_redis.return_value.pipeline.assert_called_once_with(transaction=True)
+        pipe.rpush.assert_not_called()
+        assert pipe.evalsha.call_args.args[:5] == (
+            redis_client._push_completion.sha, 3, "agent:completed:1-0", "completion_signals", "agent:results:job-1")
+        pipe.scripts.add.assert_called_once_with(redis_client._push_completion)
+        pipe.xack.assert_called_once_with("wf.tasks.agent", "agent_workers", "1-0")
+        pipe.execute.assert_called_once()
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_acomplete_jobs_batches_completions(self, mock_redis):
+        """Test several job completions go out in a single async transaction with one XACK."""
+        import asyncio
+        from storage.redis_client import RedisClient
+
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        redis_client.aclient = MagicMock()
+        pipe = redis_client.aclient.pipeline.return_value
+        pipe.execute = AsyncMock()
+
+        asyncio.run(redis_client.acomplete_jobs([
+            ("job-1", {"status": "completed"}, {"job_id": "job-1"}, "1-0"),
+            ("job-2", {"status": "failed"}, {"job_id": "job-2"}, None),
+            ("job-3", {"status": "completed"}, {"job_id": "job-3"}, "3-0"),
+        ]))
+
+        redis_client.aclient.pipeline.assert_called_once_with(transaction=True)
+        assert pipe.rpush.call_count == 2  # job-2 has no message to dedupe on
+        assert [c.args[2] for c in pipe.evalsha.call_args_list] == ["agent:completed:1-0", "agent:completed:3-0"]
+        pipe.xack.assert_called_once_with("wf.tasks.agent", "agent_workers", "1-0", "3-0")
+        pipe.execute.assert_awaited_once()
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_aclaim_jobs_continues_scan(self, mock_redis):
+        """Test stale pending jobs are claimed with XAUTOCLAIM, resuming from the returned cursor."""
+        import asyncio
+        from storage.redis_client import RedisClient
+
+        redis_client = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0, 'reclaim_idle': 60})
+        redis_client.aclient = AsyncMock()
+        redis_client.aclient.xautoclaim.return_value = ["7-0", [
+            ("1-0", {"token": json.dumps({"id": "job-1", "to_node": "a"})}),
+            ("2-0", None),
+            ("3-0", {"token": json.dumps({"id": "job-3", "to_node": "b"})}),
+        ], ["2-0"]]
+        redis_client.aclient.mget.return_value = [None, "1"]
+
+        jobs = asyncio.run(redis_client.aclaim_jobs(count=3))
+
+        assert redis_client.aclient.xautoclaim.call_args.kwargs == {'min_idle_time': 60000, 'start_id': '0-0', 'count': 3}
+        redis_client.aclient.mget.assert_awaited_once_with(["agent:completed:1-0", "agent:completed:3-0"])
+        # job-3's completion was already pushed, so it is only ACKed, not run again
+        redis_client.aclient.xack.assert_awaited_once_with("wf.tasks.agent", "agent_workers", "3-0")
+        assert [(job['job_id'], job['message_id']) for job in jobs] == [("job-1", "1-0")]
+
+        redis_client.aclient.xautoclaim.return_value = ["0-0", [], []]
+        assert asyncio.run(redis_client.aclaim_jobs(count=2)) == []
+        assert redis_client.aclient.xautoclaim.call_args.kwargs['start_id'] == "7-0"
+        assert redis_client._claim_cursor == "0-0"
+
+
+class TestAgentServiceWorkers:
+    """Test the asyncio job reader, workers and result writer."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        """AgentService with a mocked Redis client and none of the constructor's connections."""
+        import importlib.util
+        import sys
+        for module in ('patch_validator', 'metrics'):
+            if importlib.util.find_spec(module) is None:
+                monkeypatch.setitem(sys.modules, module, MagicMock())
+        import main
+
+        service = object.__new__(main.AgentService)
+        service.running = True
+        service.num_workers = 2
+        service.job_batch_size = 2
+        service.redis = MagicMock()
+        service.redis.acomplete_jobs = AsyncMock()
+        service.redis.aclose = AsyncMock()
+        return service
+
+    def test_send_completions_retries_with_backoff(self, service, monkeypatch):
+        """Test a failed completion batch is retried, doubling the delay between attempts."""
+        import asyncio
+        import main
+
+        sleeps = []
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+        monkeypatch.setattr(main.asyncio, 'sleep', fake_sleep)
+        service.redis.acomplete_jobs.side_effect = [ConnectionError("down"), ConnectionError("down"), None]
+        batch = [("job-1", {"status": "completed"}, {"job_id": "job-1"}, "1-0")]
+
+        asyncio.run(service._send_completions(batch))
+
+        assert service.redis.acomplete_jobs.await_count == 3
+        assert sleeps == [main.OUTBOX_RETRY_DELAY, main.OUTBOX_RETRY_DELAY * 2]
+
+    @patch('storage.redis_client.redis.Redis')
+    def test_resent_batch_signals_each_job_once(self, mock_redis, service, monkeypatch):
+        """Test a batch applied by the server but whose reply was lost is not pushed again on retry."""
+        import asyncio
+        import main
+        from storage.redis_client import RedisClient
+
+        monkeypatch.setattr(main.asyncio, 'sleep', AsyncMock())
+        service.redis = RedisClient({'host': 'localhost', 'port': 6379, 'db': 0})
+        service.redis.aclient = FakeCompletionRedis(lost_replies=1)
+        batch = [
+            ("job-1", {"status": "completed"}, {"job_id": "job-1"}, "1-0"),
+            ("job-2", {"status": "failed"}, {"job_id": "job-2"}, "2-0"),
+        ]
+
+        asyncio.run(service._send_completions(batch))
+        # The same jobs completed again after a reclaim
+        asyncio.run(service.redis.acomplete_jobs(batch))
+
+        server = service.redis.aclient
+        assert server.transactions == [True, True, True]
+        assert [json.loads(signal)["status"] for signal in server.lists["completion_signals"]] == ["completed", "failed"]
+        assert len(server.lists["agent:results:job-1"]) == len(server.lists["agent:results:job-2"]) == 1
+        assert server.acked == ["1-0", "2-0"] * 3
+
+    def test_send_completions_gives_up_without_ack(self, service, monkeypatch):
+        """Test a batch that keeps failing is dropped (unacknowledged) after OUTBOX_SEND_ATTEMPTS."""
+        import asyncio
+        import main
+
+        monkeypatch.setattr(main.asyncio, 'sleep', AsyncMock())
+        service.redis.acomplete_jobs.side_effect = ConnectionError("down")
+
+        asyncio.run(service._send_completions([("job-1", {}, {}, "1-0")]))
+
+        assert service.redis.acomplete_jobs.await_count == main.OUTBOX_SEND_ATTEMPTS
+
+    def test_read_jobs_reclaims_stale_jobs_first(self, service):
+        """Test the reader queues reclaimed jobs, then reads new ones once the pending list is walked."""
+        import asyncio
+
+        async def stop_after_read(count):
+            service.running = False
+            return [{"job_id": "new"}]
+        service.redis.aclaim_jobs = AsyncMock(side_effect=[[{"job_id": "a"}, {"job_id": "b"}], [{"job_id": "c"}]])
+        service.redis.apop_jobs = AsyncMock(side_effect=stop_after_read)
+
+        async def run():
+            service._job_queue = asyncio.Queue()
+            await service._read_jobs()
+            return [service._job_queue.get_nowait()['job_id'] for _ in range(service._job_queue.qsize())]
+
+        assert asyncio.run(run()) == ["a", "b", "c", "new"]
+        assert service.redis.aclaim_jobs.await_count == 2
+
+    def test_stop_drains_jobs_and_flushes_completions(self, service):
+        """Test stop() lets the workers finish the jobs already read and writes all their completions."""
+        import asyncio
+
+        reads = [[{"job_id": "job-1"}, {"job_id": "job-2"}], [{"job_id": "job-3"}]]
+        async def read_then_stop(count):
+            if len(reads) == 1:
+                service.stop()  # As the SIGTERM handler does, mid-read
+            return reads.pop(0)
+        service.redis.aclaim_jobs = AsyncMock(return_value=[])
+        service.redis.apop_jobs = AsyncMock(side_effect=read_then_stop)
+
+        async def process_job(job):
+            await asyncio.sleep(0)
+            service._outbox.put_nowait((job['job_id'], {"status": "completed"}, {}, f"{job['job_id']}-msg"))
+        service._process_job = process_job
+
+        asyncio.run(service._run_workers())
+
+        written = [completion[0] for call in service.redis.acomplete_jobs.await_args_list for completion in call.args[0]]
+        assert sorted(written) == ["job-1", "job-2", "job-3"]
+        assert service.redis.apop_jobs.await_count == 2
+        service.redis.aclose.assert_awaited_once()
+
+    def test_worker_loop_survives_job_errors(self, service, monkeypatch):
+        """Test a worker keeps taking jobs after one fails and stops at the None sentinel."""
+        import asyncio
+        import main
+
+        monkeypatch.setattr(main.asyncio, 'sleep', AsyncMock())
+        processed = []
+        async def process_job(job):
+            processed.append(job['job_id'])
+            if job['job_id'] == "bad":
+                raise RuntimeError("boom")
+        service._process_job = process_job
+
+        async def run():
+            service._job_queue = asyncio.Queue()
+            for job in ({"job_id": "bad"}, {"job_id": "good"}, None, {"job_id": "after-stop"}):
+                service._job_queue.put_nowait(job)
+            await service._worker_loop(worker_id=0)
+            return service._job_queue.qsize()
+
+        assert asyncio.run(run()) == 1
+        assert processed == ["bad", "good"]
+
+
+class TestDatabaseClient:
+    """Test the PostgreSQL client against a mocked connection pool."""
+
+    @pytest.fixture
+    def db(self):
+        """DatabaseClient whose pool hands out one mocked connection."""
+        pytest.importorskip('psycopg2')
+        from storage.db import DatabaseClient
+
+        with patch('storage.db.ThreadedConnectionPool'):
+            client = DatabaseClient({'host': 'localhost', 'port': 5432, 'dbname': 'agent', 'user': 'agent', 'password': ''})
+        client.conn = MagicMock(statements_prepared=True)
+        client.cur = client.conn.cursor.return_value.__enter__.return_value
+        client.pool.getconn.return_value = client.conn
+        return client
+
+    def test_store_results_batch_uses_execute_values(self, db):
+        """Test a batch is one execute_values call with one commit, returning ids in input order."""
+        from storage import db as db_module
+
+        results = [{'job_id': f'job-{i}', 'run_id': 'run-1', 'node_id': 'n', 'result_data': {'i': i}} for i in range(3)]
+        with patch('storage.db.execute_values', return_value=[('id-0',), ('id-1',), ('id-2',)]) as mock_execute_values:
+            result_ids = db.store_results_batch(results, page_size=2)
+
+        (cur, sql, argslist), kwargs = mock_execute_values.call_args
+        assert cur is db.cur
+        assert sql == db_module._INSERT_RESULTS_SQL
+        assert kwargs == {'template': db_module._RESULT_ROW_TEMPLATE, 'page_size': 2, 'fetch': True}
+        assert [args[0] for args in argslist] == ['job-0', 'job-1', 'job-2']
+        assert all(len(args) == db_module._RESULT_ROW_TEMPLATE.count('%s') for args in argslist)
+        assert argslist[1][3] == '{"i":1}'
+        assert result_ids == ['id-0', 'id-1', 'id-2']
+        db.conn.commit.assert_called_once()
+
+        assert db.store_results_batch([]) == []
+        mock_execute_values.assert_called_once()
+
+    def test_statements_prepared_once_per_connection(self, db):
+        """Test a new connection PREPAREs every statement once, and later borrows reuse them."""
+        from storage import db as db_module
+
+        db.conn.statements_prepared = False
+        db.cur.fetchone.return_value = None
+
+        assert db.get_result('r-1') is None
+        assert db.get_result('r-2') is None
+
+        prepares = [c.args[0] for c in db.cur.execute.call_args_list if c.args[0].startswith('PREPARE')]
+        assert prepares == [f"PREPARE {name} AS {query}" for name, query in db_module._PREPARED_STATEMENTS.items()]
+        assert db.conn.statements_prepared is True
+        assert db.cur.execute.call_args.args == ("EXECUTE agent_get_result (%s)", ('r-2',))
+
+    def test_failed_prepare_closes_connection(self, db):
+        """Test a PREPARE failing part-way discards the connection instead of pooling it half-prepared."""
+        db.conn.statements_prepared = False
+        db.cur.execute.side_effect = [None, RuntimeError("prepare failed")]
+
+        with pytest.raises(RuntimeError, match="prepare failed"):
+            db.get_result('r-1')
+
+        db.pool.putconn.assert_called_once_with(db.conn, close=True)
+        assert db.conn.statements_prepared is False
+        db.conn.commit.assert_not_called()
+
+    def test_every_call_returns_its_connection(self, db):
+        """Test each call puts its borrowed connection back, also when the query fails."""
+        db.cur.fetchone.return_value = {'result_id': 'id-1'}
+        calls = [
+            lambda: db.store_result('job-1', 'run-1', 'n', result_data={'ok': True}),
+            lambda: db.get_result('id-1'),
+            lambda: db.store_results_batch([{'job_id': 'job-1', 'run_id': 'run-1', 'node_id': 'n'}]),
+        ]
+        with patch('storage.db.execute_values', return_value=[('id-1',)]):
+            for call in calls:
+                db.pool.putconn.reset_mock()
+                call()
+                db.pool.putconn.assert_called_once_with(db.conn)
+
+            db.cur.execute.side_effect = RuntimeError("query failed")
+            for call in calls[:2]:
+                db.pool.putconn.reset_mock()
+                with pytest.raises(RuntimeError):
+                    call()
+                db.pool.putconn.assert_called_once_with(db.conn)
+
+        with patch('storage.db.execute_values', side_effect=RuntimeError("query failed")):
+            db.pool.putconn.reset_mock()
+            with pytest.raises(RuntimeError):
+                calls[2]()
+            db.pool.putconn.assert_called_once_with(db.conn)
+
+        assert db.pool.getconn.call_count == 6
+
+    def test_close_closes_pool(self, db):
+        """Test close() closes every pooled connection."""
+        db.close()
+        db.pool.closeall.assert_called_once()
+
+
+class FakeContextRedis:
+    """In-memory stand-in for the Redis commands the resolver uses, counting calls."""
+
+    def __init__(self, context=None, cas=None):
+        self.hashes = {f"context:{run_id}": fields for run_id, fields in (context or {}).items()}
+        self.values = {f"cas:{ref}": data for ref, data in (cas or {}).items()}
+        self.calls = []
+
+    def hmget(self, key, fields):
+        self.calls.append('hmget')
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def mget(self, keys):
+        self.calls.append('mget')
+        return [self.values.get(key) for key in keys]
+
+    def hget(self, key, field):
+        self.calls.append('hget')
+        return self.hashes.get(key, {}).get(field)
+
+    def get(self, key):
+        self.calls.append('get')
+        return self.values.get(key)
+
+
+class TestResolver:
+    """Test variable expression resolution against a fake Redis."""
+
+    @pytest.fixture
+    def fake_redis(self):
+        """Run run-1 with two stored node outputs (one JSON, one plain text)."""
+        return FakeContextRedis(
+            context={"run-1": {"fetch:output": b"ref-1", "note:output": b"ref-2"}},
+            cas={
+                "ref-1": json.dumps({"count": 2, "body": {"items": [{"price": 10}, {"price": 20}]}}).encode(),
+                "ref-2": b"plain text",
+            },
+        )
+
+    @pytest.fixture
+    def resolver(self, fake_redis):
+        import logging
+        from resolver import Resolver
+        return Resolver(fake_redis, logging.getLogger(__name__))
+
+    def test_resolve_config_prefetches_in_two_round_trips(self, resolver, fake_redis):
+        """Test every referenced node output is loaded with one HMGET and one MGET."""
+        resolved = resolver.resolve_config("run-1", {
+            "url": "https://example.com",
+            "payload": {
+                "all": "$nodes.fetch",
+                "price": "$nodes.fetch.body.items[1].price",
+                "message": "Found ${$nodes.fetch.count} items: ${$nodes.note}",
+            },
+            "notes": ["$nodes.note", 3],
+        })
+
+        assert fake_redis.calls == ['hmget', 'mget']
+        assert resolved == {
+            "url": "https://example.com",
+            "payload": {
+                "all": {"count": 2, "body": {"items": [{"price": 10}, {"price": 20}]}},
+                "price": 20,
+                "message": "Found 2 items: plain text",
+            },
+            "notes": ["plain text", 3],
+        }
+
+    def test_missing_node_output(self, resolver):
+        """Test a reference to a node without stored output names the config key and node."""
+        with pytest.raises(ValueError, match="Failed to resolve config key body: Node output not found: missing"):
+            resolver.resolve_config("run-1", {"url": "$nodes.fetch", "body": "$nodes.missing.field"})
+
+    def test_prefetch_failure_raises_value_error(self, resolver, fake_redis):
+        """Test a failed prefetch surfaces as ValueError, like a failed per-key load."""
+        fake_redis.hmget = Mock(side_effect=ConnectionError("connection refused"))
+
+        with pytest.raises(ValueError, match="Failed to load node outputs for run run-1: connection refused"):
+            resolver.resolve_config("run-1", {"body": "$nodes.fetch"})
+
+    def test_plain_strings_skip_expression_checks(self, resolver, fake_redis):
+        """Test strings without '$' come back unchanged, without touching Redis."""
+        url = "https://example.com/search?q=flights"
+        resolved = resolver.resolve_config("run-1", {"url": url, "price": "costs 5 USD", "n": 1})
+
+        assert resolved["url"] is url
+        assert resolved == {"url": url, "price": "costs 5 USD", "n": 1}
+        assert fake_redis.calls == []
+
+    def test_node_outputs_cached_per_call(self, resolver, fake_redis):
+        """Test a node referenced many times is read once per resolve_config call, and fresh per call."""
+        config = {f"key{i}": f"$nodes.fetch.body.items[{i % 2}].price" for i in range(5)}
+
+        assert resolver.resolve_config("run-1", config)["key1"] == 20
+        fake_redis.values["cas:ref-1"] = json.dumps({"body": {"items": [{"price": 11}, {"price": 21}]}}).encode()
+        assert resolver.resolve_config("run-1", config)["key1"] == 21
+        assert fake_redis.calls == ['hmget', 'mget', 'hmget', 'mget']
+
+        outputs = {}
+        resolver._resolve_node_reference("run-1", "$nodes.note", outputs)
+        resolver._resolve_node_reference("run-1", "$nodes.note", outputs)
+        assert outputs == {"note": "plain text"}
+        assert fake_redis.calls[4:] == ['hget', 'get']
+
+    def test_field_path_parsing(self, resolver):
+        """Test field paths are parsed once into key and index tokens."""
+        from resolver import _parse_path
+
+        assert _parse_path("body.items[0].price") == (
+            ('key', 'body'), ('index', 'items[0]', 'items', 0), ('key', 'price'))
+        assert _parse_path("[1]") == (('index', '[1]', '', 1),)
+        assert _parse_path("items[x]") == (('index', 'items[x]', 'items', None),)
+        assert _parse_path("body.items[0].price") is _parse_path("body.items[0].price")
+
+        data = {"items": [[1, 2]], "name": "x"}
+        assert resolver._get_nested_field(data, "items[0]") == [1, 2]
+        with pytest.raises(ValueError, match="Invalid array access: items\\[x\\]"):
+            resolver._get_nested_field(data, "items[x]")
+        with pytest.raises(ValueError, match="Invalid array access: items\\[5\\]"):
+            resolver._get_nested_field(data, "items[5]")
+        with pytest.raises(ValueError, match="Cannot access field 'first'"):
+            resolver._get_nested_field(data, "name.first")
+        with pytest.raises(ValueError, match="Field not found: missing"):
+            resolver._get_nested_field(data, "missing")
+
+
+class TestConfigLoader:
+    """Test config loading from YAML and the compiled module."""
+
+    def test_compiled_config_matches_yaml(self, tmp_path, monkeypatch):
+        """Test the compiled module is used only while config.yaml is unchanged."""
+        import sys
+        import config_loader
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("service:\n  port: ${AGENT_TEST_PORT}\n  workers: 4\nllm:\n  model: gpt-4o\n")
+        (tmp_path / "config_compiled.py").write_text(config_loader.compile_config(config_file.read_bytes()))
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.delitem(sys.modules, "config_compiled", raising=False)
+        monkeypatch.setenv("AGENT_TEST_PORT", "8086")
+
+        with patch('config_loader._parse_yaml') as mock_parse_yaml:
+            config = config_loader.load_config(str(config_file))
+        mock_parse_yaml.assert_not_called()
+        assert config == {"service": {"port": "8086", "workers": 4}, "llm": {"model": "gpt-4o"}}
+
+        config_file.write_text("service:\n  port: ${AGENT_TEST_PORT}\n  workers: 8\n")
+        assert config_loader.load_config(str(config_file)) == {"service": {"port": "8086", "workers": 8}}
+
+
 class TestWorkflowSchema:
     """Test workflow schema loader."""
 
     def test_schema_loading(self):
         """Test workflow schema loading."""
+        import sys
         from agent.workflow_schema import WorkflowSchema
 
         schema = WorkflowSchema()
@@ -303,6 +1332,7 @@ class TestWorkflowSchema:
         assert len(schema.node_types) > 0
         assert 'function' in schema.node_types
         assert 'http' in schema.node_types
+        assert all(sys.intern(node_type) is node_type for node_type in schema.node_types)
 
     def test_schema_summary(self):
         """Test schema summary generation."""
@@ -316,6 +1346,72 @@ class TestWorkflowSchema:
         assert 'http' in summary
         assert 'Node Structure' in summary
 
+    def test_schema_loads_lazily(self, tmp_path):
+        """Test the schema file is only read on first use."""
+        from agent.workflow_schema import WorkflowSchema
+
+        schema_file = tmp_path / "workflow.schema.json"
+        schema_file.write_text(json.dumps(
+            {"definitions": {"Node": {"properties": {"type": {"enum": ["http", "agent"]}}}}}
+        ))
+        schema = WorkflowSchema(str(schema_file))
+        assert 'schema' not in vars(schema)
+
+        assert schema.node_types == ["http", "agent"]
+        assert schema.get_node_types() == ("http", "agent")
+        assert schema.get_node_types() is schema.get_node_types()
+        assert schema.get_schema_summary() is schema.get_schema_summary()
+        assert "- `agent`" in schema.get_schema_summary()
+
+    def test_get_workflow_schema_is_shared(self):
+        """Test the factory returns one parsed schema per path."""
+        from agent.workflow_schema import get_workflow_schema
+
+        assert get_workflow_schema() is get_workflow_schema()
+        assert 'http' in get_workflow_schema().node_types
+
+    def test_packaged_schema_is_preferred(self, tmp_path):
+        """Test the schema packaged in agent.resources wins over common/schema."""
+        from agent import workflow_schema
+
+        (tmp_path / "workflow.schema.json").write_text("{}")
+        with patch('importlib.resources.files', return_value=tmp_path):
+            assert workflow_schema._find_default_schema() == tmp_path / "workflow.schema.json"
+        assert workflow_schema._find_default_schema().is_file()
+
+    def test_workflow_validation(self, tmp_path):
+        """Test workflows are validated with the compiled schema."""
+        from agent.workflow_schema import WorkflowSchema
+
+        schema_file = tmp_path / "workflow.schema.json"
+        schema_file.write_text(json.dumps({
+            "type": "object",
+            "required": ["nodes", "edges"],
+            "properties": {"nodes": {"type": "array", "items": {"$ref": "#/definitions/Node"}}},
+            "definitions": {"Node": {"type": "object", "required": ["id", "type"],
+                                     "properties": {"type": {"enum": ["http", "agent"]}}}}
+        }))
+        schema = WorkflowSchema(str(schema_file))
+
+        schema.validate({"nodes": [{"id": "n1", "type": "http"}], "edges": []})
+        with pytest.raises(ValueError, match="edges"):
+            schema.validate({"nodes": []})
+        with pytest.raises(ValueError, match="must be one of"):
+            schema.validate({"nodes": [{"id": "n1", "type": "ftp"}], "edges": []})
+
+    def test_generated_validator_matches_schema(self):
+        """Test the checked-in validator is regenerated with the default schema."""
+        from agent import _generated_validator
+        from agent.workflow_schema import WorkflowSchema, schema_fingerprint
+
+        schema = WorkflowSchema()
+
+        assert _generated_validator.SCHEMA_SHA256 == schema_fingerprint(schema.schema), \
+            "workflow.schema.json changed, run: python -m agent.workflow_schema"
+        assert schema._validator is _generated_validator.validate
+        with pytest.raises(ValueError, match="must be one of"):
+            schema.validate({"nodes": [{"id": "n1", "type": "ftp"}], "edges": []})
+
     def test_node_type_validation(self):
         """Test node type validation."""
         from agent.workflow_schema import WorkflowSchema
@@ -1,6 +1,15 @@
 """Tests for intent classifier."""
+import asyncio
+import json
+import math
+import zlib
+import numpy as np
 import pytest
-from agent.intent_classifier import IntentClassifier
+from unittest.mock import MagicMock, AsyncMock, patch
+from agent import intent_classifier
+from agent.async_runtime import run_sync
+from agent.intent_classifier import Classification, IntentClassifier
+from agent.semantic_cache import SemanticCache
 
 
 class TestIntentClassifier:
@@ -8,8 +17,8 @@ class TestIntentClassifier:
 
     @pytest.fixture
     def classifier(self):
-        """Create intent classifier instance."""
-        return IntentClassifier()
+        """Create keyword intent classifier instance."""
+        return IntentClassifier(use_llm_fallback=False)
 
     def test_patch_intent_with_always(self, classifier):
         """Test patch intent detection with 'always' keyword."""
@@ -167,5 +176,472 @@ class TestIntentClassifier:
         assert result['confidence'] > 0.5
 
 
+class TestClassification:
+    """Test suite for the Classification result type."""
+
+    def test_slots_and_dict_access(self):
+        """Test results are slotted but still readable like the old dicts."""
+        result = IntentClassifier(use_llm_fallback=False).classify("always send email when price drops")
+
+        assert isinstance(result, Classification)
+        assert not hasattr(result, '__dict__')
+        assert result['intent'] == result.intent == 'patch'
+        assert 'scores' in result
+        assert result.get('missing', 'default') == 'default'
+        with pytest.raises(KeyError):
+            result['missing']
+
+    def test_to_dict(self):
+        """Test to_dict returns a plain, JSON-serializable dict."""
+        result = IntentClassifier(use_llm_fallback=False).classify("show me the top posts")
+
+        data = result.to_dict()
+        assert set(data) == {'intent', 'confidence', 'reasoning', 'matched_keywords', 'scores'}
+        assert json.loads(json.dumps(data)) == data
+
+    def test_repeated_keyword_results_are_copies(self):
+        """Test repeated prompts reuse keyword scoring without sharing results."""
+        classifier = IntentClassifier(use_llm_fallback=False)
+
+        first = classifier.classify("always send email when price drops")
+        first['intent'] = 'execute'
+        first.matched_keywords['patch'].clear()
+        second = classifier.classify("always send email when price drops")
+
+        assert second.intent == 'patch'
+        assert 'always' in second.matched_keywords['patch']
+
+
+class TestKeywordScanner:
+    """Test suite for the keyword scanning backends."""
+
+    PROMPTS = [
+        "always send email when price drops below 500",
+        "Show me the top 10 flights, sorted by price",
+        "this should happen every\n  time the condition is met",
+        "the showroom is always open",
+        "get me the list of users",
+    ]
+
+    @staticmethod
+    def _hits(prompt):
+        return sorted(intent_classifier._scan_keywords(prompt.lower()))
+
+    @pytest.mark.skipif(intent_classifier._KEYWORD_AUTOMATON is None, reason="pyahocorasick not installed")
+    def test_automaton_matches_regex_scanner(self, monkeypatch):
+        """Test Aho-Corasick and regex scanners report the same keywords."""
+        automaton_hits = [set(self._hits(p)) for p in self.PROMPTS]
+        monkeypatch.setattr(intent_classifier, '_KEYWORD_AUTOMATON', None)
+        regex_hits = [set(self._hits(p)) for p in self.PROMPTS]
+
+        assert automaton_hits == regex_hits
+
+    def test_whole_words_only(self):
+        """Test keywords inside other words are not matched."""
+        keywords = [kw for _, _, kw in self._hits("the showroom is always open")]
+
+        assert 'show' not in keywords
+        assert 'always' in keywords
+
+
+class FakeStream:
+    """Minimal async chunk stream mimicking openai.AsyncStream."""
+
+    def __init__(self, deltas):
+        self.deltas = list(deltas)
+        self.consumed = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.consumed >= len(self.deltas):
+            raise StopAsyncIteration
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = self.deltas[self.consumed]
+        self.consumed += 1
+        return chunk
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def clear_classify_cache():
+    """Start and end every test with an empty classification cache."""
+    intent_classifier._classify_cache.clear()
+    yield
+    intent_classifier._classify_cache.clear()
+
+
+@pytest.fixture
+def no_logit_bias():
+    """Disable the one-token path so tests exercise JSON output regardless of tiktoken."""
+    with patch('agent.intent_classifier._intent_logit_bias', return_value=None):
+        yield
+
+
+def make_create_mock(content, deltas=None):
+    """Build an AsyncMock for chat.completions.create that supports stream=True."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    if deltas is None:
+        deltas = [content[i:i + 8] for i in range(0, len(content), 8)]
+
+    async def create(**kwargs):
+        if kwargs.get('stream'):
+            return FakeStream(deltas)
+        return response
+
+    return AsyncMock(side_effect=create)
+
+
+@pytest.fixture
+def mock_client():
+    """Patch get_client; call with the LLM's reply content to get the mocked OpenAI client."""
+    with patch('agent.intent_classifier.get_client') as mock_get_client:
+        def make_client(content, deltas=None):
+            client = MagicMock()
+            client.chat.completions.create = make_create_mock(content, deltas)
+            mock_get_client.return_value = client
+            return client
+        yield make_client
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestIntentClassifierCache:
+    """Test suite for the exact-match classification cache."""
+
+    @pytest.fixture
+    def llm_classifier(self, mock_client):
+        """Create classifier with a mocked OpenAI client."""
+        client = mock_client(json.dumps({"intent": "patch", "confidence": 0.9, "reasoning": "adds a node"}))
+        return IntentClassifier(keyword_threshold=1.0), client
+
+    def test_repeated_prompt_hits_cache(self, llm_classifier):
+        """Test identical prompts only call the LLM once."""
+        classifier, mock_client = llm_classifier
+
+        first = classifier.classify("add a slack node")
+        second = classifier.classify("add a slack node")
+
+        assert first == second
+        assert second['intent'] == 'patch'
+        assert mock_client.chat.completions.create.await_count == 1
+
+    def test_cache_returns_copies(self, llm_classifier):
+        """Test mutating a returned result does not poison the cache."""
+        classifier, _ = llm_classifier
+
+        first = classifier.classify("add a slack node")
+        first['intent'] = 'execute'
+
+        assert classifier.classify("add a slack node")['intent'] == 'patch'
+
+    def test_workflow_size_is_part_of_key(self, llm_classifier):
+        """Test different workflow sizes miss the cache."""
+        classifier, mock_client = llm_classifier
+
+        classifier.classify("add a slack node")
+        classifier.classify("add a slack node", {"current_workflow": {"nodes": [{"id": "a"}], "edges": []}})
+
+        assert mock_client.chat.completions.create.await_count == 2
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestStreamedClassification:
+    """Test suite for streamed intent parsing."""
+
+    def test_stops_reading_once_intent_appears(self, mock_client):
+        """Test the stream is closed as soon as the intent label is parsed."""
+        deltas = ['{"intent"', ': "exe', 'cute", ', '"confidence": 0.8', ', "reasoning": "x"}']
+        stream = FakeStream(deltas)
+        client = mock_client("")
+        client.chat.completions.create = AsyncMock(return_value=stream)
+
+        result = IntentClassifier(keyword_threshold=1.0).classify("show me the top posts")
+
+        assert result['intent'] == 'execute'
+        assert stream.consumed == 3
+        assert stream.closed
+        assert client.chat.completions.create.await_count == 1
+        assert client.chat.completions.create.await_args.kwargs['max_tokens'] == 20
+        assert result['reasoning'] == "LLM classified as execute"
+
+    def test_falls_back_to_json_when_stream_unparseable(self, mock_client):
+        """Test a stream without an intent field falls back to the full JSON call."""
+        client = mock_client(
+            json.dumps({"intent": "patch", "confidence": 0.85, "reasoning": "adds a node"}),
+            deltas=['{"result": "unknown"}']
+        )
+
+        result = IntentClassifier(keyword_threshold=1.0).classify("add a slack node")
+
+        assert result['intent'] == 'patch'
+        assert result['confidence'] == 0.85
+        assert client.chat.completions.create.await_count == 2
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestMicroBatching:
+    """Test suite for coalescing concurrent classifications."""
+
+    def test_concurrent_calls_share_one_request(self, mock_client):
+        """Test prompts arriving together are classified in one batched request."""
+        batch_response = json.dumps({"results": [
+            {"id": 0, "intent": "patch", "confidence": 0.9, "reasoning": "adds a node"},
+            {"id": 1, "intent": "execute", "confidence": 0.85, "reasoning": "fetches data"},
+            {"id": 2, "intent": "execute", "confidence": 0.8, "reasoning": "lists items"},
+        ]})
+        client = mock_client(batch_response)
+        classifier = IntentClassifier(keyword_threshold=1.0, batch_window_ms=20)
+
+        async def burst():
+            return await asyncio.gather(
+                classifier.aclassify("add a slack node"),
+                classifier.aclassify("fetch my emails"),
+                classifier.aclassify("list the posts"),
+            )
+
+        results = run_sync(burst())
+
+        assert [r['intent'] for r in results] == ['patch', 'execute', 'execute']
+        assert client.chat.completions.create.await_count == 1
+        assert 'stream' not in client.chat.completions.create.await_args.kwargs
+
+    def test_missing_batch_entries_retry_individually(self, mock_client):
+        """Test prompts absent from the batched response fall back to a single request."""
+        batch_response = json.dumps({"results": [
+            {"id": 0, "intent": "patch", "confidence": 0.9, "reasoning": "adds a node"},
+        ]})
+        client = mock_client(batch_response, deltas=['{"intent": "execute"'])
+        classifier = IntentClassifier(keyword_threshold=1.0, batch_window_ms=20)
+
+        async def burst():
+            return await asyncio.gather(
+                classifier.aclassify("add a slack node"),
+                classifier.aclassify("fetch my emails"),
+            )
+
+        results = run_sync(burst())
+
+        assert [r['intent'] for r in results] == ['patch', 'execute']
+        assert client.chat.completions.create.await_count == 2
+
+
+class TestOneTokenClassification:
+    """Test suite for logit_bias single-token classification."""
+
+    @staticmethod
+    def _response(content, logprobs):
+        response = MagicMock()
+        choice = MagicMock()
+        choice.message.content = content
+        alts = []
+        for token, logprob in logprobs:
+            alt = MagicMock()
+            alt.token = token
+            alt.logprob = logprob
+            alts.append(alt)
+        choice.logprobs.content = [MagicMock(top_logprobs=alts)]
+        response.choices = [choice]
+        return response
+
+    @patch('agent.intent_classifier._intent_logit_bias', return_value={"79": 100, "68": 100, "84": 100})
+    @patch('agent.intent_classifier.get_client')
+    def test_maps_letter_to_intent(self, mock_get_client, mock_bias):
+        """Test a single biased token is mapped to the intent label."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=self._response("e", [("e", -0.01), ("p", -5.0), ("u", -6.0)])
+        )
+        mock_get_client.return_value = mock_client
+
+        result = IntentClassifier(keyword_threshold=1.0, batch_window_ms=0).classify("show me the top posts")
+
+        kwargs = mock_client.chat.completions.create.await_args.kwargs
+        assert kwargs['max_tokens'] == 1
+        assert kwargs['logit_bias'] == {"79": 100, "68": 100, "84": 100}
+        assert result['intent'] == 'execute'
+        assert result['confidence'] > 0.9
+
+    def test_confidence_from_entropy(self):
+        """Test confidence is 1 - normalized entropy over the letters."""
+        uniform = [MagicMock(token=t, logprob=math.log(1 / 3)) for t in ("p", "e", "u")]
+        certain = [MagicMock(token="p", logprob=0.0)]
+
+        assert intent_classifier._letter_confidence(uniform) == 0.0
+        assert intent_classifier._letter_confidence(certain) == 1.0
+
+    @patch('agent.intent_classifier._intent_logit_bias', return_value={"79": 100})
+    @patch('agent.intent_classifier.get_client')
+    def test_unexpected_token_falls_back_to_json(self, mock_get_client, mock_bias):
+        """Test an unmappable token falls back to the streamed JSON path."""
+        one_token = self._response("x", [])
+        json_create = make_create_mock(json.dumps({"intent": "patch", "confidence": 0.8}))
+
+        async def create(**kwargs):
+            if kwargs.get('max_tokens') == 1:
+                return one_token
+            return await json_create(**kwargs)
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=create)
+        mock_get_client.return_value = mock_client
+
+        result = IntentClassifier(keyword_threshold=1.0, batch_window_ms=0).classify("add a slack node")
+
+        assert result['intent'] == 'patch'
+        assert mock_client.chat.completions.create.await_count == 2
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestLocalIntentModel:
+    """Test suite for the local distilled classifier gate."""
+
+    @pytest.fixture
+    def client(self, mock_client):
+        return mock_client(json.dumps({"intent": "patch", "confidence": 0.9}))
+
+    def test_confident_prediction_skips_llm(self, client):
+        """Test confident local predictions are returned without an LLM call."""
+        local_model = MagicMock()
+        local_model.predict.return_value = ("execute", 0.96)
+        classifier = IntentClassifier(keyword_threshold=1.0, batch_window_ms=0, local_model=local_model)
+
+        result = classifier.classify("show me the top posts")
+
+        assert result['intent'] == 'execute'
+        assert result['confidence'] == 0.96
+        assert client.chat.completions.create.await_count == 0
+
+    def test_unsure_prediction_falls_back_to_llm(self, client):
+        """Test low-probability local predictions defer to the LLM."""
+        local_model = MagicMock()
+        local_model.predict.return_value = ("execute", 0.55)
+        classifier = IntentClassifier(keyword_threshold=1.0, batch_window_ms=0, local_model=local_model)
+
+        result = classifier.classify("add a slack node")
+
+        assert result['intent'] == 'patch'
+        assert client.chat.completions.create.await_count == 1
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestCascade:
+    """Test suite for keyword-first classification with LLM escalation."""
+
+    @pytest.fixture
+    def client(self, mock_client):
+        return mock_client(json.dumps({"intent": "execute", "confidence": 0.9}))
+
+    def test_confident_keywords_skip_llm(self, client):
+        """Test high-confidence keyword results never reach the LLM."""
+        classifier = IntentClassifier(batch_window_ms=0)
+
+        result = classifier.classify("always send me an email when the price drops below 500")
+
+        assert result.intent == 'patch'
+        assert client.chat.completions.create.await_count == 0
+        assert classifier.escalation_rate == 0.0
+
+    def test_ambiguous_prompt_escalates(self, client):
+        """Test unclear keyword results escalate to the LLM."""
+        classifier = IntentClassifier(batch_window_ms=0)
+
+        result = classifier.classify("the quarterly report")
+
+        assert result.intent == 'execute'
+        assert client.chat.completions.create.await_count == 1
+        assert classifier.escalation_rate == 1.0
+
+    def test_llm_failure_returns_keyword_result(self, client):
+        """Test an LLM error falls back to the keyword result."""
+        client.chat.completions.create = AsyncMock(side_effect=RuntimeError("boom"))
+        classifier = IntentClassifier(batch_window_ms=0)
+
+        result = classifier.classify("the quarterly report")
+
+        assert result.intent == 'unclear'
+        assert result.reasoning.startswith("Keyword match")
+
+    @patch.dict('os.environ', {'OPENAI_API_KEY': ''})
+    def test_missing_api_key_uses_keywords(self):
+        """Test the classifier degrades to keywords when no OpenAI client can be built."""
+        intent_classifier.get_client.cache_clear()
+        classifier = IntentClassifier()
+
+        assert classifier.use_llm_fallback is False
+        assert classifier.classify("show me the top posts").intent == 'execute'
+
+
+@pytest.mark.usefixtures("no_logit_bias")
+class TestBatchApi:
+    """Test suite for offline classification via the Batch API."""
+
+    @patch('agent.intent_classifier.run_batch')
+    def test_only_ambiguous_prompts_are_batched(self, mock_run_batch, mock_client):
+        """Test keyword-confident prompts skip the batch and missing results go online."""
+        client = mock_client(json.dumps({"intent": "patch", "confidence": 0.8}))
+        mock_run_batch.return_value = {
+            0: {"choices": [{"message": {"content": json.dumps({"intent": "execute", "confidence": 0.9})}}]}
+        }
+        classifier = IntentClassifier(batch_window_ms=0)
+
+        results = classifier.classify_batch([
+            "the quarterly report",
+            "always send me an email when the price drops below 500",
+            "the annual summary",
+        ])
+
+        bodies = mock_run_batch.call_args[0][1]
+        assert len(bodies) == 2
+        assert [r.intent for r in results] == ['execute', 'patch', 'patch']
+        assert client.chat.completions.create.await_count == 1
+
+
+class TestSemanticCache:
+    """Test suite for the semantic classification cache."""
+
+    @staticmethod
+    def _bag_of_words(text):
+        """Deterministic toy embedding: hashed bag of words."""
+        vec = np.zeros(64, dtype=np.float32)
+        for word in text.lower().split():
+            vec[zlib.crc32(word.encode()) % 64] += 1.0
+        return vec
+
+    @pytest.fixture
+    def cache(self):
+        """Create semantic cache with a toy embedder."""
+        return SemanticCache(self._bag_of_words, dim=64, threshold=0.9, max_entries=3)
+
+    def test_similar_prompt_hits(self, cache):
+        """Test identical wording hits and unrelated wording misses."""
+        result = {'intent': 'patch', 'confidence': 0.95, 'reasoning': 'adds node'}
+        cache.add(cache.embed("add a slack node when price drops"), result)
+
+        assert cache.lookup(cache.embed("add a slack node when price drops"))['intent'] == 'patch'
+        assert cache.lookup(cache.embed("show me all flights")) is None
+
+    def test_low_confidence_not_cached(self, cache):
+        """Test low-confidence and unclear results are not cached."""
+        assert not cache.add(cache.embed("a"), {'intent': 'patch', 'confidence': 0.5})
+        assert not cache.add(cache.embed("b"), {'intent': 'unclear', 'confidence': 0.9})
+        assert len(cache) == 0
+
+    def test_fifo_eviction(self, cache):
+        """Test oldest entry is evicted once the cache is full."""
+        for i, word in enumerate(["alpha", "beta", "gamma", "delta"]):
+            cache.add(cache.embed(word), {'intent': 'execute', 'confidence': 0.9, 'n': i})
+
+        assert len(cache) == 3
+        assert cache.lookup(cache.embed("alpha")) is None
+        assert cache.lookup(cache.embed("delta"))['n'] == 3
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -1,5 +1,6 @@
 """Tests for pipeline primitives."""
 import pytest
+import json
 from unittest.mock import Mock, patch
 from pipeline.primitives import table_ops
 from pipeline.primitives import http_request
@@ -45,6 +46,23 @@ class TestTableOperations:
         assert result[0]["name"] == "Alice"
         assert result[-1]["name"] == "Eve"
 
+    def test_table_sort_limit(self, sample_data):
+        """Test a limited (partial) sort matches sorting then slicing, ties included."""
+        for order in ("asc", "desc"):
+            step = {"step": "table_sort", "field": "category", "order": order}
+            full = table_ops.table_sort(step, sample_data)
+
+            assert table_ops.table_sort(step, sample_data, limit=2) == full[:2]
+            assert table_ops.table_sort(step, sample_data, limit=10) == full
+
+    def test_table_sort_records_without_field(self):
+        """Test records lacking the sort field sort as 0."""
+        data = [{"price": 5}, {"name": "no price"}, {"price": -1}]
+        step = {"step": "table_sort", "field": "price", "order": "asc"}
+
+        assert table_ops.table_sort(step, data) == [{"price": -1}, {"name": "no price"}, {"price": 5}]
+        assert table_ops.table_sort(step, data, limit=1) == [{"price": -1}]
+
     def test_table_sort_missing_field(self, sample_data):
         """Test sorting with missing field."""
         step = {"step": "table_sort", "order": "asc"}
@@ -177,11 +195,11 @@ class TestTableOperations:
 class TestHttpRequest:
     """Test suite for HTTP request primitive."""
 
-    @patch('pipeline.primitives.http_request.requests.get')
+    @patch('pipeline.primitives.http_request._SESSION.get')
     def test_http_get_success(self, mock_get):
         """Test successful HTTP GET request."""
         mock_response = Mock()
-        mock_response.json.return_value = {"data": "test"}
+        mock_response.content = json.dumps({"data": "test"}).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -196,11 +214,11 @@ class TestHttpRequest:
         assert result == {"data": "test"}
         mock_get.assert_called_once()
 
-    @patch('pipeline.primitives.http_request.requests.post')
+    @patch('pipeline.primitives.http_request._SESSION.post')
     def test_http_post_success(self, mock_post):
         """Test successful HTTP POST request."""
         mock_response = Mock()
-        mock_response.json.return_value = {"success": True}
+        mock_response.content = json.dumps({"success": True}).encode()
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
 
@@ -217,7 +235,7 @@ class TestHttpRequest:
         mock_post.assert_called_once_with(
             "https://api.example.com/data",
             json={"key": "value"},
-            timeout=30
+            timeout=http_request.TIMEOUT
         )
 
     def test_http_missing_url(self):
@@ -227,11 +245,11 @@ class TestHttpRequest:
         with pytest.raises(ValueError, match="requires 'url' parameter"):
             http_request.execute(step, None)
 
-    @patch('pipeline.primitives.http_request.requests.get')
+    @patch('pipeline.primitives.http_request._SESSION.get')
     def test_http_get_with_params(self, mock_get):
         """Test HTTP GET with query parameters."""
         mock_response = Mock()
-        mock_response.json.return_value = []
+        mock_response.content = json.dumps([]).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -247,7 +265,7 @@ class TestHttpRequest:
         mock_get.assert_called_once_with(
             "https://api.example.com/search",
             params={"q": "test", "limit": 10},
-            timeout=30
+            timeout=http_request.TIMEOUT
         )
 
 
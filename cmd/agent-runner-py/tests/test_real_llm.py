@@ -9,7 +9,7 @@ import pytest
 import os
 import json
 from agent.llm_client import LLMClient
-from agent.workflow_schema import WorkflowSchema
+from agent.workflow_schema import get_workflow_schema
 from agent.intent_classifier import IntentClassifier
 
 
@@ -26,7 +26,7 @@ def llm_client():
         pytest.skip("OPENAI_API_KEY not set")
 
     # Load workflow schema
-    schema = WorkflowSchema()
+    schema = get_workflow_schema()
     schema_summary = schema.get_schema_summary()
 
     # Create LLM client